@@ -0,0 +1,91 @@
+"""
+Benchmark console output throughput.
+
+Streams a large `yes | head -c` output through run_console_command and through
+a reference copy of the previous reader (a thread per command reading
+io.DEFAULT_BUFFER_SIZE chunks, decoding and flushing every chunk to the tty),
+and reports the wall-clock throughput and the CPU time spent in this process
+for each.  The tty echo goes to /dev/null so the terminal's speed is not
+measured.  The previous reader's pty translated newlines to CRLF, so its
+output is compared after normalizing line endings.  A last run measures the
+selectors loop with output compaction turned on.
+
+Usage:
+    python benchmarks/bench_console.py [--megabytes 1024]
+"""
+
+import argparse
+import io
+import os
+import pty
+import subprocess
+import threading
+import time
+
+from llmide import llmide_functions
+from llmide.capture import HeadTailBuffer
+
+
+def legacy_run_console_command(command, tty):
+    """The threaded reader used before the selectors loop."""
+    output = HeadTailBuffer(llmide_functions.CONSOLE_HEAD_BYTES, llmide_functions.CONSOLE_TAIL_BYTES)
+
+    def read_output(fd):
+        try:
+            while True:
+                data = os.read(fd, io.DEFAULT_BUFFER_SIZE)
+                if not data:
+                    break
+                tty.write(data.decode(errors="replace"))
+                tty.flush()
+                output.write(data)
+        except OSError:
+            pass
+
+    master_fd, slave_fd = pty.openpty()
+    process = subprocess.Popen(command, shell=True, stdin=slave_fd, stdout=slave_fd, stderr=slave_fd, close_fds=True)
+    os.close(slave_fd)
+    output_thread = threading.Thread(target=read_output, args=(master_fd,))
+    output_thread.start()
+    process.wait()
+    output_thread.join()
+    os.close(master_fd)
+    return output.render()
+
+
+def measure(function, command):
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    result = function(command)
+    return time.perf_counter() - start, time.process_time() - cpu_start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--megabytes", type=int, default=1024)
+    options = parser.parse_args()
+
+    tty = open(os.devnull, "w")
+    llmide_functions._tty = tty
+    command = f"yes | head -c {options.megabytes * 1024 * 1024}"
+
+    before, before_cpu, before_output = measure(lambda c: legacy_run_console_command(c, tty), command)
+    llmide_functions.CONSOLE_COMPACT = False
+    after, after_cpu, after_output = measure(llmide_functions.run_console_command, command)
+    llmide_functions.CONSOLE_COMPACT = True
+    compact, compact_cpu, _ = measure(llmide_functions.run_console_command, command)
+    tty.close()
+
+    before_lines = before_output.replace("\r\n", "\n").splitlines()
+    after_lines = after_output.splitlines()
+    assert before_lines[:100] == after_lines[:100] and before_lines[-100:] == after_lines[-100:], \
+        "reader output differs from the reference reader"
+    print(f"stream: {options.megabytes} MB")
+    print(f"{'threaded reader:':<18}{before:8.2f} s {options.megabytes / before:10.1f} MB/s {before_cpu:8.2f} s CPU")
+    print(f"{'selectors loop:':<18}{after:8.2f} s {options.megabytes / after:10.1f} MB/s {after_cpu:8.2f} s CPU")
+    print(f"{'with compaction:':<18}{compact:8.2f} s {options.megabytes / compact:10.1f} MB/s {compact_cpu:8.2f} s CPU")
+    print(f"{'speed-up:':<18}{before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
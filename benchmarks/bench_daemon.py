@@ -0,0 +1,80 @@
+"""
+Benchmark llmide daemon latency against in-process execution.
+
+Measures two things for the same response (a read_file and a console echo):
+
+- cold start: a fresh Python process that imports llmide and runs the response
+  once, against a fresh process that sends it to an already running daemon
+  through the thin client;
+- warm latency: the mean time per process_content call in a long-lived
+  process, in-process and through the daemon.
+
+Usage:
+    python benchmarks/bench_daemon.py [--calls 200]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from llmide import client
+from llmide.llmide import process_content
+
+
+IN_PROCESS_SCRIPT = "import sys; from llmide.llmide import process_content; process_content(sys.argv[1])"
+CLIENT_SCRIPT = ("import sys; from llmide import client; "
+                 "client.process_content(sys.argv[1], socket_path=sys.argv[2]); client.close()")
+
+
+def cold_start(script, *args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", script, *args], check=True, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def warm_latency(function, content, calls):
+    function(content)
+    start = time.perf_counter()
+    for _ in range(calls):
+        result = function(content)
+    return (time.perf_counter() - start) / calls, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200)
+    options = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "notes.txt")
+    with open(path, "w") as file:
+        file.write("hello\n")
+    socket_path = os.path.join(directory, "llmide.sock")
+    content = f"Command: read_file {path}\nCommand: run_console_command echo hi\n"
+
+    connection = client.start_daemon(socket_path)
+    try:
+        in_process_cold = cold_start(IN_PROCESS_SCRIPT, content)
+        daemon_cold = cold_start(CLIENT_SCRIPT, content, socket_path)
+        in_process_warm, in_process_result = warm_latency(process_content, content, options.calls)
+        session = connection.open_session()
+        daemon_warm, daemon_result = warm_latency(lambda c: connection.process_content(session, c), content,
+                                                  options.calls)
+    finally:
+        connection.request("shutdown")
+        connection.close()
+
+    assert daemon_result == in_process_result, "daemon response differs from in-process response"
+    print(f"{options.calls} calls, response: read_file + run_console_command")
+    print(f"{'':<14}{'cold start':>14}{'warm call':>14}")
+    print(f"{'in-process:':<14}{in_process_cold * 1000:11.1f} ms{in_process_warm * 1000:11.2f} ms")
+    print(f"{'daemon:':<14}{daemon_cold * 1000:11.1f} ms{daemon_warm * 1000:11.2f} ms")
+    print(f"{'cold speed-up:':<14}{in_process_cold / daemon_cold:12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark parallel execution of read-heavy command batches.
+
+Runs the same response through process_content sequentially and on the thread
+pool, checks that the outputs are identical, and reports the speed-up.  The
+batch mixes read_file and read_code_signatures_and_docstrings on generated
+modules with summarize calls against a fake LLM that sleeps to simulate
+network latency.
+
+Usage:
+    python benchmarks/bench_executor.py [--files 40] [--llm-latency-ms 50]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from llmide import llmide, summarize
+
+
+def make_module(n_functions):
+    return "".join(
+        f"def function_{i}(a, b):\n    \"\"\"Return the combination {i}.\"\"\"\n    return a * {i} + b\n\n"
+        for i in range(n_functions)
+    )
+
+
+def make_response(paths):
+    lines = []
+    for path in paths:
+        lines.append(f"Command: read_file {path}")
+        lines.append(f"Command: read_code_signatures_and_docstrings {path}")
+        lines.append(f"Command: summarize {path}")
+    return "\n".join(lines) + "\n"
+
+
+def remove_summaries(paths):
+    for path in paths:
+        if os.path.exists(path + ".summary"):
+            os.remove(path + ".summary")
+
+
+def measure(content, paths, max_workers):
+    remove_summaries(paths)
+    start = time.perf_counter()
+    response, _ = llmide.process_content(content, max_workers=max_workers)
+    return time.perf_counter() - start, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--functions", type=int, default=200)
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--workers", type=int, default=None)
+    options = parser.parse_args()
+
+    def fake_llm(system_prompt, user_message):
+        time.sleep(options.llm_latency_ms / 1000)
+        return f"- {len(user_message)} characters summarized"
+
+    summarize.register_llm(fake_llm)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(options.files):
+            path = os.path.join(directory, f"module_{i}.py")
+            with open(path, "w") as file:
+                file.write(make_module(options.functions))
+            paths.append(path)
+        content = make_response(paths)
+
+        sequential_time, sequential_response = measure(content, paths, max_workers=1)
+        parallel_time, parallel_response = measure(content, paths, max_workers=options.workers)
+
+    assert parallel_response == sequential_response, "parallel output differs from sequential output"
+    print(f"batch: {3 * options.files} commands over {options.files} files")
+    print(f"{'sequential:':<14}{sequential_time * 1000:10.1f} ms")
+    print(f"{'parallel:':<14}{parallel_time * 1000:10.1f} ms")
+    print(f"{'speed-up:':<14}{sequential_time / parallel_time:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark command parsing on large synthetic LLM responses.
+
+Compares the single-pass tokenizer against the previous approach of calling
+a regex-based ``process_slice`` repeatedly on the sliced remainder.
+
+Usage:
+    python benchmarks/bench_parser.py [--commands 1000] [--size-mb 10]
+"""
+
+import argparse
+import re
+import time
+
+from llmide.commandparser import parse_commands
+
+
+def make_response(n_commands, size_bytes):
+    """Build a response with n_commands commands whose blocks total roughly size_bytes."""
+    block_size = max(1, size_bytes // n_commands)
+    line = "    value = compute(value)  # synthetic payload\n"
+    block = line * max(1, block_size // len(line))
+    parts = []
+    for i in range(n_commands):
+        parts.append(f"Step {i}: update the module.\n\nCommand: write_file pkg/module_{i}.py\n`````python\n{block}`````\n")
+    return "".join(parts)
+
+
+def _legacy_process_slice(content):
+    command_match = re.search(r"^Command: (\S+)\s*(.*)$", content, re.MULTILINE)
+    if not command_match:
+        return None, None, None, None
+    command_end_pos = command_match.end()
+    backtick_match = re.search(r"`````(?:[\w#\+\-]+)?\s*(.*?)`````", content, re.DOTALL)
+    backtick_content, backtick_end_pos = None, -1
+    if backtick_match and backtick_match.start() - command_end_pos <= 1:
+        backtick_content, backtick_end_pos = backtick_match.group(1), backtick_match.end()
+    remaining_content = content[max(command_end_pos, backtick_end_pos):].strip()
+    return command_match.group(1), command_match.group(2), backtick_content, remaining_content
+
+
+def legacy_parse_commands(content):
+    commands = []
+    command, arguments, backtick_content, remaining_content = _legacy_process_slice(content)
+    while command:
+        commands.append((command, arguments, backtick_content))
+        command, arguments, backtick_content, remaining_content = _legacy_process_slice(remaining_content)
+    return commands
+
+
+def measure(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--commands", type=int, default=1000)
+    parser.add_argument("--size-mb", type=float, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args()
+
+    content = make_response(options.commands, int(options.size_mb * 1024 * 1024))
+    assert len(parse_commands(content)) == options.commands
+    print(f"response: {options.commands} commands, {len(content) / 1e6:.1f} MB")
+    tokenizer_time = measure(parse_commands, content, repeat=options.repeat)
+    legacy_time = measure(legacy_parse_commands, content, repeat=options.repeat)
+    print(f"{'tokenizer:':<22}{tokenizer_time * 1000:10.1f} ms")
+    print(f"{'legacy process_slice:':<22}{legacy_time * 1000:10.1f} ms")
+    print(f"{'speed-up:':<22}{legacy_time / tokenizer_time:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark the quote conversion run after every codemanipulator edit.
+
+Converts a generated string-heavy module with convert_double_quotes_to_single,
+which walks the syntax tree once, and with a reference copy of the original
+regex-based version, which searched the whole module again for every string it
+found.  The original version's time grows with the square of the module size,
+so it is run on a smaller module (--legacy-lines) as well as the same one;
+pass --legacy-lines 0 to skip it, or the full line count to compare like for
+like.
+
+Usage:
+    python benchmarks/bench_quotes.py [--lines 50000] [--legacy-lines 2000]
+"""
+
+import argparse
+import re
+import time
+
+from llmide.codemanipulator import convert_double_quotes_to_single
+
+
+def legacy_convert_double_quotes_to_single(code):
+    """The original regex-based conversion, which searched the module once per string."""
+    def replace_quotes(match):
+        if re.search(r'(f|@\w+\(|print\(|return ).*' + re.escape(match.group(0)) + r'.*[\)]?', code):
+            return match.group(0)
+        return "'" + match.group(1).replace("'", "\\'") + "'"
+    return re.sub(r'"([^"\\]*(?:\\.[^"\\]*)*)"', replace_quotes, code)
+
+
+def make_module(n_lines):
+    """Build a module of about n_lines lines, mostly dictionaries of string literals."""
+    parts = []
+    for i in range(max(1, n_lines // 10)):
+        parts.append(
+            f'def handler_{i}(request):\n'
+            f'    """Handle request {i}."""\n'
+            f'    headers = {{"content-type": "text/plain", "x-request": "{i}"}}\n'
+            f'    if request.method == "POST":\n'
+            f'        log("posted", "handler_{i}")\n'
+            f'    print("handled", {i})\n'
+            f'    return {{"status": "ok", "id": "{i}"}}\n'
+            f'\n'
+            f'\n'
+            f'ROUTE_{i} = ("/handler/{i}", "GET")\n'
+        )
+    return "".join(parts)
+
+
+def measure(function, code):
+    start = time.perf_counter()
+    result = function(code)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, default=50000)
+    parser.add_argument("--legacy-lines", type=int, default=2000)
+    options = parser.parse_args()
+
+    code = make_module(options.lines)
+    elapsed, _ = measure(convert_double_quotes_to_single, code)
+    print(f"module: {code.count(chr(10))} lines, {len(code) / 1e6:.1f} MB")
+    print(f"{'syntax tree pass:':<18}{elapsed * 1000:10.1f} ms  ({options.lines} lines)")
+    if options.legacy_lines:
+        small = make_module(options.legacy_lines)
+        small_elapsed, _ = measure(convert_double_quotes_to_single, small)
+        legacy_elapsed, _ = measure(legacy_convert_double_quotes_to_single, small)
+        print(f"{'syntax tree pass:':<18}{small_elapsed * 1000:10.1f} ms  ({options.legacy_lines} lines)")
+        print(f"{'regex version:':<18}{legacy_elapsed * 1000:10.1f} ms  ({options.legacy_lines} lines)")
+        print(f"{'speed-up:':<18}{legacy_elapsed / small_elapsed:10.1f}x at {options.legacy_lines} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark per-command console latency.
+
+Runs the same short commands through run_console_command with a fresh shell
+per call and with the persistent shell session, checks that the outputs are
+identical, and reports the mean latency of each mode.
+
+Usage:
+    python benchmarks/bench_shell.py [--commands 200] [--shell /bin/bash]
+"""
+
+import argparse
+import time
+
+from llmide import llmide_functions
+from llmide.session import current_session
+from llmide.shell import ShellSession
+
+
+def measure(commands, persistent):
+    llmide_functions.PERSISTENT_SHELL = persistent
+    outputs = []
+    start = time.perf_counter()
+    for command in commands:
+        outputs.append(llmide_functions.run_console_command(command))
+    return (time.perf_counter() - start) / len(commands), outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--commands", type=int, default=200)
+    parser.add_argument("--shell", default=None, help="shell to use instead of the user's default")
+    options = parser.parse_args()
+
+    if options.shell:
+        llmide_functions.get_default_shell = lambda: options.shell
+    current_session().shell_session = ShellSession(llmide_functions.get_default_shell())
+    commands = [f"echo command {i}" for i in range(options.commands)]
+
+    # Start the persistent shell outside the timed region, as a session would.
+    current_session().shell_session.start()
+    spawn_latency, spawn_outputs = measure(commands, persistent=False)
+    persistent_latency, persistent_outputs = measure(commands, persistent=True)
+    current_session().shell_session.close()
+
+    assert persistent_outputs == spawn_outputs, "persistent shell output differs from spawned shell output"
+    print(f"shell: {current_session().shell_session.shell_path}, {options.commands} commands")
+    print(f"{'spawn per call:':<18}{spawn_latency * 1000:10.2f} ms/command")
+    print(f"{'persistent:':<18}{persistent_latency * 1000:10.2f} ms/command")
+    print(f"{'speed-up:':<18}{spawn_latency / persistent_latency:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
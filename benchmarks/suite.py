@@ -0,0 +1,345 @@
+"""
+Run the benchmark suite over llmide's hot paths and compare with a baseline.
+
+Each case builds a synthetic fixture, then times one operation a few times:
+
+- parse: parse_commands on a 10 MB response with 1000 commands;
+- codemanipulator_*: reading signatures, reading and replacing a definition,
+  and a batch of five replacements, in a module with 10k functions, with the
+  syntax tree and formatting caches cleared before every run; the *_warm
+  cases read from the caches filled by their first run;
+- code_scissors_edit, findreplace_edit: an edit near the end of a 100 MB file;
+- quote_conversion: convert_double_quotes_to_single on a 50k-line module;
+- symbol_find: symbol index queries by name and by prefix over 50 modules
+  of 1000 functions;
+- symbol_index_build: indexing those modules into a new database;
+- write_file_diff: write_file rewriting a 20k-line file with every 100th
+  line changed, which diffs the two versions;
+- image_resize: load_and_resize_image on a 4000x3000 photo-sized PNG;
+- console_capture: run_console_command streaming 256 MB;
+- summarize_fanout: a response of 40 summarize commands against a fake LLM
+  with 20 ms latency.
+
+--scale multiplies every fixture size, for a quick run.  Results (minimum and
+median wall time, median CPU time of this process) are printed as a table and
+written as JSON with --output.  When a baseline file exists, each case is
+compared with it and the suite exits with status 1 if any case's minimum time
+grew by more than --threshold.  --save-baseline writes the results as the new
+baseline; with --only, it updates those cases in the existing baseline.  Baselines are only comparable on the machine and scale they were
+recorded with.
+
+Usage:
+    python benchmarks/suite.py [--scale 1.0] [--repeat 3] [--only parse,findreplace_edit]
+                               [--output results.json] [--baseline benchmarks/baseline.json]
+                               [--threshold 0.25] [--save-baseline]
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from bench_executor import make_module
+from bench_parser import make_response
+from bench_quotes import make_module as make_string_module
+from llmide import astcache, codemanipulator, code_scissors, findreplace, formatting, llmide, llmide_functions
+from llmide.commandparser import parse_commands
+from llmide.session import Session, use_session
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Differences below this many seconds are noise, whatever the ratio.
+NOISE_SECONDS = 0.005
+MEGABYTE = 1024 * 1024
+
+CASES = {}
+
+
+def case(function):
+    """Register a case: function(scale, directory) builds its fixture and returns the operation to time."""
+    CASES[function.__name__] = function
+    return function
+
+
+def scaled(size, scale):
+    return max(1, int(size * scale))
+
+
+def cold(operation):
+    """Return a run that clears the syntax tree and formatting caches, so each run parses and formats afresh."""
+    def run():
+        astcache.get_cache().clear()
+        formatting.get_cache().clear()
+        return operation()
+    return run
+
+
+def make_text_file(size_bytes):
+    """Return a file of numbered lines totalling about size_bytes, and two lines near its end."""
+    line_count = max(10, size_bytes // 40)
+    lines = [f"    record_{i:09d} = compute(record)  # payload\n" for i in range(line_count)]
+    return "".join(lines), lines[-6], lines[-3]
+
+
+@case
+def parse(scale, directory):
+    content = make_response(scaled(1000, scale), scaled(10 * MEGABYTE, scale))
+    return lambda: parse_commands(content)
+
+
+@case
+def codemanipulator_signatures(scale, directory):
+    source = make_module(scaled(10000, scale))
+    return cold(lambda: codemanipulator.get_signatures_and_docstrings(source))
+
+
+@case
+def codemanipulator_signatures_warm(scale, directory):
+    source = make_module(scaled(10000, scale))
+    return lambda: codemanipulator.get_signatures_and_docstrings(source)
+
+
+@case
+def codemanipulator_read(scale, directory):
+    count = scaled(10000, scale)
+    source = make_module(count)
+    return cold(lambda: codemanipulator.read_code_at_address(source, f"function_{count // 2}"))
+
+
+@case
+def codemanipulator_read_warm(scale, directory):
+    count = scaled(10000, scale)
+    source = make_module(count)
+    return lambda: codemanipulator.read_code_at_address(source, f"function_{count // 2}")
+
+
+@case
+def codemanipulator_replace(scale, directory):
+    count = scaled(10000, scale)
+    source = make_module(count)
+    new_code = f"def function_{count // 2}(a, b):\n    return a - b\n"
+    return cold(lambda: codemanipulator.replace_code(source, f"function_{count // 2}", new_code))
+
+
+@case
+def codemanipulator_batch(scale, directory):
+    count = scaled(10000, scale)
+    source = make_module(count)
+    edits = [("replace", f"function_{i}", f"def function_{i}(a, b):\n    return a - b\n")
+             for i in range(0, count, max(1, count // 5))]
+    return cold(lambda: codemanipulator.apply_edits(source, edits))
+
+
+def make_symbol_tree(scale, directory):
+    """Write 50 modules of 1000 functions in 10 packages, returning their root."""
+    root = os.path.join(directory, "symbols")
+    if not os.path.isdir(root):
+        for i in range(scaled(50, scale)):
+            package = os.path.join(root, f"package_{i % 10}")
+            os.makedirs(package, exist_ok=True)
+            with open(os.path.join(package, f"module_{i}.py"), "w") as file:
+                file.write(make_module(1000))
+    return root
+
+
+@case
+def symbol_find(scale, directory):
+    from llmide.symbolindex import SymbolIndex
+
+    index = SymbolIndex(make_symbol_tree(scale, directory))
+    index.update()
+    return lambda: (index.find("function_500"), index.find("package_3.module_3.function_99*"))
+
+
+@case
+def symbol_index_build(scale, directory):
+    from llmide.symbolindex import SymbolIndex
+
+    root = make_symbol_tree(scale, directory)
+    databases = itertools.count()
+
+    def run():
+        index = SymbolIndex(root, database=os.path.join(directory, f"symbols-{next(databases)}.sqlite"))
+        try:
+            index.update()
+        finally:
+            index.close()
+    return run
+
+
+@case
+def code_scissors_edit(scale, directory):
+    code, first, second = make_text_file(scaled(100 * MEGABYTE, scale))
+    return lambda: code_scissors.replace_between(code, first, second, "    replaced = True\n")
+
+
+@case
+def findreplace_edit(scale, directory):
+    code, first, second = make_text_file(scaled(100 * MEGABYTE, scale))
+    command = f"<<<<<<< SEARCH\n{first}{second}=======\n    replaced = True\n>>>>>>> REPLACE"
+    return lambda: findreplace.find_replace(code, command)
+
+
+@case
+def quote_conversion(scale, directory):
+    code = make_string_module(scaled(50000, scale))
+    return lambda: codemanipulator.convert_double_quotes_to_single(code)
+
+
+@case
+def write_file_diff(scale, directory):
+    code, _, _ = make_text_file(scaled(20000, scale) * 40)
+    lines = code.splitlines(True)
+    changed = "".join(line.replace("compute", "recompute") if i % 100 == 0 else line for i, line in enumerate(lines))
+    path = os.path.join(directory, "module.py")
+    with open(path, "w") as file:
+        file.write(code)
+    versions = [changed, code]
+
+    def run():
+        # Alternate between the versions, so every call diffs one against the other.
+        versions.reverse()
+        return llmide_functions.write_file(path, versions[1])
+
+    return run
+
+
+@case
+def image_resize(scale, directory):
+    from PIL import Image
+
+    width, height = scaled(4000, math.sqrt(scale)), scaled(3000, math.sqrt(scale))
+    # A gradient with noise, so the PNG decodes and resizes like a photo rather than a flat image.
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+    path = os.path.join(directory, "photo.png")
+    Image.blend(gradient, noise, 0.2).save(path)
+    return lambda: llmide.load_and_resize_image(path)
+
+
+@case
+def console_capture(scale, directory):
+    command = f"yes | head -c {scaled(256 * MEGABYTE, scale)}"
+    return lambda: llmide_functions.run_console_command(command)
+
+
+@case
+def summarize_fanout(scale, directory):
+    paths = []
+    for i in range(scaled(40, scale)):
+        path = os.path.join(directory, f"module_{i}.py")
+        with open(path, "w") as file:
+            file.write(make_module(50))
+        paths.append(path)
+    content = "".join(f"Command: summarize {path}\n" for path in paths)
+
+    def run():
+        for path in paths:
+            if os.path.exists(path + ".summary"):
+                os.remove(path + ".summary")
+        return llmide.process_content(content)
+
+    return run
+
+
+def fake_llm(system_prompt, user_message):
+    time.sleep(0.02)
+    return f"- {len(user_message)} characters summarized"
+
+
+def measure(run, repeat):
+    """Time run repeat times, returning the minimum and median wall time and the median CPU time."""
+    walls, cpus = [], []
+    for _ in range(repeat):
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        run()
+        walls.append(time.perf_counter() - start)
+        cpus.append(time.process_time() - cpu_start)
+    return {"min_seconds": min(walls), "median_seconds": statistics.median(walls),
+            "cpu_seconds": statistics.median(cpus), "repeat": repeat}
+
+
+def compare(results, baseline, threshold):
+    """Return {case: ratio} against the baseline, and the cases whose minimum time regressed."""
+    ratios, regressions = {}, []
+    for name, result in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        ratios[name] = result["min_seconds"] / reference["min_seconds"]
+        if (ratios[name] > 1 + threshold
+                and result["min_seconds"] - reference["min_seconds"] > NOISE_SECONDS):
+            regressions.append(name)
+    return ratios, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", default=None, help="comma-separated case names")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    options = parser.parse_args()
+
+    names = options.only.split(",") if options.only else list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)} (choose from {', '.join(CASES)})")
+
+    results = {}
+    tty = open(os.devnull, "w")
+    with tempfile.TemporaryDirectory() as directory, use_session(Session(tty=tty, llm_generate=fake_llm)):
+        for name in names:
+            run = CASES[name](options.scale, directory)
+            results[name] = measure(run, options.repeat)
+            del run
+    tty.close()
+
+    report = {"python": platform.python_version(), "machine": platform.machine(), "scale": options.scale,
+              "results": results}
+    baseline = None
+    if os.path.exists(options.baseline) and not options.save_baseline:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+        if baseline.get("scale") != options.scale:
+            print(f"baseline was recorded at scale {baseline.get('scale')}, not compared", file=sys.stderr)
+            baseline = None
+    ratios, regressions = compare(results, baseline, options.threshold) if baseline else ({}, [])
+    report["regressions"] = regressions
+
+    print(f"scale {options.scale}, best of {options.repeat}")
+    print(f"{'case':<32}{'min':>12}{'median':>12}{'cpu':>12}{'vs baseline':>14}")
+    for name, result in results.items():
+        change = f"{(ratios[name] - 1) * 100:+12.1f}%" if name in ratios else f"{'-':>13}"
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:<32}{result['min_seconds'] * 1000:9.1f} ms{result['median_seconds'] * 1000:9.1f} ms"
+              f"{result['cpu_seconds'] * 1000:9.1f} ms {change}{flag}")
+
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if options.save_baseline:
+        if options.only and os.path.exists(options.baseline):
+            with open(options.baseline) as file:
+                previous = json.load(file)
+            if previous.get("scale") == options.scale:
+                report["results"] = dict(previous.get("results", {}), **results)
+                report["regressions"] = []
+        with open(options.baseline, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"baseline written to {options.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,2 @@
 from .summarize import register_llm
+from .session import Session, use_session
@@ -0,0 +1,27 @@
+"""
+Command-line entry point: ``python -m llmide serve`` runs the daemon.
+"""
+
+import argparse
+
+from .protocol import default_socket_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="llmide")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run the llmide daemon on a Unix socket")
+    serve_parser.add_argument("--socket", default=None,
+                              help=f"socket path (default: $LLMIDE_SOCKET or {default_socket_path()})")
+    serve_parser.add_argument("--idle-timeout", type=float, default=None,
+                              help="seconds after which an unused session is closed")
+    options = parser.parse_args(argv)
+
+    if options.command == "serve":
+        from . import daemon
+        idle_timeout = options.idle_timeout if options.idle_timeout is not None else daemon.DEFAULT_IDLE_TIMEOUT
+        daemon.serve(options.socket, idle_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Index of the addresses in a module, for the address-based commands.
+
+Every address-based command used to walk the whole syntax tree, expressions
+included, to find one address, and kept walking after finding it.  The index
+is built in one walk over the statements of a module (expressions cannot
+contain definitions, so they are skipped) and cached with its tree in
+astcache, so every later lookup in the same source is a dictionary lookup.
+
+Addresses are found in two ways, as they always were:
+
+- symbols, used for reads and docstrings: every class, function and
+  assignment to a name, with functions adding their name to the addresses
+  inside them ("f.inner").  When an address occurs twice, the last one wins.
+- edit_targets, used for edits: CodeManipulator's targets, where functions do
+  not add to the addresses inside them and only assignments to a single name
+  count.  Every match is kept, as an edit may apply to all of them.
+
+When an address is missing, suggestions() lists the addresses the caller
+probably meant, for "did you mean" messages.
+
+Like codemanipulator, this module only uses the standard library.
+"""
+
+import ast
+import difflib
+
+try:
+    from . import astcache
+except ImportError:
+    # Imported as a top-level module, as the tests do.
+    import astcache
+
+MAX_SUGGESTIONS = 5
+
+
+class Symbol:
+    """
+    A class, function or assignment at an address.
+
+    Attributes:
+    address (str): The dot-separated address.
+    kind (str): "class", "function" or "assignment".
+    node (ast.AST): The definition or assignment.
+    start (int): The first line, counting decorators, 1-based.
+    end (int): The last line, 1-based.
+    """
+
+    __slots__ = ("address", "kind", "node", "start", "end")
+
+    def __init__(self, address, kind, node):
+        self.address = address
+        self.kind = kind
+        self.node = node
+        decorators = getattr(node, "decorator_list", None)
+        self.start = min(decorator.lineno for decorator in decorators) if decorators else node.lineno
+        self.end = node.end_lineno
+
+    def __repr__(self):
+        return f"Symbol({self.address!r}, {self.kind!r}, lines {self.start}-{self.end})"
+
+
+class AddressIndex:
+    """
+    The addresses of a parsed module.
+
+    Parameters:
+    tree (ast.Module): The module. The index keeps references to its nodes.
+
+    Attributes:
+    symbols (dict): Maps each address to its Symbol, for reads.
+    duplicates (set): The addresses in symbols that occur more than once.
+    edit_targets (dict): Maps each address to a list of (node, number of statements in its block), for edits.
+    module_functions (set): The names of the functions defined at module level.
+    """
+
+    def __init__(self, tree):
+        self.symbols = {}
+        self.duplicates = set()
+        self.edit_targets = {}
+        self.module_functions = {node.name for node in tree.body
+                                 if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+        self._visit_block(tree.body, [], [])
+
+    def _add(self, read_path, edit_path, node, siblings, kind):
+        if read_path is not None:
+            address = ".".join(read_path)
+            if address in self.symbols:
+                self.duplicates.add(address)
+            self.symbols[address] = Symbol(address, kind, node)
+        if edit_path is not None:
+            self.edit_targets.setdefault(".".join(edit_path), []).append((node, len(siblings)))
+
+    def _visit_block(self, statements, read_path, edit_path):
+        for statement in statements:
+            self._visit(statement, statements, read_path, edit_path)
+
+    def _visit(self, node, siblings, read_path, edit_path):
+        if isinstance(node, ast.ClassDef):
+            read_path, edit_path = read_path + [node.name], edit_path + [node.name]
+            self._add(read_path, edit_path, node, siblings, "class")
+            self._visit_block(node.body, read_path, edit_path)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            read_path = read_path + [node.name]
+            self._add(read_path, edit_path + [node.name], node, siblings, "function")
+            self._visit_block(node.body, read_path, edit_path)
+        elif isinstance(node, ast.Assign):
+            if isinstance(node.targets[0], ast.Name):
+                name = node.targets[0].id
+                single_name = len(node.targets) == 1
+                self._add(read_path + [name], edit_path + [name] if single_name else None, node, siblings, "assignment")
+        else:
+            for field in ("body", "orelse", "finalbody"):
+                block = getattr(node, field, None)
+                if isinstance(block, list):
+                    self._visit_block(block, read_path, edit_path)
+            for handler in getattr(node, "handlers", ()):
+                self._visit_block(handler.body, read_path, edit_path)
+            for case in getattr(node, "cases", ()):
+                self._visit_block(case.body, read_path, edit_path)
+
+    def lookup(self, address):
+        """Return the Symbol at address, or None."""
+        return self.symbols.get(address)
+
+    def suggestions(self, address, edit=False, limit=MAX_SUGGESTIONS):
+        """
+        Return the addresses that address was probably meant to be, best first.
+
+        Addresses ending in the same name come first, then addresses spelled similarly.
+
+        Parameters:
+        address (str): The missing address.
+        edit (bool): Whether to suggest edit targets rather than readable addresses.
+        limit (int): The most suggestions to return.
+        """
+        candidates = self.edit_targets if edit else self.symbols
+        name = address.rpartition(".")[2]
+        suggestions = [candidate for candidate in candidates if candidate.rpartition(".")[2] == name]
+        for candidate in difflib.get_close_matches(address, candidates, n=limit):
+            if candidate not in suggestions:
+                suggestions.append(candidate)
+        return suggestions[:limit]
+
+    def did_you_mean(self, address, edit=False):
+        """Return " Did you mean ...?" listing the suggestions for address, or "" if there are none."""
+        suggestions = self.suggestions(address, edit)
+        if not suggestions:
+            return ""
+        return " Did you mean " + ", ".join(f"'{suggestion}'" for suggestion in suggestions) + "?"
+
+
+def address_index(source_code):
+    """
+    Return the AddressIndex of source_code, built once per source and shared, so it must not be modified.
+
+    Raises:
+    SyntaxError: If source_code does not parse.
+    """
+    return astcache.derived(source_code, "address_index", AddressIndex)
@@ -0,0 +1,328 @@
+"""
+asyncio API for the command surface.
+
+The functions here mirror llmide.process_content and the commands in
+llmide_functions, as coroutines, so one event loop can drive many agent
+sessions at once:
+
+- process_content runs a response's commands as tasks, following the same
+  plan as the thread pool executor, and returns the same response.
+- run_console_command runs the command on a pseudo-terminal watched by the
+  event loop instead of a thread.
+- The web_* commands drive an AsyncWebBrowser through Playwright's async API.
+- File commands and everything else without an asyncio implementation run on
+  the default executor's worker threads.
+
+The synchronous functions keep their own implementations, so existing callers
+are unaffected.
+"""
+
+import asyncio
+import functools
+import os
+import time
+
+from . import llmide, llmide_functions, registry, tracing
+from .commandparser import parse_commands
+from .executor import DEFAULT_MAX_WORKERS, plan
+from .limits import kill_group, tripped_limit
+from .llmide import CommandResult, ResponseWriter
+from .ptyio import pump_pty_async
+from .session import current_session, use_session
+
+
+async def _execute_command(spec, arguments, backticks):
+    """Call spec.async_function, reporting errors as llmide._execute_command does."""
+    try:
+        args = registry.prepare_arguments(spec, arguments, backticks)
+    except ValueError as e:
+        return f"Error: {e}"
+    try:
+        result = await spec.async_function(*args)
+        return result if result is not None else "ok"
+    except Exception as e:
+        return f"Error executing command: {e}\n {spec.name}, {arguments}, {backticks}"
+
+
+async def _run_command(command):
+    """Execute a single CommandInfo and return its CommandResult."""
+    spec = registry.lookup(command.command)
+    if spec is None or spec.async_function is None:
+        return await asyncio.to_thread(llmide._run_command, command)
+    with tracing.async_span("command", command=command.command, cache_hit=False) as span:
+        response = await _execute_command(spec, command.arguments, command.backtick_content)
+        result = CommandResult(command, llmide._command_response(command.command, response), [])
+        if tracing.enabled():
+            span.set(**llmide._command_sizes(command, result))
+    return result
+
+
+async def _run_after(dependencies, semaphore, session, command):
+    if dependencies:
+        await asyncio.wait(dependencies)
+    # Each task has its own copy of the context, so setting the session here stays local to it.
+    with use_session(session):
+        async with semaphore:
+            return await _run_command(command)
+
+
+async def iter_process_content(content, max_concurrency=None, session=None):
+    """
+    Parse and execute every command in content, yielding a CommandResult per command.
+
+    Commands run as tasks in the order the executor plans for the thread pool: independent
+    commands overlap, conflicting ones wait, and commands on shared resources run alone.
+    Results are yielded in document order as soon as they are available.
+
+    Parameters:
+    content (str): The LLM response.
+    max_concurrency (int): How many commands may run at once. Defaults to DEFAULT_MAX_WORKERS.
+    session (Session): The session the commands run for, or None for the current session.
+
+    Returns:
+    async iterator of CommandResult: One result per command.
+    """
+    with tracing.span("parse", bytes_in=len(content)) as span:
+        commands = parse_commands(content)
+        span.set(commands=len(commands))
+    semaphore = asyncio.Semaphore(max_concurrency or DEFAULT_MAX_WORKERS)
+    tasks = []
+    try:
+        for step in plan(commands):
+            dependencies = [tasks[i] for i in step.dependencies]
+            tasks.append(asyncio.ensure_future(_run_after(dependencies, semaphore, session, step.command)))
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def process_content(content, max_concurrency=None, max_output_chars=None, session=None):
+    """
+    Parse and execute every command in content.
+
+    Parameters:
+    content (str): The LLM response.
+    max_concurrency (int): How many commands may run at once. Defaults to DEFAULT_MAX_WORKERS.
+    max_output_chars (int): Global budget for the combined command output, or None for no limit.
+    session (Session): The session the commands run for, or None for the current session.
+
+    Returns:
+    tuple: (response, image_data_tuple_array), as returned by llmide.process_content.
+    """
+    with tracing.async_span("process_content") as span:
+        writer = ResponseWriter(max_output_chars)
+        async for result in iter_process_content(content, max_concurrency=max_concurrency, session=session):
+            writer.add(result)
+        if tracing.enabled():
+            span.set(commands=writer.results, bytes_in=tracing.utf8_size(content),
+                     bytes_out=tracing.utf8_size(writer.getvalue()), omitted_chars=writer.omitted)
+        return writer.result()
+
+
+# ── Console ─────────────────────────────────────────────────────────
+
+async def _run_console(command, limits):
+    """
+    Run a prepared command line under limits in a fresh shell, echoing its output to the tty.
+
+    Returns:
+    ConsoleResult: The outcome of the command.
+    """
+    session = current_session()
+    tripped = None
+    capture = llmide_functions._new_console_capture(limits, lambda: kill_group(session.process.pid))
+
+    def echo_and_capture(data):
+        nonlocal tripped
+        capture.write(data)
+        if capture.limit_exceeded and not tripped:
+            tripped = "output_bytes"
+
+    deadline = time.monotonic() + limits.wall_seconds if limits.wall_seconds is not None else None
+    process, master_fd = llmide_functions._spawn_console(command, limits)
+    session.process = process
+    try:
+        usage, timed_out = await pump_pty_async(master_fd, process, echo_and_capture, deadline)
+        if timed_out:
+            tripped = "wall_seconds"
+            kill_group(process.pid)
+            usage, _ = await pump_pty_async(master_fd, process, echo_and_capture)
+    except asyncio.CancelledError:
+        kill_group(process.pid)
+        # Reaped on a worker thread, so other sessions on the loop keep running meanwhile.
+        await asyncio.to_thread(process.wait)
+        capture.finish()
+        raise
+    finally:
+        os.close(master_fd)
+        session.process = None
+    if not tripped:
+        tripped = tripped_limit(limits, process.returncode, usage)
+    return llmide_functions.ConsoleResult(capture.finish(), process.returncode, tripped, usage)
+
+
+async def run_console_command(command, *, limits=None):
+    """
+    Executes a console command and returns its output, as llmide_functions.run_console_command does.
+
+    Cancelling the call kills the command and everything it started.
+
+    Parameters:
+    command (str): The console command to be executed.
+    limits (ConsoleLimits): Limits for this call, instead of the session's default limits.
+
+    Returns:
+    str: The output from the command.
+    """
+    if llmide_functions.PERSISTENT_SHELL:
+        # The session's shell lock keeps its shell to one command at a time.
+        return await asyncio.to_thread(llmide_functions.run_console_command, command, limits=limits)
+    limits = limits if limits is not None else llmide_functions._console_limits()
+    try:
+        result = await _run_console(llmide_functions._prepare_console_command(command), limits)
+    except Exception as e:
+        return f"An error occurred: {str(e)}"
+    return llmide_functions._report_console_result(result, limits)
+
+
+# ── Files ───────────────────────────────────────────────────────────
+
+def _threaded(function):
+    """Wrap a blocking command as a coroutine function that runs it on a worker thread."""
+    @functools.wraps(function)
+    async def wrapper(*args):
+        return await asyncio.to_thread(function, *args)
+    return wrapper
+
+
+read_file = _threaded(llmide_functions.read_file)
+read_file_lines = _threaded(llmide_functions.read_file_lines)
+read_code_at_address = _threaded(llmide_functions.read_code_at_address)
+read_code_signatures_and_docstrings = _threaded(llmide_functions.read_code_signatures_and_docstrings)
+write_file = _threaded(llmide_functions.write_file)
+append_to_file = _threaded(llmide_functions.append_to_file)
+find_and_replace = _threaded(llmide_functions.find_and_replace)
+insert_text_after_matching_line = _threaded(llmide_functions.insert_text_after_matching_line)
+insert_text_before_matching_line = _threaded(llmide_functions.insert_text_before_matching_line)
+replace_text_before_matching_line = _threaded(llmide_functions.replace_text_before_matching_line)
+replace_text_after_matching_line = _threaded(llmide_functions.replace_text_after_matching_line)
+replace_text_between_matching_lines = _threaded(llmide_functions.replace_text_between_matching_lines)
+replace_docstring_at_address = _threaded(llmide_functions.replace_docstring_at_address)
+replace_code_at_address = _threaded(llmide_functions.replace_code_at_address)
+add_code_after_address = _threaded(llmide_functions.add_code_after_address)
+add_code_before_address = _threaded(llmide_functions.add_code_before_address)
+remove_code_at_address = _threaded(llmide_functions.remove_code_at_address)
+apply_code_edits = _threaded(llmide_functions.apply_code_edits)
+manipulate_file_agent = _threaded(llmide_functions.manipulate_file_agent)
+summarize = _threaded(llmide_functions.summarize)
+find_symbol = _threaded(llmide_functions.find_symbol)
+list_symbols = _threaded(llmide_functions.list_symbols)
+
+
+# ── Web Browser Commands (Playwright async API) ─────────────────────
+
+def get_async_browser():
+    """Return the current session's AsyncWebBrowser, importing Playwright on first use."""
+    return llmide_functions._web_browser().get_async_browser()
+
+
+async def close_async_browser():
+    """Close the current session's async browser if it exists."""
+    if current_session().async_browser is not None:
+        await llmide_functions._web_browser().close_async_browser()
+
+async def web_navigate(url):
+    """Navigate the browser to a URL. See llmide_functions.web_navigate."""
+    return await get_async_browser().navigate(url)
+
+
+async def web_back():
+    """Go back one page in browser history."""
+    return await get_async_browser().back()
+
+
+async def web_forward():
+    """Go forward one page in browser history."""
+    return await get_async_browser().forward()
+
+
+async def web_read(*args):
+    """Read the visible text content of the current page or a specific element. See llmide_functions.web_read."""
+    selector = args[0] if args else None
+    return await get_async_browser().read_text(selector)
+
+
+async def web_read_html(*args):
+    """Read the HTML of the current page or a specific element. See llmide_functions.web_read_html."""
+    selector = args[0] if args else None
+    return await get_async_browser().read_html(selector)
+
+
+async def web_links():
+    """List all links on the current page."""
+    return await get_async_browser().get_links()
+
+
+async def web_click(selector):
+    """Click an element on the page. See llmide_functions.web_click."""
+    return await get_async_browser().click(selector)
+
+
+async def web_type(selector, text):
+    """Type text into an input element. See llmide_functions.web_type."""
+    return await get_async_browser().type_text(selector, text)
+
+
+async def web_press_key(key):
+    """Press a keyboard key. See llmide_functions.web_press_key."""
+    return await get_async_browser().press_key(key)
+
+
+async def web_select(selector, value):
+    """Select an option from a dropdown. See llmide_functions.web_select."""
+    return await get_async_browser().select_option(selector, value)
+
+
+async def web_screenshot(*args):
+    """Take a screenshot of the page or a specific element. See llmide_functions.web_screenshot."""
+    if not args:
+        return "Error: web_screenshot requires at least a file path."
+    file_path = args[0]
+    selector = args[1] if len(args) > 1 else None
+    return await get_async_browser().screenshot(file_path, selector=selector)
+
+
+async def web_execute_js(*args):
+    """Execute JavaScript on the current page. See llmide_functions.web_execute_js."""
+    script = args[-1] if args else None
+    if not script:
+        return "Error: web_execute_js requires JavaScript code in a backtick block."
+    return await get_async_browser().execute_js(script)
+
+
+async def web_wait(selector, *args):
+    """Wait for an element to appear on the page. See llmide_functions.web_wait."""
+    timeout = int(args[0]) if args else 10000
+    return await get_async_browser().wait_for_selector(selector, timeout=timeout)
+
+
+async def web_page_info():
+    """Get information about the current page."""
+    return await get_async_browser().get_page_info()
+
+
+async def web_close():
+    """Close the browser and free resources."""
+    await close_async_browser()
+    return "Browser closed."
+
+
+def _register_async_commands():
+    registry.register_async("run_console_command", run_console_command)
+    for name in registry._BROWSER_COMMANDS:
+        registry.register_async(name, globals()[name])
+
+
+_register_async_commands()
@@ -0,0 +1,142 @@
+"""
+Cache of parsed syntax trees for codemanipulator.
+
+Reading several addresses of a large module in a row used to parse the whole
+source once per read.  The cache keeps the tree of each recently parsed
+source, keyed by a hash of its content, together with metadata derived from
+it (the signatures listing, the address index), so repeated operations on
+unchanged source reuse them.
+
+Trees and metadata handed to readers are shared and must not be modified.
+The edits mutate the tree they are given, so take() always parses a private
+tree for them: readers in other threads or daemon sessions may still hold
+metadata, such as an address index, that points into the cached tree's nodes
+for as long as they like, so the cached tree is never handed over.  Parsing
+is several times faster than copying a tree.
+
+Entries are evicted least recently used once their estimated size passes the
+memory budget.  The cache is shared by the whole process: entries are keyed
+by content, so sessions and files with the same source share them.
+
+Hits are recorded on the current tracing span as cache_hit and ast_cache_hit,
+the latter telling them apart from file cache hits.
+
+Like codemanipulator, this module only uses the standard library (and
+tracing, which does too), so both can be imported outside the package.
+"""
+
+import ast
+import collections
+import hashlib
+import threading
+
+try:
+    from . import tracing
+except ImportError:
+    # Imported as a top-level module, as the tests do.
+    import tracing
+
+# A parsed tree takes roughly this many bytes per character of source.
+TREE_BYTES_PER_CHAR = 56
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class _Entry:
+    __slots__ = ("tree", "size", "derived")
+
+    def __init__(self, tree, size):
+        self.tree = tree
+        self.size = size
+        self.derived = {}
+
+
+class ASTCache:
+    """
+    A least-recently-used cache of parsed trees and metadata derived from them, keyed by source content.
+
+    Parameters:
+    max_bytes (int): The estimated memory the cached trees may use.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def derived(self, source_code, name, build):
+        """
+        Return build(tree) for the tree of source_code, computed once per source and cached under name.
+
+        The result is shared, so it must not be modified.
+
+        Raises:
+        SyntaxError: If source_code does not parse.
+        """
+        entry = self._entry(source_code)
+        if name not in entry.derived:
+            entry.derived[name] = build(entry.tree)
+        return entry.derived[name]
+
+    def take(self, source_code):
+        """
+        Return a tree of source_code that the caller may modify.
+
+        The tree is always parsed afresh: the cached one may still be in use through metadata derived from it.
+        """
+        return ast.parse(source_code)
+
+    def clear(self):
+        """Drop every cached tree."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _entry(self, source_code):
+        """Return the entry of source_code, parsing it if needed."""
+        key = _hash(source_code)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                tracing.annotate(cache_hit=True, ast_cache_hit=True)
+                return entry
+            self.misses += 1
+        entry = _Entry(ast.parse(source_code), len(source_code) * TREE_BYTES_PER_CHAR)
+        with self._lock:
+            # Another thread may have parsed the same source meanwhile; keep the first tree.
+            existing = self._entries.get(key)
+            if existing is not None:
+                return existing
+            if entry.size <= self.max_bytes:
+                self._entries[key] = entry
+                self.size += entry.size
+                while self.size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.size -= evicted.size
+        return entry
+
+
+def _hash(source_code):
+    return hashlib.blake2b(source_code.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+_cache = ASTCache()
+
+
+def get_cache():
+    """Return the process-wide cache."""
+    return _cache
+
+
+def derived(source_code, name, build):
+    """Return metadata derived from the tree of source_code; see ASTCache.derived."""
+    return _cache.derived(source_code, name, build)
+
+
+def take(source_code):
+    """Return a private tree of source_code that may be modified; see ASTCache.take."""
+    return _cache.take(source_code)
@@ -0,0 +1,192 @@
+"""
+Bounded capture of console output.
+
+A command can print gigabytes, but only the beginning and the end are worth
+showing to the LLM.  HeadTailBuffer keeps a fixed-size head and a ring-buffer
+tail in preallocated bytearrays and counts what falls in between.  When asked
+to, it spills the complete stream to a temporary file the first time the tail
+overflows, so the full output can still be paged through later.
+"""
+
+import os
+import tempfile
+
+from .compact import ConsoleCompactor
+
+DEFAULT_HEAD_BYTES = 4096
+DEFAULT_TAIL_BYTES = 4096
+
+
+class HeadTailBuffer:
+    """
+    Keeps the first head_size and the last tail_size bytes written to it.
+
+    Parameters:
+    head_size (int): Number of bytes kept from the start of the stream.
+    tail_size (int): Number of bytes kept from the end of the stream.
+    spill (bool): Whether to save the complete stream to a temporary file once output is dropped.
+    """
+
+    def __init__(self, head_size=DEFAULT_HEAD_BYTES, tail_size=DEFAULT_TAIL_BYTES, spill=False):
+        self.head_size = head_size
+        self.tail_size = tail_size
+        self.spill = spill
+        self.spill_path = None
+        self.total_bytes = 0
+        self.total_lines = 0
+        self._head = bytearray()
+        self._tail = bytearray(tail_size)
+        self._tail_start = 0
+        self._tail_length = 0
+        self._spill_file = None
+
+    def write(self, data):
+        """Add bytes to the stream."""
+        if not data:
+            return
+        self.total_bytes += len(data)
+        self.total_lines += data.count(b"\n")
+        if self._spill_file is not None:
+            self._spill_file.write(data)
+
+        room = self.head_size - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+            if not data:
+                return
+        if self.spill and self._spill_file is None and self._tail_length + len(data) > self.tail_size:
+            self._start_spill(data)
+        self._append_tail(data)
+
+    def _append_tail(self, data):
+        size = self.tail_size
+        if size == 0:
+            return
+        if len(data) >= size:
+            self._tail[:] = data[-size:]
+            self._tail_start = 0
+            self._tail_length = size
+            return
+        end = (self._tail_start + self._tail_length) % size
+        first = min(len(data), size - end)
+        self._tail[end:end + first] = data[:first]
+        self._tail[:len(data) - first] = data[first:]
+        overflow = self._tail_length + len(data) - size
+        if overflow > 0:
+            self._tail_start = (self._tail_start + overflow) % size
+            self._tail_length = size
+        else:
+            self._tail_length += len(data)
+
+    def _start_spill(self, data):
+        # Nothing has been dropped yet, so head and tail still hold the whole stream so far.
+        self._spill_file = tempfile.NamedTemporaryFile(prefix="llmide-console-", suffix=".log", delete=False)
+        self.spill_path = self._spill_file.name
+        self._spill_file.write(self.head())
+        self._spill_file.write(self.tail())
+        self._spill_file.write(data)
+
+    def head(self):
+        """Return the kept bytes from the start of the stream."""
+        return bytes(self._head)
+
+    def tail(self):
+        """Return the kept bytes from the end of the stream."""
+        end = self._tail_start + self._tail_length
+        if end <= self.tail_size:
+            return bytes(self._tail[self._tail_start:end])
+        return bytes(self._tail[self._tail_start:]) + bytes(self._tail[:end - self.tail_size])
+
+    @property
+    def dropped_bytes(self):
+        """Number of bytes between the head and the tail that were not kept."""
+        return self.total_bytes - len(self._head) - self._tail_length
+
+    @property
+    def dropped_lines(self):
+        """Number of line breaks between the head and the tail that were not kept."""
+        return self.total_lines - self._head.count(b"\n") - self.tail().count(b"\n")
+
+    def render(self, encoding="utf-8"):
+        """
+        Decode the kept output, marking the omitted middle of the stream.
+
+        Returns:
+        str: The head, a note on what was omitted (and where the full stream was saved) and the tail.
+        """
+        head = self.head().decode(encoding, errors="replace")
+        tail = self.tail().decode(encoding, errors="replace")
+        if not self.dropped_bytes:
+            return head + tail
+        note = f"\n... [{self.dropped_bytes} bytes, {self.dropped_lines} lines omitted] ...\n"
+        if self.spill_path:
+            note += f"[Full output saved to {self.spill_path}; page through it with read_file_lines]\n"
+        return head + note + tail
+
+    def close(self):
+        """Finish the spill file, if one was started."""
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+
+class ConsoleCapture:
+    """
+    Everything a console command's output passes through: tty echo, optional compaction,
+    the head/tail buffer and the output limit.
+
+    Parameters:
+    head_size (int): Number of bytes kept from the start of the (compacted) stream.
+    tail_size (int): Number of bytes kept from the end of the (compacted) stream.
+    spill (bool): Whether to save the stream to a temporary file; with compaction, the raw stream.
+    compact (bool): Whether to pass the stream through a ConsoleCompactor.
+    echo: A TtyEcho, or None to not echo.
+    output_limit (int): Raw bytes after which on_limit is called once, or None.
+    on_limit (callable): Called without arguments when the output limit is exceeded.
+    """
+
+    def __init__(self, head_size, tail_size, spill=False, compact=False, echo=None, output_limit=None,
+                 on_limit=None):
+        self.buffer = HeadTailBuffer(head_size, tail_size, spill=spill and not compact)
+        self.compactor = ConsoleCompactor(self.buffer, spill=spill) if compact else None
+        self.echo = echo
+        self.output_limit = output_limit
+        self.on_limit = on_limit
+        self.raw_bytes = 0
+        self.limit_exceeded = False
+
+    def write(self, data):
+        """Echo and capture a chunk of raw output."""
+        if self.echo is not None:
+            self.echo.write(data)
+        (self.compactor or self.buffer).write(data)
+        self.raw_bytes += len(data)
+        if self.output_limit is not None and self.raw_bytes > self.output_limit and not self.limit_exceeded:
+            self.limit_exceeded = True
+            if self.on_limit is not None:
+                self.on_limit()
+
+    def finish(self):
+        """
+        Flush every stage and render the captured output.
+
+        Returns:
+        str: The output, with notes on what compaction removed and where the raw stream was saved.
+        """
+        if self.echo is not None:
+            self.echo.flush(final=True)
+        compactor = self.compactor
+        if compactor is not None:
+            compactor.close()
+        self.buffer.close()
+        rendered = self.buffer.render()
+        if compactor is not None:
+            if compactor.saved_bytes:
+                rendered += (f"\n[Compacted: {compactor.saved_bytes} of {compactor.raw_bytes} bytes of progress "
+                             f"redraws, escape codes and repeated lines removed]")
+            if compactor.spill_path and (compactor.saved_bytes or self.buffer.dropped_bytes):
+                rendered += f"\n[Raw output saved to {compactor.spill_path}; page through it with read_file_lines]"
+            elif compactor.spill_path:
+                os.remove(compactor.spill_path)
+        return rendered
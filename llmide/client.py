@@ -0,0 +1,235 @@
+"""
+Thin client for the llmide daemon.
+
+process_content here has the same result as llmide.process_content, but the
+commands run in a long-lived daemon (see daemon), so the calling process
+never imports the heavy parts of llmide.  The first call connects to the
+daemon, starting it if needed, and opens a session that lasts until close()
+or until the daemon evicts it as idle, in which case a new one is opened.
+Commands run in the daemon's working directory, so each working directory
+has its own daemon, and changing directory moves on to the daemon there.
+What the commands write to the tty or with the stdout command is sent back
+with each reply and written to this process's tty and stdout.  A request
+that gets no reply within REQUEST_TIMEOUT raises DaemonTimeoutError, so a
+hung daemon cannot hang the agent.
+
+This module only imports the standard library and llmide.protocol.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from .protocol import default_socket_path, receive_message, send_message
+
+
+# Seconds a request may wait for the daemon's reply, from $LLMIDE_CLIENT_TIMEOUT; 0 waits indefinitely.
+REQUEST_TIMEOUT = float(os.getenv("LLMIDE_CLIENT_TIMEOUT", "1800")) or None
+
+
+class DaemonError(RuntimeError):
+    """An error reported by the daemon."""
+
+
+class DaemonTimeoutError(DaemonError, TimeoutError):
+    """The daemon did not reply in time; the connection is closed."""
+
+
+# Feedback goes to /dev/tty, as it does in llmide_functions; opened on first use.
+_tty = None
+
+
+def _get_tty():
+    """Return /dev/tty, opening it on first use. Falls back to stderr."""
+    global _tty
+    if _tty is None:
+        try:
+            _tty = open("/dev/tty", "w")
+        except OSError:
+            _tty = sys.stderr
+    return _tty
+
+
+def _write_output(stream, text):
+    if text:
+        stream.write(text)
+        stream.flush()
+
+
+class DaemonClient:
+    """
+    A connection to the llmide daemon.
+
+    Parameters:
+    socket_path (str): The daemon's socket, or None for protocol.default_socket_path().
+    timeout (float): Seconds to wait for each reply, or None to wait indefinitely.
+    """
+
+    def __init__(self, socket_path=None, timeout=REQUEST_TIMEOUT):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        try:
+            self._socket.connect(self.socket_path)
+        except OSError:
+            self._socket.close()
+            raise
+
+    def request(self, op, **fields):
+        """
+        Send a request and return the reply.
+
+        Raises:
+        DaemonError: If the daemon reports an error.
+        DaemonTimeoutError: If the daemon does not reply within the timeout.
+        ConnectionError: If the daemon closes the connection.
+        """
+        try:
+            send_message(self._socket, dict(fields, op=op))
+            reply = receive_message(self._socket)
+        except TimeoutError:
+            # A late reply would be taken for the reply to the next request.
+            self.close()
+            raise DaemonTimeoutError(f"The llmide daemon on {self.socket_path} did not reply to {op!r} within "
+                                     f"{self.timeout}s; the connection was closed.")
+        if reply is None:
+            raise ConnectionError("The llmide daemon closed the connection.")
+        if "error" in reply:
+            raise DaemonError(reply["error"])
+        return reply
+
+    def open_session(self):
+        """
+        Open a session and return its id.
+
+        Raises:
+        DaemonError: If the daemon runs commands in another working directory than this process.
+        """
+        return self.request("open", cwd=os.getcwd())["session"]
+
+    def process_content(self, session, content, max_output_chars=None):
+        """
+        Execute the commands in content in session, writing their tty feedback and stdout output here.
+
+        Returns:
+        tuple: (response, image_data_tuple_array), as returned by llmide.process_content.
+        """
+        reply = self.request("process", session=session, content=content, max_output_chars=max_output_chars)
+        _write_output(_get_tty(), reply.get("tty"))
+        _write_output(sys.stdout, reply.get("stdout"))
+        return reply["response"], [tuple(image) for image in reply["images"]]
+
+    def close_session(self, session):
+        """Close session, stopping its console processes and browser."""
+        return self.request("close", session=session)["closed"]
+
+    def close(self):
+        """Close the connection. Sessions stay open in the daemon until closed or evicted."""
+        self._socket.close()
+
+
+def start_daemon(socket_path=None, timeout=30):
+    """
+    Start a daemon in the background and wait until it accepts connections.
+
+    The daemon inherits the working directory, so relative paths in commands resolve as
+    they would in this process, and only serves sessions opened from that directory.
+
+    Returns:
+    DaemonClient: A connection to the new daemon.
+    """
+    socket_path = socket_path or default_socket_path()
+    # Import this copy of llmide, and not a module that happens to share its name in the working directory.
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment = dict(os.environ, PYTHONSAFEPATH="1")
+    environment["PYTHONPATH"] = os.pathsep.join(filter(None, [package_parent, os.getenv("PYTHONPATH")]))
+    subprocess.Popen([sys.executable, "-m", "llmide", "serve", "--socket", socket_path], env=environment,
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return DaemonClient(socket_path)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"The llmide daemon did not start listening on {socket_path} within {timeout}s.")
+            time.sleep(0.05)
+
+
+def connect(socket_path=None, autostart=True):
+    """Connect to the daemon on socket_path, starting one if none is running and autostart is set."""
+    try:
+        return DaemonClient(socket_path)
+    except OSError:
+        if not autostart:
+            raise
+        return start_daemon(socket_path)
+
+
+_client = None
+_session = None
+# The working directory the session was opened in, and the socket path the caller asked for.
+_cwd = None
+_socket_path = None
+
+
+def process_content(content, max_output_chars=None, socket_path=None):
+    """
+    Parse and execute every command in content in the daemon.
+
+    Parameters:
+    content (str): The LLM response.
+    max_output_chars (int): Global budget for the combined command output, or None for no limit.
+    socket_path (str): The daemon's socket, or None for protocol.default_socket_path(). Kept for
+                       later calls.
+
+    Returns:
+    tuple: (response, image_data_tuple_array), as returned by llmide.process_content.
+    """
+    global _client, _session, _cwd, _socket_path
+    if socket_path is not None:
+        _socket_path = socket_path
+    if _client is not None and _cwd != os.getcwd():
+        # The session's daemon runs commands in the old directory.
+        try:
+            _close_session()
+        except (OSError, DaemonError):
+            pass
+    if _client is None:
+        _client = connect(_socket_path)
+        _cwd = os.getcwd()
+    if _session is None:
+        _session = _client.open_session()
+    try:
+        return _client.process_content(_session, content, max_output_chars)
+    except DaemonTimeoutError:
+        # The connection is closed; the next call reconnects, to the same session if it is still open.
+        _client = None
+        raise
+    except DaemonError as e:
+        if not str(e).startswith("No session"):
+            raise
+    # The daemon evicted the idle session; carry on in a fresh one.
+    _session = _client.open_session()
+    return _client.process_content(_session, content, max_output_chars)
+
+
+def _close_session():
+    global _client, _session
+    if _client is not None:
+        try:
+            if _session is not None:
+                _client.close_session(_session)
+        finally:
+            _client.close()
+    _client = None
+    _session = None
+
+
+def close():
+    """Close this process's daemon session and connection, and forget the socket path."""
+    global _socket_path
+    _socket_path = None
+    _close_session()
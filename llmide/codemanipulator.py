@@ -1,31 +1,23 @@
 import ast
-import black
 import textwrap
 import re
 import io
 import tokenize
 
-def syntax_check(code):
-    try:
-        io_obj = io.StringIO(code)
-        list(tokenize.generate_tokens(io_obj.readline))
-        ast.parse(code)
-        return True
-    except (SyntaxError, tokenize.TokenError):
-        return False
-
-def format_code(code):
-    try:
-        formatted_code = black.format_str(code, mode=black.FileMode())
-        if syntax_check(formatted_code):
-            return formatted_code
-        else:
-            raise SyntaxError("Syntax check failed after formatting")
-    except black.parsing.InvalidInput:
-        if syntax_check(code):
-            return code
-        else:
-            raise SyntaxError("Syntax check failed on original code")
+try:
+    from . import addressindex, astcache, formatting, splice
+except ImportError:
+    # Imported as a top-level module, as the tests do.
+    import addressindex
+    import astcache
+    import formatting
+    import splice
+
+syntax_check = formatting.syntax_check
+
+def format_code(code, line_length=formatting.DEFAULT_LINE_LENGTH):
+    # Results are cached by content, and may come from the formatting worker; see formatting.
+    return formatting.format_code(code, line_length)
 
 def read_code(file_path):
     try:
@@ -48,6 +40,8 @@ def add_prefix_to_lines(input_string, prefix):
     result_string = '\n'.join(prefixed_lines)
     return result_string
 
+_BLOCK_ITEMS = (ast.stmt, ast.excepthandler, ast.match_case)
+
 class CodeManipulator(ast.NodeTransformer):
     def __init__(self, target, new_code=None, insert_position=None, action="replace"):
         self.target = target
@@ -139,8 +133,7 @@ class CodeManipulator(ast.NodeTransformer):
                 elif self.insert_position == "before":
                     return self.new_code_ast + [node]
 
-        node.body = [self.visit(stmt) for stmt in node.body]
-        return node
+        return self.generic_visit(node)
 
     def visit_Assign(self, node):
         if len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
@@ -170,8 +163,9 @@ class CodeManipulator(ast.NodeTransformer):
         return node
 
     def generic_visit(self, node):
+        # Only statements are targets and expressions cannot contain statements, so only blocks are walked.
         for field, old_value in ast.iter_fields(node):
-            if isinstance(old_value, list):
+            if isinstance(old_value, list) and old_value and isinstance(old_value[0], _BLOCK_ITEMS):
                 new_values = []
                 for value in old_value:
                     if isinstance(value, ast.AST):
@@ -183,38 +177,145 @@ class CodeManipulator(ast.NodeTransformer):
                         else:
                             new_values.append(value)
                 old_value[:] = new_values
-            elif isinstance(old_value, ast.AST):
-                new_node = self.visit(old_value)
-                if new_node is None:
-                    delattr(node, field)
-                else:
-                    setattr(node, field, new_node)
         return node
 
 def convert_double_quotes_to_single(code):
-    def replace_quotes(match):
-        # Check if the match is within an f-string, decorator, print statement, or return statement
-        if re.search(r'(f|@\w+\(|print\(|return ).*' + re.escape(match.group(0)) + r'.*[\)]?', code):
-            return match.group(0)  # Keep double quotes in f-strings, decorator arguments, print statements, and return statements
-        return "'" + match.group(1).replace("'", "\\'") + "'"
-    
-    # Protect multiline f-strings
-    code = re.sub(r'(f""".*?""")', lambda m: m.group(1), code, flags=re.DOTALL)
-    code = re.sub(r"(f'''.*?''')", lambda m: m.group(1), code, flags=re.DOTALL)
-    
-    # Replace double-quoted strings with single-quoted strings, except in f-strings, decorator arguments, print statements, and return statements
-    code = re.sub(r'"([^"\\]*(?:\\.[^"\\]*)*)"', replace_quotes, code)
-    
-    return code
+    """
+    Rewrite double-quoted string literals in code with single quotes.
+
+    Double quotes are kept in f-strings, docstrings, decorator arguments, print calls and return
+    statements, and in strings whose text contains a single quote, which would need escaping.
+    The literals are found from the syntax tree, so the conversion takes one pass over the code.
+
+    Parameters:
+    code (str): Python source code.
+
+    Returns:
+    str: The code with its other double-quoted strings single-quoted, or unchanged if it does not parse.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code
+    source = code.encode("utf-8")
+    line_offsets = [0]
+    for line in source.split(b"\n"):
+        line_offsets.append(line_offsets[-1] + len(line) + 1)
+    finder = _ConvertibleStrings()
+    finder.visit(tree)
+
+    parts = []
+    copied = 0
+    # The visitor finds dictionary keys before values, and so on; splice in source order.
+    for node in sorted(finder.strings, key=lambda node: (node.lineno, node.col_offset)):
+        start = line_offsets[node.lineno - 1] + node.col_offset
+        end = line_offsets[node.end_lineno - 1] + node.end_col_offset
+        segment = source[start:end].decode("utf-8")
+        converted = _convert_literals(segment)
+        if converted != segment:
+            parts.append(source[copied:start])
+            parts.append(converted.encode("utf-8"))
+            copied = end
+    parts.append(source[copied:])
+    return b"".join(parts).decode("utf-8")
+
+class _ConvertibleStrings(ast.NodeVisitor):
+    """Collects the string constants whose quotes may be converted."""
+
+    def __init__(self):
+        self.strings = []
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, (str, bytes)):
+            self.strings.append(node)
+
+    def visit_JoinedStr(self, node):
+        pass
+
+    def visit_Return(self, node):
+        pass
+
+    def visit_Call(self, node):
+        if not (isinstance(node.func, ast.Name) and node.func.id == "print"):
+            self.generic_visit(node)
+
+    def visit_Module(self, node):
+        self._visit_body(node.body)
+
+    def visit_ClassDef(self, node):
+        for child in node.bases + node.keywords:
+            self.visit(child)
+        self._visit_body(node.body)
+
+    def visit_FunctionDef(self, node):
+        self.visit(node.args)
+        if node.returns is not None:
+            self.visit(node.returns)
+        self._visit_body(node.body)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def _visit_body(self, body):
+        first = body[0] if body else None
+        if isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant) and isinstance(first.value.value, str):
+            body = body[1:]
+        for statement in body:
+            self.visit(statement)
+
+_DOUBLE_QUOTED = re.compile(r'[rRbBuU]{0,2}(?:"""(?:[^"\\]|\\.|"(?!""))*"""|"(?:[^"\\\n]|\\.)*")', re.DOTALL)
+
+def _convert_literals(segment):
+    """Convert the literals of one string constant, which may be several literals implicitly concatenated."""
+    if _DOUBLE_QUOTED.fullmatch(segment):
+        return _single_quoted(segment)
+    if segment.lstrip("rRbBuU").startswith("'") and "\n" not in segment:
+        return segment
+    # Several literals, possibly on several lines with comments between them.
+    parts = []
+    copied = 0
+    line_offsets = [0]
+    for line in segment.split("\n"):
+        line_offsets.append(line_offsets[-1] + len(line) + 1)
+    for token in tokenize.generate_tokens(io.StringIO("(" + segment + ")").readline):
+        if token.type == tokenize.STRING:
+            row, column = token.start
+            start = line_offsets[row - 1] + column - (1 if row == 1 else 0)
+            parts.append(segment[copied:start])
+            parts.append(_single_quoted(token.string))
+            copied = start + len(token.string)
+    parts.append(segment[copied:])
+    return "".join(parts)
+
+def _single_quoted(literal):
+    """Return a string literal with double quotes as a single-quoted one, when that needs no escaping."""
+    prefix_length = len(literal) - len(literal.lstrip("rRbBuU"))
+    prefix, quoted = literal[:prefix_length], literal[prefix_length:]
+    if not quoted.startswith('"'):
+        return literal
+    quote = '"""' if quoted.startswith('"""') else '"'
+    body = quoted[len(quote):-len(quote)]
+    if "'" in body:
+        return literal
+    single = "\'" * len(quote)
+    return prefix + single + body + single
+
+def _format_fragment(code, line_length):
+    return convert_double_quotes_to_single(format_code(code, line_length))
 
 def _create_or_replace_code(source_code, address, new_code, create_if_missing, insert_position=None, action="replace"):
-    tree = ast.parse(source_code)
+    spliced = splice.splice_code(source_code, address, new_code, action, insert_position, _format_fragment)
+    if spliced is not None:
+        return spliced
+    if not create_if_missing:
+        index = addressindex.address_index(source_code)
+        if address not in index.edit_targets:
+            raise ValueError(
+                f"The target '{address}' does not exist and 'create_if_missing' is set to False."
+                + index.did_you_mean(address, edit=True)
+            )
+    tree = astcache.take(source_code)
     manipulator = CodeManipulator(address, new_code, insert_position, action)
     modified_tree = manipulator.visit(tree)
-    if not manipulator.found and not create_if_missing:
-        raise ValueError(
-            f"The target '{address}' does not exist and 'create_if_missing' is set to False."
-        )
     modified_code = ast.unparse(modified_tree)
     formatted_code = format_code(modified_code)
     return convert_double_quotes_to_single(formatted_code)
@@ -226,11 +327,15 @@ def replace_code(source_code, address, new_code):
     return _create_or_replace_code(source_code, address, new_code, create_if_missing=False, action="replace")
 
 def remove_code(source_code, address):
-    tree = ast.parse(source_code)
+    spliced = splice.splice_code(source_code, address, None, "remove")
+    if spliced is not None:
+        return spliced
+    index = addressindex.address_index(source_code)
+    if address not in index.edit_targets:
+        raise ValueError(f"The target '{address}' does not exist." + index.did_you_mean(address, edit=True))
+    tree = astcache.take(source_code)
     manipulator = CodeManipulator(address, action="remove")
     modified_tree = manipulator.visit(tree)
-    if not manipulator.found:
-        raise ValueError(f"The target '{address}' does not exist.")
     modified_code = ast.unparse(modified_tree)
     formatted_code = format_code(modified_code)
     return convert_double_quotes_to_single(formatted_code)
@@ -252,7 +357,9 @@ def get_signatures_and_docstrings(source_code):
     Returns:
     str: String representation of the code structure including signatures and docstrings.
     """
-    tree = ast.parse(source_code)
+    return astcache.derived(source_code, "signatures", _signatures_and_docstrings)
+
+def _signatures_and_docstrings(tree):
     result_lines = []
 
     class SignatureVisitor(ast.NodeVisitor):
@@ -313,52 +420,27 @@ def get_signatures_and_docstrings(source_code):
     return '\n'.join(result_lines).strip()
 
 def read_code_at_address(source_code, address):
-    tree = ast.parse(source_code)
-    class ReadCodeVisitor(ast.NodeVisitor):
-        def __init__(self):
-            self.path = []
-            self.code_snippet = None
-
-        def visit_ClassDef(self, node):
-            self.path.append(node.name)
-            if ".".join(self.path) == address:
-                self.code_snippet = ast.get_source_segment(source_code, node)
-            self.generic_visit(node)
-            self.path.pop()
-
-        def visit_FunctionDef(self, node):
-            self._visit_function(node)
-
-        def visit_AsyncFunctionDef(self, node):
-            self._visit_function(node)
-
-        def _visit_function(self, node):
-            self.path.append(node.name)
-            if ".".join(self.path) == address:
-                start_lineno = min(decorator.lineno for decorator in node.decorator_list) if node.decorator_list else node.lineno
-                end_lineno = node.end_lineno
-                lines = source_code.splitlines()[start_lineno-1:end_lineno]
-                self.code_snippet = "\n".join(lines)
-            self.generic_visit(node)
-            self.path.pop()
-
-        def visit_Assign(self, node):
-            if isinstance(node.targets[0], ast.Name):
-                self.path.append(node.targets[0].id)
-                if ".".join(self.path) == address:
-                    self.code_snippet = ast.get_source_segment(source_code, node)
-                self.path.pop()
-            self.generic_visit(node)
-
-    visitor = ReadCodeVisitor()
-    visitor.visit(tree)
-    if visitor.code_snippet:
-        return visitor.code_snippet
+    index = addressindex.address_index(source_code)
+    symbol = index.lookup(address)
+    code_snippet = None
+    if symbol is not None and symbol.kind == "function":
+        lines = source_code.splitlines()[symbol.start-1:symbol.end]
+        code_snippet = "\n".join(lines)
+    elif symbol is not None:
+        code_snippet = ast.get_source_segment(source_code, symbol.node)
+    if code_snippet:
+        return code_snippet
     else:
-        return f"No code found at address '{address}'."
+        return f"No code found at address '{address}'." + index.did_you_mean(address)
 
 def change_docstring(source_code, address, new_docstring):
-    tree = ast.parse(source_code)
+    spliced = splice.splice_code(source_code, address, new_docstring, "docstring", format_fragment=_format_fragment)
+    if spliced is not None:
+        return spliced
+    index = addressindex.address_index(source_code)
+    if index.lookup(address) is None:
+        raise ValueError(f"The target '{address}' does not exist." + index.did_you_mean(address))
+    tree = astcache.take(source_code)
 
     class DocstringChanger(ast.NodeTransformer):
         def __init__(self):
@@ -400,6 +482,103 @@ def change_docstring(source_code, address, new_docstring):
     changer = DocstringChanger()
     modified_tree = changer.visit(tree)
     if not changer.found:
-        raise ValueError(f"The target '{address}' does not exist.")
+        raise ValueError(f"The target '{address}' does not exist." + index.did_you_mean(address))
     modified_code = ast.unparse(modified_tree)
     return format_code(modified_code)
+
+# Edit actions of apply_edits: name -> (the action for splice, insert position, whether it takes code).
+EDIT_ACTIONS = {
+    "create": ("create", None, True),
+    "replace": ("replace", None, True),
+    "remove": ("remove", None, False),
+    "insert_before": ("insert", "before", True),
+    "insert_after": ("insert", "after", True),
+    "docstring": ("docstring", None, True),
+}
+_EDIT_HEADER = re.compile(r"^@@[ \t]+(\S+)[ \t]+(\S+)[ \t]*$")
+
+def parse_edits(text):
+    """
+    Parse a list of edits, each a header line "@@ <action> <address>" followed by its code.
+
+    Parameters:
+    text (str): The edits. The actions are the keys of EDIT_ACTIONS; remove takes no code.
+
+    Returns:
+    list: (action, address, code) tuples, with code None for remove.
+
+    Raises:
+    ValueError: If the text is not a list of edits, an action is unknown, or an edit lacks its code.
+    """
+    edits = []
+    code_lines = []
+
+    def finish():
+        if not edits:
+            if "".join(code_lines).strip():
+                raise ValueError("Edits must start with a line \"@@ <action> <address>\".")
+            return
+        action, address, _ = edits[-1]
+        code = "\n".join(code_lines).strip("\n")
+        takes_code = EDIT_ACTIONS[action][2]
+        if takes_code and not code.strip():
+            raise ValueError(f"The {action} edit of '{address}' has no code.")
+        if not takes_code and code.strip():
+            raise ValueError(f"The {action} edit of '{address}' takes no code.")
+        edits[-1] = (action, address, code + "\n" if takes_code else None)
+
+    for line in text.split("\n"):
+        header = _EDIT_HEADER.match(line)
+        if header is None:
+            code_lines.append(line)
+            continue
+        finish()
+        action, address = header.group(1).lower(), header.group(2)
+        if action not in EDIT_ACTIONS:
+            raise ValueError(f"Unknown edit action '{action}'; use {', '.join(EDIT_ACTIONS)}.")
+        edits.append((action, address, None))
+        code_lines = []
+    finish()
+    if not edits:
+        raise ValueError("No edits given.")
+    return edits
+
+def apply_edits(source_code, edits):
+    """
+    Apply a list of edits to source_code, as if they were applied one after the other.
+
+    When the edits touch different definitions, they are all spliced in at once from a single parse of
+    source_code, formatting only the new code.  Otherwise they are applied one at a time.
+
+    Parameters:
+    source_code (str): The module to edit.
+    edits (list): (action, address, code) tuples, as returned by parse_edits.
+
+    Returns:
+    str: The edited source.
+
+    Raises:
+    ValueError: If an action is unknown or an edit's target does not exist.
+    SyntaxError: If the code of an edit does not parse.
+    """
+    planned = []
+    for action, address, code in edits:
+        if action not in EDIT_ACTIONS:
+            raise ValueError(f"Unknown edit action '{action}'; use {', '.join(EDIT_ACTIONS)}.")
+        splice_action, insert_position, _ = EDIT_ACTIONS[action]
+        planned.append((address, code, splice_action, insert_position))
+    spliced = splice.splice_edits(source_code, planned, _format_fragment)
+    if spliced is not None:
+        return spliced
+    for action, address, code in edits:
+        source_code = _EDIT_FUNCTIONS[action](source_code, address, code)
+    return source_code
+
+_EDIT_FUNCTIONS = {
+    "create": create_code,
+    "replace": replace_code,
+    "remove": lambda source_code, address, code: remove_code(source_code, address),
+    "insert_before": insert_code_before,
+    "insert_after": insert_code_after,
+    "docstring": change_docstring,
+}
@@ -0,0 +1,287 @@
+"""
+Single-pass tokenizer for commands embedded in an LLM response.
+
+A response is free-form prose interleaved with commands of the form::
+
+    Command: command_name arg1 "arg 2"
+    `````lang
+    optional block content
+    `````
+
+The block is attached to a command only when it opens on the line directly
+after the ``Command:`` line.  The tokenizer walks the response once, left to
+right, with precompiled patterns and never copies the unread remainder, so
+parsing is linear in the size of the response rather than in
+``commands * size``.
+"""
+
+import re
+from collections import namedtuple
+
+CommandInfo = namedtuple('CommandInfo', ['command', 'arguments', 'backtick_content'])
+
+# A parsed command together with the [start, end) span it occupies in the response.
+CommandToken = namedtuple('CommandToken', ['info', 'start', 'end'])
+
+FENCE = '`````'
+
+_whitespace_re = re.compile(r"\s*")
+
+
+class CommandTokenizer:
+    """
+    Tokenizes ``Command:`` lines and their attached fenced blocks.
+
+    Parameters:
+    command_prefix (str): The text that introduces a command at the start of a line.
+    fence (str): The backtick fence that opens and closes a block.
+    """
+
+    def __init__(self, command_prefix="Command: ", fence=FENCE):
+        self.command_prefix = command_prefix
+        self.fence = fence
+        self._command_re = re.compile(r"^" + re.escape(command_prefix) + r"(\S+)[ \t]*(.*)$", re.MULTILINE)
+        # The optional language specifier may contain characters such as c#, c++ or objective-c.
+        self._block_open_re = re.compile(re.escape(fence) + r"(?:[\w#\+\-]+)?\s*")
+
+    def tokenize(self, content):
+        """
+        Yield a CommandToken for every command in content, in document order.
+
+        Parameters:
+        content (str): The response text to scan.
+
+        Returns:
+        iterator of CommandToken: The commands with their spans in content.
+        """
+        command_re = self._command_re
+        block_open_re = self._block_open_re
+        fence = self.fence
+        pos = 0
+        while True:
+            command_match = command_re.search(content, pos)
+            if not command_match:
+                return
+            command_end = command_match.end()
+            backtick_content = None
+            end = command_end
+            block_open = block_open_re.match(content, command_end + 1)
+            if block_open:
+                block_close = content.find(fence, block_open.end())
+                if block_close != -1:
+                    backtick_content = content[block_open.end():block_close]
+                    end = block_close + len(fence)
+            info = CommandInfo(command_match.group(1), command_match.group(2), backtick_content)
+            yield CommandToken(info, command_match.start(), end)
+            pos = end
+
+
+_default_tokenizer = CommandTokenizer()
+
+
+def tokenize_commands(content):
+    """Yield a CommandToken for every command in content using the default syntax."""
+    return _default_tokenizer.tokenize(content)
+
+
+def parse_commands(content):
+    """Return the list of CommandInfo records found in content."""
+    return [token.info for token in _default_tokenizer.tokenize(content)]
+
+
+def skip_whitespace(content, pos):
+    """Return the index of the first non-whitespace character in content at or after pos."""
+    return _whitespace_re.match(content, pos).end()
+
+
+_SCANNING, _AFTER_COMMAND, _IN_BLOCK = range(3)
+
+
+class StreamingCommandParser:
+    """
+    Incrementally tokenizes a response that arrives in chunks.
+
+    Feed it text as it streams in, for example the chunks of ``stream.text_stream``.
+    Each call returns the commands completed by that chunk: a command is complete
+    once its block closes, or once the following line shows that no block is
+    attached.  Over a whole response, feed and close return exactly the tokens that
+    CommandTokenizer.tokenize returns for the joined text.
+
+    Parameters:
+    tokenizer (CommandTokenizer): The syntax to parse. Defaults to the standard syntax.
+    """
+
+    def __init__(self, tokenizer=None):
+        tokenizer = tokenizer or _default_tokenizer
+        self._prefix = tokenizer.command_prefix
+        self._fence = tokenizer.fence
+        self._command_re = tokenizer._command_re
+        self._block_open_re = tokenizer._block_open_re
+        self._state = _SCANNING
+        # Unresolved text, its absolute offset in the response and the scan position within it.
+        self._buffer = ""
+        self._offset = 0
+        self._pos = 0
+        # True when the scan position is in the middle of a line, which cannot start a command.
+        self._mid_line = False
+        # (command, arguments, start, command_end) of a command waiting for a possible block.
+        self._pending = None
+        # An open block is collected as a list of chunks so large payloads are joined only once.
+        self._block_chunks = []
+        self._block_start = 0
+        self._block_length = 0
+        self._block_tail = ""
+
+    def feed(self, chunk):
+        """
+        Add a chunk of the response.
+
+        Parameters:
+        chunk (str): The next piece of response text.
+
+        Returns:
+        list of CommandToken: The commands completed by this chunk, in document order.
+        """
+        tokens = []
+        if self._state == _IN_BLOCK:
+            self._extend_block(chunk, tokens)
+        else:
+            self._buffer += chunk
+        self._drain(tokens, final=False)
+        self._compact()
+        return tokens
+
+    def close(self):
+        """
+        Mark the end of the response.
+
+        Returns:
+        list of CommandToken: The commands still pending at the end of the response.
+        """
+        tokens = []
+        if self._state == _IN_BLOCK:
+            # The block never closed: the command has no block, and its lines are scanned as prose.
+            tokens.append(self._pending_token())
+            self._buffer = "".join(self._block_chunks)
+            self._offset = self._block_start
+            self._pos = 0
+            self._block_chunks = []
+            self._state = _SCANNING
+        self._drain(tokens, final=True)
+        self._compact()
+        return tokens
+
+    def _drain(self, tokens, final):
+        while self._state != _IN_BLOCK:
+            if self._state == _SCANNING:
+                progressed = self._scan(tokens, final)
+            else:
+                progressed = self._check_for_block(tokens, final)
+            if not progressed:
+                return
+
+    def _scan(self, tokens, final):
+        buffer = self._buffer
+        pos = self._pos
+        if self._mid_line:
+            newline = buffer.find("\n", pos)
+            if newline == -1:
+                self._pos = len(buffer)
+                return False
+            pos = newline + 1
+            self._mid_line = False
+        match = self._command_re.search(buffer, pos)
+        if match is None:
+            if final:
+                self._pos = len(buffer)
+                return False
+            # Keep the trailing partial line only while it may still become a command line.
+            line_start = max(buffer.rfind("\n", pos) + 1, pos)
+            if self._prefix.startswith(buffer[line_start:]):
+                self._pos = line_start
+            else:
+                self._pos = len(buffer)
+                self._mid_line = True
+            return False
+        if match.end() == len(buffer) and not final:
+            # The command line may continue in the next chunk.
+            self._pos = match.start()
+            return False
+        self._pending = (match.group(1), match.group(2), self._offset + match.start(), self._offset + match.end())
+        self._pos = min(match.end() + 1, len(buffer))
+        self._state = _AFTER_COMMAND
+        return True
+
+    def _check_for_block(self, tokens, final):
+        buffer = self._buffer
+        pos = self._pos
+        fence = self._fence
+        head = buffer[pos:pos + len(fence)]
+        if head == fence:
+            close = buffer.find(fence, pos + len(fence))
+            if close != -1:
+                self._finish_block(buffer, self._offset, pos, close, tokens)
+                return True
+            if not final:
+                text = buffer[pos:]
+                self._block_start = self._offset + pos
+                self._block_chunks = [text]
+                self._block_length = len(text)
+                self._block_tail = text[max(0, len(text) - len(fence) + 1):]
+                self._buffer = ""
+                self._pos = 0
+                self._state = _IN_BLOCK
+                return False
+        elif not final and fence.startswith(head):
+            return False
+        tokens.append(self._pending_token())
+        self._state = _SCANNING
+        return True
+
+    def _extend_block(self, chunk, tokens):
+        fence = self._fence
+        # Search only the new text, overlapped with the end of the block so a split fence is found.
+        window = self._block_tail + chunk
+        base = self._block_length - len(self._block_tail)
+        close = window.find(fence, max(0, len(fence) - base))
+        self._block_chunks.append(chunk)
+        self._block_length += len(chunk)
+        if close == -1:
+            self._block_tail = window[max(0, len(window) - len(fence) + 1):]
+            return
+        text = "".join(self._block_chunks)
+        self._block_chunks = []
+        self._block_tail = ""
+        self._finish_block(text, self._block_start, 0, base + close, tokens)
+
+    def _finish_block(self, text, text_offset, block_index, close, tokens):
+        command, arguments, start, _ = self._pending
+        content_start = self._block_open_re.match(text, block_index).end()
+        end = close + len(self._fence)
+        info = CommandInfo(command, arguments, text[content_start:close])
+        tokens.append(CommandToken(info, start, text_offset + end))
+        self._pending = None
+        self._buffer = text
+        self._offset = text_offset
+        self._pos = end
+        self._mid_line = True
+        self._state = _SCANNING
+
+    def _pending_token(self):
+        command, arguments, start, command_end = self._pending
+        self._pending = None
+        return CommandToken(CommandInfo(command, arguments, None), start, command_end)
+
+    def _compact(self):
+        if self._pos:
+            self._buffer = self._buffer[self._pos:]
+            self._offset += self._pos
+            self._pos = 0
+
+
+def iter_stream_commands(chunks, tokenizer=None):
+    """Yield a CommandToken for every command in an iterable of response chunks, as soon as it completes."""
+    parser = StreamingCommandParser(tokenizer)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
@@ -0,0 +1,182 @@
+"""
+Streaming compaction of console output.
+
+Build tools and package managers redraw progress bars with carriage returns,
+colour their output with ANSI escape sequences and print long runs of lines
+that differ only in a counter.  None of that helps the LLM reading the output.
+ConsoleCompactor sits between the pty reader and the capture buffer and, one
+line at a time:
+
+- strips ANSI escape sequences,
+- keeps only the final frame of carriage-return redraws,
+- collapses runs of identical lines to one line and a count, and runs of
+  lines that differ only in their digits to the first line, a count and the
+  last line.
+
+Memory is bounded by the longest line it holds (itself capped), whatever the
+length of the stream.  With spill enabled, the raw stream is saved to a
+temporary file so nothing is lost for good.
+"""
+
+import re
+import tempfile
+
+# Lines longer than this are passed on in pieces instead of being held whole.
+MAX_LINE_BYTES = 65536
+
+# A run of similar lines is collapsed once it is at least this long.
+MIN_RUN = 3
+
+_ansi_re = re.compile(
+    rb"\x1b\[[0-?]*[ -/]*[@-~]"              # CSI sequences: colours, cursor movement, erase
+    rb"|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)"   # OSC sequences: window titles, hyperlinks
+    rb"|\x1b[ -/]*[0-~]"                      # Other escapes, such as character set selection
+)
+# Lines are similar when they are equal once their digits are removed. Lines without letters
+# or made up mostly of digits are only ever collapsed when identical, so numeric data survives.
+_DIGITS = b"0123456789"
+
+
+def _summarize_run(pieces, last, length, identical):
+    """Append what remains of a finished run after its first line, which was already passed on."""
+    if length >= MIN_RUN and identical:
+        pieces.append(f"[... previous line repeated {length - 1} more times ...]\n".encode())
+    elif length >= MIN_RUN:
+        pieces.append(f"[... {length - 2} similar lines omitted ...]\n".encode())
+        pieces.append(last + b"\n")
+    elif length == 2:
+        pieces.append(last + b"\n")
+
+
+def _final_frame(line):
+    """Return what is left of a line once its carriage-return redraws have been drawn."""
+    if line.endswith(b"\r"):
+        line = line[:-1]
+    return line[line.rfind(b"\r") + 1:]
+
+
+class ConsoleCompactor:
+    """
+    Compacts a console byte stream and passes the result to sink.
+
+    Parameters:
+    sink: An object with a write(bytes) method, such as a HeadTailBuffer.
+    spill (bool): Whether to save the raw stream to a temporary file.
+    """
+
+    def __init__(self, sink, spill=False):
+        self.sink = sink
+        self.raw_bytes = 0
+        self.output_bytes = 0
+        self.spill_path = None
+        self._spill_file = None
+        if spill:
+            self._spill_file = tempfile.NamedTemporaryFile(prefix="llmide-console-raw-", suffix=".log", delete=False)
+            self.spill_path = self._spill_file.name
+        self._line = bytearray()
+        # The current run of similar lines: its last line, digitless key, length and whether
+        # all its lines were identical.
+        self._run_last = None
+        self._run_key = None
+        self._run_length = 0
+        self._run_identical = True
+
+    @property
+    def saved_bytes(self):
+        """Number of bytes compaction removed from the stream."""
+        return max(0, self.raw_bytes - self.output_bytes)
+
+    def write(self, data):
+        """Add raw bytes to the stream."""
+        if not data:
+            return
+        self.raw_bytes += len(data)
+        if self._spill_file is not None:
+            self._spill_file.write(data)
+        last_newline = data.rfind(b"\n")
+        if last_newline == -1:
+            self._line += data
+            self._trim_partial_line()
+            return
+        block = bytes(self._line) + data[:last_newline]
+        self._line = bytearray(data[last_newline + 1:])
+        self._trim_partial_line()
+
+        # Fast path: the whole block repeats the line being counted, as with `yes`.
+        if self._run_last is not None:
+            unit = self._run_last + b"\n"
+            count, remainder = divmod(len(block) + 1, len(unit))
+            if not remainder and block + b"\n" == unit * count:
+                self._run_length += count
+                return
+
+        # Complete lines hold complete escape sequences, so the block can be stripped at once.
+        if b"\x1b" in block:
+            block = _ansi_re.sub(b"", block)
+        lines = block.split(b"\n")
+        if b"\r" in block:
+            lines = [_final_frame(line) for line in lines]
+        self._add_lines(lines)
+
+    def _trim_partial_line(self):
+        # Everything before the last carriage return is a frame that will be redrawn; a
+        # carriage return at the very end may still turn out to be half of a CRLF.
+        redraw = self._line.rfind(b"\r", 0, len(self._line) - 1)
+        if redraw != -1:
+            del self._line[:redraw + 1]
+        if len(self._line) > MAX_LINE_BYTES:
+            self._flush_partial_line()
+
+    def _flush_partial_line(self):
+        # An unterminated piece of a line is passed on as it is, outside any run.
+        line = _final_frame(_ansi_re.sub(b"", bytes(self._line)))
+        self._line.clear()
+        self._end_run()
+        self._emit(line)
+
+    def _add_lines(self, lines):
+        # The loop keeps the run in locals; it is the hot path for output that is not one long run.
+        pieces = []
+        last, last_key, length, identical = self._run_last, self._run_key, self._run_length, self._run_identical
+        for line in lines:
+            if line == last:
+                length += 1
+                continue
+            key = line.translate(None, _DIGITS)
+            if (len(line) - len(key)) * 2 > len(line) or key.lower() == key.upper():
+                key = None
+            elif key == last_key:
+                length += 1
+                last = line
+                identical = False
+                continue
+            if length:
+                _summarize_run(pieces, last, length, identical)
+            pieces.append(line)
+            pieces.append(b"\n")
+            last, last_key, length, identical = line, key, 1, True
+        self._run_last, self._run_key, self._run_length, self._run_identical = last, last_key, length, identical
+        self._emit(b"".join(pieces))
+
+    def _end_run(self):
+        if self._run_length:
+            pieces = []
+            _summarize_run(pieces, self._run_last, self._run_length, self._run_identical)
+            self._emit(b"".join(pieces))
+        self._run_last = self._run_key = None
+        self._run_length = 0
+        self._run_identical = True
+
+    def _emit(self, data):
+        if data:
+            self.output_bytes += len(data)
+            self.sink.write(data)
+
+    def close(self):
+        """Flush the last, unterminated line and any pending run, and finish the spill file."""
+        if self._line:
+            self._flush_partial_line()
+        self._end_run()
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
@@ -0,0 +1,279 @@
+"""
+Long-lived llmide daemon on a local Unix socket.
+
+Importing llmide and warming it up (black, PIL, requests, Playwright, the
+summarization backend) costs every short-lived agent process time and memory,
+and whatever it caches is lost when the process exits.  The daemon keeps one
+warm interpreter and serves any number of agents from it: each agent opens a
+session, sends the LLM responses it wants executed, and closes the session
+when it is done.  Sessions that sit idle longer than the idle timeout are
+closed, with their console processes, jobs and browser.  What a session
+writes to its tty (console echo, exit lines) and with the stdout command is
+kept and sent back with the next reply, for the client to write out.  Commands run in the
+daemon's working directory, so a daemon only opens sessions for clients in
+that directory: the default socket path is different for every directory
+(see protocol.default_socket_path), and an "open" from another directory is
+refused.
+
+The daemon is also the formatting worker (see formatting): it formats code
+for agents with black, imported once, and one result cache shared by all of
+them.  It always formats in its own process, whatever LLMIDE_FORMAT_WORKER
+says.
+
+Requests (see protocol for the framing):
+
+- {"op": "open", "cwd": str} -> {"session": id}
+- {"op": "process", "session": id, "content": str, "max_output_chars": int or null}
+  -> {"response": str, "images": [[base64, media_type], ...], "stdout": str, "tty": str}
+- {"op": "close", "session": id} -> {"closed": bool}
+- {"op": "format", "code": str, "line_length": int}
+  -> {"formatted": str} or {"syntax_error": message}
+- {"op": "ping"} -> {"pid": int, "sessions": int, "format": formatting.format_stats()}
+- {"op": "shutdown"} -> {"stopping": true}
+
+Failures are reported as {"error": message}.  Start the daemon with
+``python -m llmide serve``.
+"""
+
+import asyncio
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+
+from . import aio, formatting
+from .protocol import default_socket_path, read_message, write_message
+from .session import Session
+
+# Sessions unused for this many seconds are closed.
+DEFAULT_IDLE_TIMEOUT = 1800
+# The most characters of tty or stdout output a session keeps between replies; older output is dropped.
+MAX_KEPT_OUTPUT_CHARS = 1024 * 1024
+
+
+class _KeptOutput:
+    """A text stream that keeps what is written to it until take() is called, up to max_chars."""
+
+    def __init__(self, max_chars=MAX_KEPT_OUTPUT_CHARS):
+        self.max_chars = max_chars
+        self._parts = []
+        self._size = 0
+        self._skipped = 0
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        with self._lock:
+            self._parts.append(text)
+            self._size += len(text)
+            if self._size > self.max_chars:
+                kept = "".join(self._parts)
+                self._skipped += len(kept) - self.max_chars
+                self._parts = [kept[-self.max_chars:]]
+                self._size = self.max_chars
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        """Return everything written since the last call, and forget it."""
+        with self._lock:
+            text = "".join(self._parts)
+            if self._skipped:
+                text = f"[... {self._skipped} characters skipped]\n" + text
+            self._parts = []
+            self._size = 0
+            self._skipped = 0
+        return text
+
+
+class _DaemonSession:
+    def __init__(self):
+        self.tty = _KeptOutput()
+        self.stdout = _KeptOutput()
+        self.session = Session(tty=self.tty, stdout=self.stdout)
+        self.last_used = time.monotonic()
+        self.busy = 0
+
+
+class Daemon:
+    """
+    Serves sessions to llmide clients on a Unix socket.
+
+    Parameters:
+    socket_path (str): Where to listen, or None for protocol.default_socket_path().
+    idle_timeout (float): Seconds after which an unused session is closed.
+    """
+
+    def __init__(self, socket_path=None, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.socket_path = socket_path or default_socket_path()
+        self.idle_timeout = idle_timeout
+        # The directory commands run in.
+        self.cwd = os.getcwd()
+        self.sessions = {}
+        # The task serving each open client connection.
+        self._connections = set()
+        self._stopping = None
+        self._handlers = {
+            "open": self._open,
+            "process": self._process,
+            "close": self._close,
+            "format": self._format,
+            "ping": self._ping,
+            "shutdown": self._shutdown,
+        }
+
+    def _remove_stale_socket(self):
+        """Remove a socket file left behind by a daemon that is no longer running."""
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+        else:
+            raise RuntimeError(f"An llmide daemon is already listening on {self.socket_path}.")
+        finally:
+            probe.close()
+
+    async def serve(self, ready=None):
+        """
+        Listen until a shutdown request, then close every session.
+
+        Parameters:
+        ready (callable): Called without arguments once the socket accepts connections.
+        """
+        self._stopping = asyncio.Event()
+        self._remove_stale_socket()
+        # The daemon is the worker; sending its own edits back to itself would only add a round trip.
+        formatting.use_worker(enabled=False)
+        server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        evictor = asyncio.ensure_future(self._evict_idle_sessions())
+        try:
+            if ready is not None:
+                ready()
+            await self._stopping.wait()
+        finally:
+            evictor.cancel()
+            server.close()
+            await server.wait_closed()
+            # Connections still open would otherwise be cancelled by the event loop as it stops.
+            for connection in list(self._connections):
+                connection.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            for session_id in list(self.sessions):
+                await self._close_session(session_id)
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def stop(self):
+        """Ask serve to return. Must be called on the daemon's event loop."""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def _handle_connection(self, reader, writer):
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        try:
+            while True:
+                try:
+                    message = await read_message(reader)
+                except (ConnectionError, ValueError) as e:
+                    await write_message(writer, {"error": f"Bad request: {e}"})
+                    break
+                if message is None:
+                    break
+                await write_message(writer, await self._dispatch(message))
+        except (ConnectionError, asyncio.CancelledError):
+            # The client went away, or the daemon is shutting down.
+            pass
+        finally:
+            self._connections.discard(connection)
+            writer.close()
+
+    async def _dispatch(self, message):
+        handler = self._handlers.get(message.get("op"))
+        if handler is None:
+            return {"error": f"Unknown operation: {message.get('op')!r}"}
+        try:
+            return await handler(message)
+        except KeyError as e:
+            return {"error": str(e.args[0])}
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    def _get_session(self, message):
+        entry = self.sessions.get(message.get("session"))
+        if entry is None:
+            raise KeyError(f"No session with id {message.get('session')!r}.")
+        return entry
+
+    async def _open(self, message):
+        cwd = message.get("cwd")
+        if cwd is not None and os.path.realpath(cwd) != os.path.realpath(self.cwd):
+            return {"error": f"The llmide daemon on {self.socket_path} runs commands in {self.cwd}, not {cwd}; "
+                             f"use a daemon started in {cwd}."}
+        session_id = uuid.uuid4().hex
+        self.sessions[session_id] = _DaemonSession()
+        return {"session": session_id}
+
+    async def _process(self, message):
+        entry = self._get_session(message)
+        entry.busy += 1
+        try:
+            response, images = await aio.process_content(message.get("content", ""), session=entry.session,
+                                                          max_output_chars=message.get("max_output_chars"))
+        finally:
+            entry.busy -= 1
+            entry.last_used = time.monotonic()
+        return {"response": response, "images": [list(image) for image in images],
+                "stdout": entry.stdout.take(), "tty": entry.tty.take()}
+
+    async def _close(self, message):
+        return {"closed": await self._close_session(message.get("session"))}
+
+    async def _format(self, message):
+        line_length = message.get("line_length") or formatting.DEFAULT_LINE_LENGTH
+        try:
+            formatted = await asyncio.to_thread(formatting.format_locally, message.get("code", ""), line_length)
+        except SyntaxError as e:
+            return {"syntax_error": str(e)}
+        return {"formatted": formatted}
+
+    async def _ping(self, message):
+        return {"pid": os.getpid(), "sessions": len(self.sessions), "format": formatting.format_stats()}
+
+    async def _shutdown(self, message):
+        self.stop()
+        return {"stopping": True}
+
+    async def _close_session(self, session_id):
+        entry = self.sessions.pop(session_id, None)
+        if entry is None:
+            return False
+        await entry.session.aclose()
+        return True
+
+    async def _evict_idle_sessions(self):
+        while True:
+            await asyncio.sleep(min(self.idle_timeout / 2, 30))
+            now = time.monotonic()
+            for session_id, entry in list(self.sessions.items()):
+                if not entry.busy and now - entry.last_used > self.idle_timeout:
+                    await self._close_session(session_id)
+
+
+async def _serve_until_stopped(daemon):
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, daemon.stop)
+    await daemon.serve()
+
+
+def serve(socket_path=None, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """Run a daemon on socket_path until a shutdown request, SIGTERM or SIGINT."""
+    asyncio.run(_serve_until_stopped(Daemon(socket_path, idle_timeout)))
@@ -0,0 +1,150 @@
+"""
+Execution planner for the commands of one response.
+
+Each command is classified as read-only or mutating, together with the file
+paths it touches, from its entry in the command registry.  Commands whose paths do not conflict run concurrently on a
+bounded thread pool; a command that writes a path waits for every earlier
+command touching that path, and a command that reads a path waits for every
+earlier command writing it.  Commands bound to shared interactive resources
+(the console, the browser, stdout) run on the calling thread once everything
+before them has finished, so they keep their thread affinity and ordering.
+
+Results are always returned in document order, so the combined output is
+identical to running the commands one after another.
+"""
+
+import contextvars
+import os
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from . import registry
+
+DEFAULT_MAX_WORKERS = 8
+
+# read_only: the command does not change any state.
+# paths: the normalized file paths the command reads or writes.
+# inline: the command must run alone on the calling thread.
+CommandAccess = namedtuple('CommandAccess', ['read_only', 'paths', 'inline'])
+
+PlannedCommand = namedtuple('PlannedCommand', ['command', 'access', 'dependencies'])
+
+_EXCLUSIVE = CommandAccess(read_only=False, paths=(), inline=True)
+
+
+def _normalize_path(path):
+    return os.path.realpath(path)
+
+
+def classify(command):
+    """
+    Classify a CommandInfo by what it reads and writes.
+
+    Parameters:
+    command (CommandInfo): The parsed command.
+
+    Returns:
+    CommandAccess: Whether the command is read-only, the paths it touches and whether it must run inline.
+    """
+    spec = registry.lookup(command.command)
+    if spec is None:
+        return _EXCLUSIVE
+    if spec.inline:
+        return CommandAccess(read_only=spec.read_only, paths=(), inline=True)
+    paths = registry.argument_paths(spec, command.arguments)
+    if not paths:
+        return _EXCLUSIVE
+    return CommandAccess(read_only=spec.read_only, paths=tuple(_normalize_path(path) for path in paths), inline=False)
+
+
+def _paths_overlap(first, second):
+    for a in first:
+        for b in second:
+            if a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep):
+                return True
+    return False
+
+
+def _conflicts(earlier, later):
+    if earlier.inline or later.inline:
+        return True
+    if earlier.read_only and later.read_only:
+        return False
+    return _paths_overlap(earlier.paths, later.paths)
+
+
+def plan(commands):
+    """
+    Build an execution plan for a list of CommandInfo records.
+
+    Returns:
+    list of PlannedCommand: One entry per command, in document order, with the indexes of
+                            the earlier commands it must wait for.
+    """
+    planned = []
+    for command in commands:
+        access = classify(command)
+        dependencies = tuple(i for i, earlier in enumerate(planned) if _conflicts(earlier.access, access))
+        planned.append(PlannedCommand(command, access, dependencies))
+    return planned
+
+
+def _run_after(dependencies, run, command):
+    wait(dependencies)
+    return run(command)
+
+
+def iter_execute_commands(commands, run, max_workers=None):
+    """
+    Execute commands according to their plan and yield their results in document order.
+
+    Each result is yielded as soon as it and every result before it are available, so a
+    consumer can stream output while later commands are still running.
+
+    Parameters:
+    commands (list of CommandInfo): The commands to execute.
+    run (callable): Executes one command and returns its result.
+    max_workers (int): The size of the thread pool. Defaults to DEFAULT_MAX_WORKERS; 1 runs sequentially.
+
+    Returns:
+    iterator: The result of run for each command, in the order of commands.
+    """
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+    if max_workers == 1 or len(commands) < 2:
+        for command in commands:
+            yield run(command)
+        return
+
+    planned = plan(commands)
+    futures = []
+    yielded = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for step in planned:
+            if step.access.inline:
+                # Inline commands wait for everything before them, so those results can be handed out now.
+                while yielded < len(futures):
+                    yield futures[yielded].result()
+                    yielded += 1
+                future = Future()
+                future.set_result(run(step.command))
+                futures.append(future)
+            else:
+                dependencies = [futures[i] for i in step.dependencies]
+                # Each command runs in a copy of the caller's context, so it sees the caller's session.
+                futures.append(pool.submit(contextvars.copy_context().run, _run_after, dependencies, run,
+                                           step.command))
+        while yielded < len(futures):
+            yield futures[yielded].result()
+            yielded += 1
+
+
+def execute_commands(commands, run, max_workers=None):
+    """
+    Execute commands according to their plan and return their results in document order.
+
+    Parameters and behaviour are as for iter_execute_commands.
+
+    Returns:
+    list: The result of run for each command, in the order of commands.
+    """
+    return list(iter_execute_commands(commands, run, max_workers=max_workers))
@@ -0,0 +1,148 @@
+"""
+Cache of file contents for the editing commands.
+
+An agent tends to run many commands against the same few files, and every
+command used to reread and decode the whole file.  FileCache keeps the text
+of recently used files, each stored with the (device, inode, mtime_ns, size)
+the file had when it was read or written.  A read stats the file and returns
+the cached text if that key still matches, so the file is only read again
+when something else changed it.  Writes made through the cache update it, so
+an edit followed by another edit of the same file reads nothing.
+
+The least recently used files are evicted once their total size passes the
+byte budget.  Each session has its own cache (Session.file_cache).
+"""
+
+import collections
+import os
+import shutil
+import tempfile
+import threading
+
+from . import tracing
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _read_umask():
+    # os.umask can only be read by setting it, which is not safe once other threads create files.
+    umask = os.umask(0o22)
+    os.umask(umask)
+    return umask
+
+
+# Read once, on import, for the mode of files created by atomic writes.
+_UMASK = _read_umask()
+
+
+def _key(stat):
+    return (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+class FileCache:
+    """
+    A least-recently-used cache of file text, checked against the file's stat on every read.
+
+    Parameters:
+    max_bytes (int): The total size of the files to keep, in bytes on disk. Larger files are not cached.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, file_path):
+        """
+        Return the text of file_path, reading the file only if it changed since it was cached.
+
+        Raises:
+        OSError: If the file cannot be read, as open() would.
+        """
+        path = os.path.abspath(file_path)
+        key = _key(os.stat(path))
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                tracing.annotate(cache_hit=True)
+                return entry[1]
+            self.misses += 1
+        with open(path, "r") as file:
+            text = file.read()
+        # Store the text under the stat taken before reading: if the file changed while it
+        # was read, its stat no longer matches and the next read rereads it.
+        self._store(path, key, text)
+        return text
+
+    def write(self, file_path, text, atomic=False):
+        """
+        Write text to file_path, and cache it as the file's contents.
+
+        Parameters:
+        file_path (str): The file to write.
+        text (str): The new contents.
+        atomic (bool): Whether to write a temporary file next to it and rename it over the file, so
+                       readers see either the old contents or the new ones, never part of them.
+        """
+        path = os.path.abspath(file_path)
+        if not atomic:
+            with open(path, "w") as file:
+                file.write(text)
+                file.flush()
+                key = _key(os.fstat(file.fileno()))
+            self._store(path, key, text)
+            return
+        # Rename over the file a link points to, not over the link.
+        path = os.path.realpath(path)
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".llmide-")
+        try:
+            with open(descriptor, "w") as file:
+                file.write(text)
+                file.flush()
+                os.fsync(file.fileno())
+                if os.path.exists(path):
+                    shutil.copymode(path, temporary)
+                else:
+                    # mkstemp creates the file readable only by its owner; open() would have used the umask.
+                    os.chmod(temporary, 0o666 & ~_UMASK)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        # The stat is taken after the rename, as the cache keys files by inode.
+        self._store(path, _key(os.stat(path)), text)
+        if path != os.path.abspath(file_path):
+            self.invalidate(file_path)
+
+    def invalidate(self, file_path=None):
+        """Forget file_path, or every file when it is None."""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+                self.size = 0
+                return
+            entry = self._entries.pop(os.path.abspath(file_path), None)
+            if entry is not None:
+                self.size -= entry[0][3]
+
+    def __contains__(self, file_path):
+        return os.path.abspath(file_path) in self._entries
+
+    def _store(self, path, key, text):
+        size = key[3]
+        with self._lock:
+            previous = self._entries.pop(path, None)
+            if previous is not None:
+                self.size -= previous[0][3]
+            if size > self.max_bytes:
+                return
+            self._entries[path] = (key, text)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (evicted_key, _) = self._entries.popitem(last=False)
+                self.size -= evicted_key[3]
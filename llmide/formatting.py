@@ -0,0 +1,290 @@
+"""
+Formatting with black, behind a result cache and an optional shared worker.
+
+Every structural edit formats code with black, and black is slow both to
+import and to run on a large module.  format_code keeps the formatted result
+of recent inputs, keyed by a hash of the code and the line length, so
+formatting code that was formatted before costs a dictionary lookup.  Callers
+that only changed part of a module should format that part: splice formats
+just the new code, at the line length left over by its indentation.
+
+With LLMIDE_FORMAT_WORKER set (to 1 for the shared socket, or to a socket
+path), or after use_worker(), cache misses are formatted by the llmide daemon
+on protocol.shared_socket_path() (see daemon), started if needed.  That
+socket does not depend on the working directory, so black is imported once
+per host rather than once per agent or project, and the daemon's cache is
+shared by every agent using it.  Each thread has its own connection, so
+threads format at the same time.  If the worker cannot be reached,
+formatting falls back to black in this process and the worker is not tried
+again for WORKER_RETRY_SECONDS.
+
+format_stats() reports the hit rate and the time spent formatting.
+
+Like codemanipulator, this module only uses the standard library; black and
+the daemon client are imported on first use.
+"""
+
+import ast
+import collections
+import hashlib
+import io
+import os
+import threading
+import time
+import tokenize
+
+DEFAULT_LINE_LENGTH = 88
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+WORKER_RETRY_SECONDS = 60
+
+
+def syntax_check(code):
+    """Return True if code tokenizes and parses."""
+    try:
+        list(tokenize.generate_tokens(io.StringIO(code).readline))
+        ast.parse(code)
+        return True
+    except (SyntaxError, tokenize.TokenError):
+        return False
+
+
+def format_with_black(code, line_length=DEFAULT_LINE_LENGTH):
+    """
+    Format code with black in this process, without the cache.
+
+    Code that black cannot handle is returned unchanged if it parses.
+
+    Raises:
+    SyntaxError: If code does not parse, or the formatted code does not.
+    """
+    # black is imported on first use; it is slow to import and only edits need it.
+    import black
+    try:
+        formatted_code = black.format_str(code, mode=black.Mode(line_length=line_length))
+    except black.parsing.InvalidInput:
+        if syntax_check(code):
+            return code
+        raise SyntaxError("Syntax check failed on original code")
+    if syntax_check(formatted_code):
+        return formatted_code
+    raise SyntaxError("Syntax check failed after formatting")
+
+
+class FormatCache:
+    """
+    A least-recently-used cache of formatted code, keyed by the input and the line length.
+
+    Parameters:
+    max_bytes (int): The total length of formatted code the cache may keep.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.format_seconds = 0.0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def format(self, code, line_length, formatter):
+        """
+        Return the formatted code, calling formatter(code, line_length) on a miss.
+
+        Raises:
+        SyntaxError: As raised by formatter; failures are not cached.
+        """
+        key = (hashlib.blake2b(code.encode("utf-8", "surrogatepass"), digest_size=16).digest(), line_length)
+        with self._lock:
+            formatted_code = self._entries.get(key)
+            if formatted_code is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return formatted_code
+            self.misses += 1
+        start = time.perf_counter()
+        try:
+            formatted_code = formatter(code, line_length)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.format_seconds += elapsed
+        size = len(formatted_code)
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = formatted_code
+                self.size += size
+                while self.size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.size -= len(evicted)
+        return formatted_code
+
+    def stats(self):
+        """Return the hit count, miss count, hit rate and time spent formatting misses, as a dict."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "format_seconds": self.format_seconds,
+                "mean_miss_seconds": self.format_seconds / self.misses if self.misses else 0.0,
+                "entries": len(self._entries),
+                "bytes": self.size,
+            }
+
+    def clear(self):
+        """Drop every cached result. The counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class _Worker:
+    """
+    Connections to the daemon that formats cache misses, one per thread so that threads format at once,
+    reopened after failures.
+    """
+
+    def __init__(self, socket_path, autostart):
+        self.socket_path = socket_path or _protocol_module().shared_socket_path()
+        self.autostart = autostart
+        self.requests = 0
+        self.failures = 0
+        self._local = threading.local()
+        self._clients = []
+        # Bumped by close(), so that threads drop the connections it closed.
+        self._generation = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        generation, client = getattr(self._local, "connection", (None, None))
+        if client is None or generation != self._generation:
+            client = _client_module().connect(self.socket_path, self.autostart)
+            with self._lock:
+                generation = self._generation
+                self._clients.append(client)
+            self._local.connection = (generation, client)
+        return client
+
+    def format(self, code, line_length):
+        """Format code in the daemon, or return None if it cannot be reached."""
+        if time.monotonic() < self._retry_at:
+            return None
+        try:
+            client = self._connection()
+            with self._lock:
+                self.requests += 1
+            reply = client.request("format", code=code, line_length=line_length)
+        except (OSError, _client_module().DaemonError):
+            # OSError covers ConnectionError and a daemon that did not start in time.
+            with self._lock:
+                self.failures += 1
+                self._retry_at = time.monotonic() + WORKER_RETRY_SECONDS
+            self.close()
+            return None
+        if "syntax_error" in reply:
+            raise SyntaxError(reply["syntax_error"])
+        return reply["formatted"]
+
+    def close(self):
+        """Close every thread's connection; each thread opens a new one on its next request."""
+        with self._lock:
+            clients, self._clients = self._clients, []
+            self._generation += 1
+        for client in clients:
+            client.close()
+
+
+def _client_module():
+    try:
+        from . import client
+    except ImportError:
+        # Imported as a top-level module, as the tests do.
+        from llmide import client
+    return client
+
+
+def _protocol_module():
+    try:
+        from . import protocol
+    except ImportError:
+        from llmide import protocol
+    return protocol
+
+
+_cache = FormatCache()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def use_worker(socket_path=None, enabled=True, autostart=True):
+    """
+    Format cache misses in the llmide daemon on socket_path, or in this process again if enabled is False.
+
+    Parameters:
+    socket_path (str): The daemon's socket, or None for protocol.shared_socket_path().
+    enabled (bool): Whether to use the daemon.
+    autostart (bool): Whether to start a daemon if none is running.
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is not None:
+            _worker.close()
+        _worker = _Worker(socket_path, autostart) if enabled else None
+
+
+def _format_miss(code, line_length):
+    worker = _worker
+    if worker is not None:
+        formatted_code = worker.format(code, line_length)
+        if formatted_code is not None:
+            return formatted_code
+    return format_with_black(code, line_length)
+
+
+def format_code(code, line_length=DEFAULT_LINE_LENGTH):
+    """
+    Format code with black, reusing the result for code formatted before.
+
+    Parameters:
+    code (str): The code to format.
+    line_length (int): The line length black formats to.
+
+    Returns:
+    str: The formatted code, or code itself if black cannot handle it but it parses.
+
+    Raises:
+    SyntaxError: If code does not parse.
+    """
+    return _cache.format(code, line_length, _format_miss)
+
+
+def format_locally(code, line_length=DEFAULT_LINE_LENGTH):
+    """Like format_code, but never sends the code to a worker. The daemon formats requests with this."""
+    return _cache.format(code, line_length, format_with_black)
+
+
+def get_cache():
+    """Return the process-wide result cache."""
+    return _cache
+
+
+def format_stats():
+    """
+    Return the cache's counters and hit rate, and the worker's request and failure counts.
+
+    Returns:
+    dict: FormatCache.stats() with "worker_requests" and "worker_failures" added.
+    """
+    stats = _cache.stats()
+    worker = _worker
+    stats["worker_requests"] = worker.requests if worker is not None else 0
+    stats["worker_failures"] = worker.failures if worker is not None else 0
+    return stats
+
+
+_worker_setting = os.environ.get("LLMIDE_FORMAT_WORKER", "")
+if _worker_setting and _worker_setting != "0":
+    use_worker(None if _worker_setting == "1" else _worker_setting)
@@ -0,0 +1,234 @@
+"""
+Console commands running in the background.
+
+A JobTable starts shell commands on their own pseudo-terminal and process
+group and hands back a job id.  A reader thread per job collects output into a
+bounded HeadTailBuffer; each poll takes the output gathered since the previous
+poll and starts a new window, so a chatty dev server cannot grow memory
+without limit.  Jobs can be waited on with a timeout and killed one at a time
+or all together.
+
+Finished jobs are forgotten when a new job starts, once their last output has
+been taken, and beyond the max_finished most recent ones, so a long-lived
+session keeps a bounded number of them.
+"""
+
+import os
+import signal
+import subprocess
+import threading
+
+from .capture import HeadTailBuffer, DEFAULT_HEAD_BYTES, DEFAULT_TAIL_BYTES
+from .ptyio import open_pty
+
+# Finished jobs kept for their status and unread output; older ones are forgotten.
+MAX_FINISHED_JOBS = 20
+
+
+class Job:
+    """
+    A background console command.
+
+    Attributes:
+    job_id (int): The id used to refer to the job.
+    command (str): The shell command line.
+    process (subprocess.Popen): The shell running the command.
+    collected (bool): Whether the job has exited and all of its output has been taken.
+    """
+
+    def __init__(self, job_id, command, process, master_fd, head_size, tail_size):
+        self.job_id = job_id
+        self.command = command
+        self.process = process
+        self._head_size = head_size
+        self._tail_size = tail_size
+        self._lock = threading.Lock()
+        self._output = HeadTailBuffer(head_size, tail_size)
+        self.collected = False
+        self._spill_paths = []
+        self._reader = threading.Thread(target=self._read_output, args=(master_fd,), daemon=True)
+        self._reader.start()
+
+    def _read_output(self, fd):
+        try:
+            while True:
+                data = os.read(fd, 65536)
+                if not data:
+                    break
+                with self._lock:
+                    self._output.write(data)
+        except OSError:
+            # The pty reports EIO once every process holding it has exited.
+            pass
+        finally:
+            os.close(fd)
+
+    @property
+    def returncode(self):
+        """The exit status, or None while the job is running."""
+        return self.process.poll()
+
+    def status(self):
+        """Return a short description of the job's state."""
+        returncode = self.returncode
+        if returncode is None:
+            return "running"
+        if returncode < 0:
+            return f"killed by signal {-returncode}"
+        return f"exited with status {returncode}"
+
+    def take_output(self):
+        """Return the output gathered since the last call and start a new window."""
+        # Checked first: once the reader has stopped, nothing more is written.
+        finished = self.returncode is not None and not self._reader.is_alive()
+        with self._lock:
+            output, self._output = self._output, HeadTailBuffer(self._head_size, self._tail_size)
+        if finished:
+            self.collected = True
+        output.close()
+        if output.spill_path:
+            # The rendered output points the agent at it, so it is kept until the job is forgotten.
+            self._spill_paths.append(output.spill_path)
+        return output.render()
+
+    def discard(self):
+        """Delete the files the job's output was saved to. Called when the job is forgotten."""
+        with self._lock:
+            self._output.close()
+            paths = self._spill_paths + ([self._output.spill_path] if self._output.spill_path else [])
+            self._spill_paths = []
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def wait(self, timeout=None):
+        """
+        Wait for the job to exit and its output to be read.
+
+        Returns:
+        bool: Whether the job exited within timeout seconds.
+        """
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            return False
+        # Background children may keep the pty open, so don't wait for the reader indefinitely.
+        self._reader.join(0.1)
+        return True
+
+    def signal(self, sig):
+        """Send sig to the job's process group."""
+        if self.returncode is None:
+            try:
+                os.killpg(self.process.pid, sig)
+            except OSError:
+                pass
+
+
+class JobTable:
+    """
+    Starts and tracks background console commands.
+
+    Parameters:
+    head_size (int): Bytes kept from the start of each poll window.
+    tail_size (int): Bytes kept from the end of each poll window.
+    max_finished (int): The most finished jobs kept.
+    """
+
+    def __init__(self, head_size=DEFAULT_HEAD_BYTES, tail_size=DEFAULT_TAIL_BYTES, max_finished=MAX_FINISHED_JOBS):
+        self.head_size = head_size
+        self.tail_size = tail_size
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def start(self, command, shell_path=None):
+        """
+        Start command in the background.
+
+        Parameters:
+        command (str): The shell command line.
+        shell_path (str): The shell executable, or None for /bin/sh.
+
+        Returns:
+        Job: The new job.
+        """
+        master_fd, slave_fd = open_pty()
+        try:
+            process = subprocess.Popen(command, shell=True, executable=shell_path or None, stdin=slave_fd,
+                                       stdout=slave_fd, stderr=slave_fd, close_fds=True, start_new_session=True)
+        except Exception:
+            os.close(master_fd)
+            raise
+        finally:
+            os.close(slave_fd)
+        with self._lock:
+            forgotten = self._evict_finished()
+            job = Job(self._next_id, command, process, master_fd, self.head_size, self.tail_size)
+            self._jobs[job.job_id] = job
+            self._next_id += 1
+        for old_job in forgotten:
+            old_job.discard()
+        return job
+
+    def _evict_finished(self):
+        """Drop the collected jobs and the oldest finished ones beyond max_finished. Returns the dropped jobs."""
+        finished = [job for job_id, job in sorted(self._jobs.items()) if job.returncode is not None]
+        forgotten = [job for job in finished if job.collected]
+        kept = [job for job in finished if not job.collected]
+        forgotten += kept[:max(0, len(kept) - self.max_finished)]
+        for job in forgotten:
+            del self._jobs[job.job_id]
+        return forgotten
+
+    def get(self, job_id):
+        """
+        Return the job with id job_id.
+
+        Raises:
+        KeyError: If there is no such job.
+        """
+        with self._lock:
+            if job_id not in self._jobs:
+                raise KeyError(f"No console job with id {job_id}.")
+            return self._jobs[job_id]
+
+    def jobs(self):
+        """Return all jobs, oldest first."""
+        with self._lock:
+            return [self._jobs[job_id] for job_id in sorted(self._jobs)]
+
+    def remove(self, job_id):
+        """Forget a job that has exited."""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None:
+            job.discard()
+
+    def kill(self, job_id, sig=signal.SIGTERM, timeout=5):
+        """
+        Signal a job's process group and wait for it to exit, escalating to SIGKILL after timeout seconds.
+
+        Returns:
+        Job: The killed job.
+        """
+        job = self.get(job_id)
+        job.signal(sig)
+        if not job.wait(timeout):
+            job.signal(signal.SIGKILL)
+            job.wait()
+        return job
+
+    def kill_all(self, sig=signal.SIGTERM, timeout=5):
+        """Kill every running job. Returns the jobs that were running."""
+        running = [job for job in self.jobs() if job.returncode is None]
+        for job in running:
+            job.signal(sig)
+        for job in running:
+            if not job.wait(timeout):
+                job.signal(signal.SIGKILL)
+                job.wait()
+        return running
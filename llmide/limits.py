@@ -0,0 +1,198 @@
+"""
+Resource limits and usage accounting for console commands.
+
+ConsoleLimits bounds a command's wall-clock time, CPU seconds, address space
+and output bytes.  CPU and address space are enforced by the kernel, set with
+ulimit by a /bin/sh that then execs the command's shell (preexec_fn is not
+safe in the threaded executor and daemon); wall-clock time and output are
+enforced by the parent,
+which kills the command's whole process group when either runs out.  Resource
+usage of the finished command comes from wait4.
+"""
+
+import math
+import os
+import signal
+import time
+from collections import namedtuple
+
+ConsoleLimits = namedtuple("ConsoleLimits", ["wall_seconds", "cpu_seconds", "memory_bytes", "output_bytes"],
+                           defaults=(None, None, None, None))
+ConsoleLimits.__doc__ = "Limits for a console command; None means unlimited."
+
+ResourceUsage = namedtuple("ResourceUsage", ["user_seconds", "system_seconds", "max_rss_bytes"])
+
+NO_LIMITS = ConsoleLimits()
+
+# Names accepted by parse_limits, mapped to ConsoleLimits fields.
+_LIMIT_NAMES = {
+    "wall": "wall_seconds",
+    "timeout": "wall_seconds",
+    "cpu": "cpu_seconds",
+    "memory": "memory_bytes",
+    "output": "output_bytes",
+}
+
+_SIZE_SUFFIXES = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+_TRIPPED_DESCRIPTIONS = {
+    "wall_seconds": "wall-clock limit of {}s",
+    "cpu_seconds": "CPU limit of {}s",
+    "output_bytes": "output limit of {} bytes",
+}
+
+
+def _parse_size(value):
+    value = value.strip().lower().rstrip("b")
+    multiplier = _SIZE_SUFFIXES.get(value[-1:], 1)
+    if value[-1:] in _SIZE_SUFFIXES:
+        value = value[:-1]
+    return int(float(value) * multiplier)
+
+
+def parse_limits(settings, base=NO_LIMITS):
+    """
+    Update limits from name=value settings.
+
+    Parameters:
+    settings (list of str): Settings such as "wall=30", "cpu=10", "memory=2G" or "output=1M".
+                            A value of "none" removes the limit.
+    base (ConsoleLimits): The limits to update.
+
+    Returns:
+    ConsoleLimits: The updated limits.
+
+    Raises:
+    ValueError: If a setting is malformed or names an unknown limit.
+    """
+    changes = {}
+    for setting in settings:
+        name, separator, value = setting.partition("=")
+        field = _LIMIT_NAMES.get(name.strip().lower())
+        if not separator or field is None:
+            raise ValueError(f"Invalid limit {setting!r}; use {', '.join(sorted(_LIMIT_NAMES))}=<value>.")
+        value = value.strip()
+        try:
+            if value.lower() in ("none", "off", ""):
+                changes[field] = None
+            elif field.endswith("_bytes"):
+                changes[field] = _parse_size(value)
+            else:
+                changes[field] = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid value {value!r} for limit {name!r}.")
+    return base._replace(**changes)
+
+
+def describe_limits(limits):
+    """Return a one-line description of limits."""
+    parts = [f"{name}={getattr(limits, field)}" for name, field in _LIMIT_NAMES.items()
+             if name != "timeout" and getattr(limits, field) is not None]
+    return ", ".join(parts) if parts else "no limits"
+
+
+def describe_tripped(limits, field):
+    """Return a description of the limit in field that was exceeded."""
+    return _TRIPPED_DESCRIPTIONS[field].format(getattr(limits, field)) + " exceeded"
+
+
+def shell_argv(command, shell_path, limits):
+    """
+    Return the argument list that runs command in shell_path under the kernel-enforced limits.
+
+    Without CPU or memory limits this is the list Popen(shell=True) would run.  With them, /bin/sh applies
+    the limits with ulimit and then execs the shell, so the command runs in the same process, limited from
+    its first instruction.  The CPU limit sends SIGXCPU at the soft limit and SIGKILL one second later.
+
+    Parameters:
+    command (str): The command line.
+    shell_path (str): The shell, or None for /bin/sh.
+    limits (ConsoleLimits): The limits.
+    """
+    shell_path = shell_path or "/bin/sh"
+    settings = []
+    if limits.cpu_seconds is not None:
+        seconds = max(1, math.ceil(limits.cpu_seconds))
+        # The soft limit is lowered first, as it may not exceed the hard one.
+        settings += [f"ulimit -S -t {seconds}", f"ulimit -H -t {seconds + 1}"]
+    if limits.memory_bytes is not None:
+        # ulimit -v counts kilobytes.
+        kilobytes = max(1, limits.memory_bytes // 1024)
+        settings += [f"ulimit -S -v {kilobytes}", f"ulimit -H -v {kilobytes}"]
+    if not settings:
+        return [shell_path, "-c", command]
+    script = " && ".join(settings + ['exec "$0" -c "$1"'])
+    return ["/bin/sh", "-c", script, shell_path, command]
+
+
+def kill_group(pid, sig=signal.SIGKILL):
+    """Send sig to the process group led by pid, ignoring groups that are already gone."""
+    try:
+        os.killpg(pid, sig)
+    except OSError:
+        pass
+
+
+def wait_with_usage(process, deadline=None):
+    """
+    Reap process with wait4, stopping at deadline.
+
+    Parameters:
+    process (subprocess.Popen): A process started in its own session.
+    deadline (float): A time.monotonic() deadline, or None to wait indefinitely.
+
+    Returns:
+    ResourceUsage: The process's resource usage, or None if it was still running at the deadline
+                   or was reaped elsewhere. process.returncode is set when it has exited.
+    """
+    delay = 0.0005
+    while True:
+        try:
+            if deadline is None:
+                pid, status, rusage = os.wait4(process.pid, 0)
+            else:
+                pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+        except ChildProcessError:
+            # Reaped by Popen.poll() elsewhere, for example by terminate_process.
+            process.poll()
+            return None
+        except InterruptedError:
+            continue
+        if pid:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is in kilobytes on Linux.
+            return ResourceUsage(rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss * 1024)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.05)
+
+
+def tripped_limit(limits, returncode, usage):
+    """
+    Work out whether the CPU limit stopped a command: it died from SIGXCPU, or from SIGKILL after using
+    up its CPU time. A command that used that much CPU time but exited by itself did not trip it.
+
+    An address-space limit makes allocations fail instead of sending a signal, so it
+    cannot be told apart from other failures and is not reported here.
+
+    Returns:
+    str: "cpu_seconds", or None.
+    """
+    if limits.cpu_seconds is None or returncode is None:
+        return None
+    # A shell reports a command killed by a signal as 128 plus the signal number.
+    killed_by = -returncode if returncode < 0 else returncode - 128
+    if killed_by == signal.SIGXCPU:
+        return "cpu_seconds"
+    # SIGKILL comes at the hard limit, a second after the soft one; other causes use less CPU time.
+    cpu_seconds = usage.user_seconds + usage.system_seconds if usage is not None else 0
+    if killed_by == signal.SIGKILL and cpu_seconds >= limits.cpu_seconds:
+        return "cpu_seconds"
+    return None
+
+def describe_usage(usage):
+    """Return a one-line description of usage."""
+    return (f"user {usage.user_seconds:.2f}s, sys {usage.system_seconds:.2f}s, "
+            f"max RSS {usage.max_rss_bytes / 1024 ** 2:.1f} MB")
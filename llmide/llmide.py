@@ -1,71 +1,32 @@
-import re
-from collections import namedtuple
 from . import llmide_functions
-from PIL import Image, UnidentifiedImageError
+from . import registry
+from .commandparser import CommandInfo, StreamingCommandParser, parse_commands, skip_whitespace, tokenize_commands
+from .executor import classify, iter_execute_commands
+from .session import use_session
+from . import tracing
 import io
 import base64
 import os
-import requests
+from collections import namedtuple
 
 def split_preserving_quotes(s):
-    # This regex will split by spaces but preserve quoted segments
-    pattern = r'(?:"[^"]*"|\'[^\']*\'|\S)+'
-    matches = re.findall(pattern, s)
-    
-    # Remove the quotes from the matches
-    result = [match[1:-1] if match[0] in ('"', "'") else match for match in matches]
-    return result
-
-# Example usage
-#input_string = 'This is a "quoted segment" and this is \'another one\''
-#split_result = split_preserving_quotes(input_string)
-#print(split_result)
+    # Split by spaces but preserve quoted segments, removing their quotes
+    return registry.split_preserving_quotes(s)
 
 
 def process_slice(content):
-    # Regex pattern to find the command and arguments
-    command_pattern = r"^Command: (\S+)\s*(.*)$"
-    # Updated regex pattern to ignore the language specifier in the opening backticks
-    #backtick_pattern = r"`````(?:\w+)?\s*(.*?)`````"
-    # Updated to catch special characters
-    backtick_pattern = r"`````(?:[\w#\+\-]+)?\s*(.*?)`````"
-    
-    # Searching for the command and arguments
-    command_match = re.search(command_pattern, content, re.MULTILINE)
-    if command_match:
-        command = command_match.group(1)
-        arguments = command_match.group(2)
-        command_end_pos = command_match.end()
-    else:
-        command = None
-        arguments = None
-        command_end_pos = -1
-    
-    # Searching for content within backticks
-    backtick_match = None
-    backtick_match = re.search(backtick_pattern, content, re.DOTALL)
-    if backtick_match:
-        backtick_content = backtick_match.group(1)
-        backtick_start_pos = backtick_match.start()
-        backtick_end_pos = backtick_match.end()
-    else:
-        backtick_content = None
-        backtick_end_pos = -1
-        backtick_start_pos = -1
-
-    #ignore backticks if not directly attached to command
-    if (backtick_start_pos - command_end_pos > 1):
-        backtick_content = None
-        backtick_end_pos = -1
-
-    split_position = max(command_end_pos, backtick_end_pos)
-    remaining_content = content[split_position:].strip()
-    if command:
-        return command, arguments, backtick_content, remaining_content
-    else:
-        return None, None, None, None
+    """
+    Split the first command off the front of content.
+
+    Returns:
+    tuple: (command, arguments, backtick_content, remaining_content), or four Nones when
+           content holds no command.
+    """
+    for token in tokenize_commands(content):
+        command, arguments, backtick_content = token.info
+        return command, arguments, backtick_content, content[token.end:].strip()
+    return None, None, None, None
 
-CommandInfo = namedtuple('CommandInfo', ['command', 'arguments', 'backtick_content'])
 
 def concise_representation(input_string, max_chars):
     if len(input_string) <= max_chars:
@@ -82,58 +43,229 @@ def concise_representation(input_string, max_chars):
 #cut the output at the final read command or first non read command after a read command
 def filter_content(content):
     read_command_encountered = False
-    command, arguments, backtick_content, remaining_content = process_slice(content)
-    if command:
-        command = CommandInfo(command, arguments, backtick_content)
-        if command =='read_file':
+    clip_position = 0
+    for token in tokenize_commands(content):
+        if token.info.command == 'read_file':
             read_command_encountered = True
-    previous_remaining_content = remaining_content
-    while command:
-        command, arguments, backtick_content, remaining_content = process_slice(remaining_content)
-        if command:
-            if command =='read_file':
-                read_command_encountered = True
-            elif read_command_encountered:
-                n_to_copy = len(content) - len(previous_remaining_content)
-                return content[:n_to_copy]#clip here
-            previous_remaining_content = remaining_content
+        elif read_command_encountered:
+            return content[:clip_position]#clip here
+        clip_position = skip_whitespace(content, token.end)
     return content
 
-def process_content(content):
-    commands = []
-    command, arguments, backtick_content, remaining_content = process_slice(content)
-    if command:
-        commands.append(CommandInfo(command, arguments, backtick_content))
-    #append all of the above to the structure properly
-    while command:
-        command, arguments, backtick_content, remaining_content = process_slice(remaining_content)
-        if command:
-            commands.append(CommandInfo(command, arguments, backtick_content))
-        #append all of the above to the structure properly
-    response = ""
-    image_data_tuple_array = []
-    if len(commands) == 0:
-        return "End.", []
-    for command in commands:
-        if command.command == "view_image":
-            command_response, image_array = view_images(command.arguments)
-            for image_mediatype_tuple in image_array:
-                image_data_tuple_array.append(image_mediatype_tuple)
-        elif command.command == "create_image":
-            args = args = split_preserving_quotes(command.arguments)
-            command_response, image_array = create_image(*args)
-        else:
-            command_response = (_execute_command(command.command, command.arguments, command.backtick_content) or "ok") + "\n"
-            if command.command == "run_console_command":            
-                limit = 10000
-                if len(command_response) >= limit:
-                    concise_command_response = concise_representation (command_response, limit)
-                    command_response = f"Truncating command response to {limit} characters...\n"+concise_command_response
-                    #print (command_response)
-        response += command_response
-    return response, image_data_tuple_array
-    
+CommandResult = namedtuple('CommandResult', ['command', 'response', 'images'])
+
+def _run_command(command):
+    """Execute a single CommandInfo and return its CommandResult, recording a span for it."""
+    with tracing.span("command", command=command.command, cache_hit=False) as span:
+        result = _execute_command_info(command)
+        if tracing.enabled():
+            span.set(**_command_sizes(command, result))
+    return result
+
+def _command_sizes(command, result):
+    """Return the span attributes describing the sizes of a command and its result."""
+    arguments_bytes = tracing.utf8_size(command.arguments)
+    backticks_bytes = tracing.utf8_size(command.backtick_content)
+    return {
+        "arguments_bytes": arguments_bytes,
+        "backticks_bytes": backticks_bytes,
+        "bytes_in": arguments_bytes + backticks_bytes,
+        "bytes_out": tracing.utf8_size(result.response),
+        "images": len(result.images),
+    }
+
+def _execute_command_info(command):
+    image_array = []
+    if command.command == "view_image":
+        command_response, image_array = view_images(command.arguments)
+    elif command.command == "create_image":
+        try:
+            args = registry.prepare_arguments(registry.lookup("create_image"), command.arguments, None)
+        except ValueError as e:
+            return CommandResult(command, f"Error: {e}\n", image_array)
+        command_response, _ = create_image(*args)
+    else:
+        command_response = _command_response(command.command,
+                                             _execute_command(command.command, command.arguments, command.backtick_content))
+    return CommandResult(command, command_response, image_array)
+
+def _command_response(command, result):
+    """Turn the return value of a command into its part of the response."""
+    command_response = (result or "ok") + "\n"
+    if command == "run_console_command":
+        limit = 10000
+        if len(command_response) >= limit:
+            concise_command_response = concise_representation (command_response, limit)
+            command_response = f"Truncating command response to {limit} characters...\n"+concise_command_response
+    return command_response
+
+def _command_runner(session):
+    """Return a function running a CommandInfo for session, or for the current session if it is None."""
+    if session is None:
+        return _run_command
+
+    def run(command):
+        with use_session(session):
+            return _run_command(command)
+    return run
+
+class ResponseWriter:
+    """
+    Collects command output into a single response, enforcing a global output budget.
+
+    Output is kept as a list of parts and joined once, so assembly is linear in the
+    size of the response. Once the budget is spent further output is dropped and
+    only counted, and getvalue() ends with a note saying how much was omitted.
+
+    Parameters:
+    max_chars (int): The maximum number of characters of command output to keep, or None for no limit.
+    """
+
+    def __init__(self, max_chars=None):
+        self.max_chars = max_chars
+        self.written = 0
+        self.omitted = 0
+        self.results = 0
+        self.images = []
+        self._parts = []
+
+    def write(self, text):
+        """Add text to the response, truncating it if it would exceed the budget."""
+        if self.max_chars is not None:
+            remaining = self.max_chars - self.written
+            if len(text) > remaining:
+                self.omitted += len(text) - max(remaining, 0)
+                text = text[:max(remaining, 0)]
+        if text:
+            self._parts.append(text)
+            self.written += len(text)
+
+    def add(self, result):
+        """Add a CommandResult's text and images."""
+        self.results += 1
+        self.write(result.response)
+        self.images.extend(result.images)
+
+    def getvalue(self):
+        """Return the assembled response text."""
+        if self.omitted:
+            note = f"\n[{self.omitted} characters of command output omitted: response budget of {self.max_chars} characters reached]\n"
+            return "".join(self._parts) + note
+        return "".join(self._parts)
+
+    def result(self):
+        """Return (response, image_data_tuple_array), as returned by process_content."""
+        if self.results == 0:
+            return "End.", []
+        return self.getvalue(), self.images
+
+def iter_process_content(content, max_workers=None, session=None):
+    """
+    Parse and execute every command in content, yielding a CommandResult per command.
+
+    Results are yielded in document order as soon as they are available, while later
+    independent commands may still be running.
+
+    Parameters:
+    content (str): The LLM response.
+    max_workers (int): Thread pool size for independent commands; 1 runs them sequentially.
+    session (Session): The session the commands run for, or None for the current session.
+
+    Returns:
+    iterator of CommandResult: One result per command.
+    """
+    with tracing.span("parse", bytes_in=len(content)) as span:
+        commands = parse_commands(content)
+        span.set(commands=len(commands))
+    return iter_execute_commands(commands, _command_runner(session), max_workers=max_workers)
+
+def process_content(content, max_workers=None, max_output_chars=None, session=None):
+    """
+    Parse and execute every command in content.
+
+    Independent commands run concurrently (see executor.execute_commands); the combined
+    output is the same as running them one after another.
+
+    Parameters:
+    content (str): The LLM response.
+    max_workers (int): Thread pool size for independent commands; 1 runs them sequentially.
+    max_output_chars (int): Global budget for the combined command output, or None for no limit.
+    session (Session): The session the commands run for, or None for the current session.
+
+    Returns:
+    tuple: (response, image_data_tuple_array)
+    """
+    with tracing.span("process_content") as span:
+        writer = ResponseWriter(max_output_chars)
+        for result in iter_process_content(content, max_workers=max_workers, session=session):
+            writer.add(result)
+        if tracing.enabled():
+            span.set(commands=writer.results, bytes_in=tracing.utf8_size(content),
+                     bytes_out=tracing.utf8_size(writer.getvalue()), omitted_chars=writer.omitted)
+        return writer.result()
+
+class StreamingProcessor:
+    """
+    Parses and executes commands while the response is still streaming.
+
+    Feed it the chunks of the response as they arrive. Read-only commands run as soon
+    as they are complete, on the calling thread, unless an earlier command is still
+    waiting; every other command waits for finish so a truncated or abandoned response
+    never applies partial edits. Results are returned in document order, exactly as
+    process_content would return them for the whole response.
+
+    Parameters:
+    max_output_chars (int): Global budget for the combined command output, or None for no limit.
+    session (Session): The session the commands run for, or None for the current session.
+    """
+
+    def __init__(self, max_output_chars=None, session=None):
+        self._run = _command_runner(session)
+        self._parser = StreamingCommandParser()
+        self._writer = ResponseWriter(max_output_chars)
+        self._deferred = []
+
+    def feed(self, chunk):
+        """Add the next chunk of the response text."""
+        self._dispatch(self._parser.feed(chunk))
+
+    def finish(self):
+        """
+        Mark the end of the response and run the remaining commands.
+
+        Returns:
+        tuple: (response, image_data_tuple_array), as returned by process_content.
+        """
+        self._dispatch(self._parser.close())
+        for result in iter_execute_commands(self._deferred, self._run):
+            self._writer.add(result)
+        self._deferred = []
+        return self._writer.result()
+
+    def _dispatch(self, tokens):
+        for token in tokens:
+            command = token.info
+            if not self._deferred and classify(command).read_only:
+                self._writer.add(self._run(command))
+            else:
+                self._deferred.append(command)
+
+def process_stream(chunks, max_output_chars=None, session=None):
+    """
+    Parse and execute the commands of a response given as an iterable of text chunks,
+    such as ``stream.text_stream``, starting read-only commands before the stream ends.
+
+    Returns:
+    tuple: (response, image_data_tuple_array), as returned by process_content.
+    """
+    processor = StreamingProcessor(max_output_chars, session=session)
+    for chunk in chunks:
+        processor.feed(chunk)
+    return processor.finish()
+
 def load_and_resize_image(image_path):
+    # PIL is imported on first use, so sessions that never view images do not pay for it.
+    from PIL import Image, UnidentifiedImageError
     try:
         # Check if the file exists
         if not os.path.exists(image_path):
@@ -194,7 +326,9 @@ def view_images(arguments):
     args = split_preserving_quotes(arguments)
     try:
         for argument in args:
-            image_base64, media_type = load_and_resize_image(argument)
+            with tracing.span("load_and_resize_image") as span:
+                image_base64, media_type = load_and_resize_image(argument)
+                span.set(bytes_out=len(image_base64) if media_type else 0)
             image_data_tuple_array.append((image_base64, media_type))
     except Exception as e:
         command_response = f"An error occured loading image(s): {e}"
@@ -218,6 +352,11 @@ def create_image(prompt, output_file, width=1024, height=1024):
     if not auth_key:
         return "Image generation error: getimg API key not found in environment variables.", []
 
+    try:
+        import requests
+    except ImportError as e:
+        return f"Image generation error: {e}", []
+
     url = "https://api.getimg.ai/v1/flux-schnell/text-to-image"
     headers = {
         "accept": "application/json",
@@ -254,26 +393,28 @@ def create_image(prompt, output_file, width=1024, height=1024):
 def _execute_command(command, arguments, backticks):
     if command is None:
         return "Error: Command name must be specified correctly."
-    if command != "run_console_command":
-        args = split_preserving_quotes(arguments)
-    else:
-        args = arguments
-    if not isinstance(args, list):
-        args = [args]
-    if backticks is not None:
-        args.append(backticks)
-    try:
-        function = getattr(llmide_functions, command.lower())
-    except AttributeError:
+    spec = registry.lookup(command)
+    if spec is None:
         return "Error: Command not found"
     try:
-        result = function(*args) if args else function()
+        args = registry.prepare_arguments(spec, arguments, backticks)
+    except ValueError as e:
+        return f"Error: {e}"
+    try:
+        result = spec.function(*args)
         return result if result is not None else "ok"
     except Exception as e:
         return f"Error executing command: {e}\n {command}, {arguments}, {backticks}"
 
-def terminate_process():
-    llmide_functions.terminate_process()
+registry.register("view_image", view_images, read_only=True, raw_arguments=True,
+                  paths=lambda args: args, returns_images=True)
+registry.register("create_image", create_image, paths=lambda args: args[1:2],
+                  coercers={2: int, 3: int}, returns_images=True)
+
+def terminate_process(session=None):
+    """Stop the console command and background jobs of session, or of the current session if it is None."""
+    with use_session(session):
+        llmide_functions.terminate_process()
 # Example usage:
 # content = """
 # Random content...
@@ -1,23 +1,33 @@
 from . import codemanipulator
 import os
 import signal
-import io
-import pty
 import subprocess
-import threading
 import sys
 from . import code_scissors
 import pwd
 from . import findreplace
 import difflib
+import itertools
+import time
+from collections import namedtuple
+from .capture import ConsoleCapture, DEFAULT_HEAD_BYTES, DEFAULT_TAIL_BYTES
+from .shell import ShellSession
+from .ptyio import TtyEcho, open_pty, pump_pty
+from .session import all_sessions, current_session
+from .limits import (NO_LIMITS, describe_limits, describe_tripped, describe_usage, kill_group, parse_limits,
+                     shell_argv, tripped_limit)
 
 # Use /dev/tty for all feedback output, reserving stdout for the stdout tool.
 # Opened lazily so that importing this module in a non-TTY environment doesn't fail.
+# A session can send its feedback elsewhere by setting Session.tty.
 _tty = None
 
 def _get_tty():
-    """Return the TTY file object, opening it lazily. Falls back to stderr."""
+    """Return the current session's TTY file object, opening the shared one lazily. Falls back to stderr."""
     global _tty
+    session_tty = current_session().tty
+    if session_tty is not None:
+        return session_tty
     if _tty is None:
         try:
             _tty = open('/dev/tty', 'w')
@@ -36,6 +46,14 @@ def get_default_shell():
         # Get the default shell from the user's entry in the password database on Unix-like systems
         return pwd.getpwuid(os.getuid()).pw_shell
     
+def _read_source(file_path):
+    """Return the text of file_path, through the current session's file cache."""
+    return current_session().file_cache.read(file_path)
+
+def _write_source(file_path, text, atomic=False):
+    """Write text to file_path, keeping the current session's file cache up to date."""
+    current_session().file_cache.write(file_path, text, atomic=atomic)
+
 def find_and_replace(file_path, command):
     """
     Perform a find and replace operation on a file and return the diff.
@@ -49,8 +67,7 @@ def find_and_replace(file_path, command):
          along with the diff of changes made.
     """
     try:
-        with open(file_path, "r") as file:
-            original_content = file.read()
+        original_content = _read_source(file_path)
     except Exception as e:
         return (file_path + " read error: " + str(e))
 
@@ -67,8 +84,7 @@ def find_and_replace(file_path, command):
     ))
 
     try:
-        with open(file_path, "w") as file:
-            file.write(modified_content)
+        _write_source(file_path, modified_content)
         return (f"{file_path} successfully written.\n\nDiff:\n{diff}")
     except Exception as e:
         return (file_path + " write error: " + str(e))
@@ -89,70 +105,60 @@ def find_and_replace(file_path, command):
 
 def insert_text_after_matching_line(file_path, line, new_code):
     try:
-        with open(file_path, "r") as file:
-            source_code = file.read()
+        source_code = _read_source(file_path)
     except Exception as e:
         return (file_path + " read error: " + str(e))
     source_code = code_scissors.insert_after(source_code, line, new_code)
     try:
-        with open(file_path, "w") as file:
-            file.write(source_code)
+        _write_source(file_path, source_code)
         return (file_path + " successfully written.")
     except Exception as e:
         return (file_path + " write error: " + str(e))
     
 def insert_text_before_matching_line(file_path, line, new_code):
     try:
-        with open(file_path, "r") as file:
-            source_code = file.read()
+        source_code = _read_source(file_path)
     except Exception as e:
         return (file_path + " read error: " + str(e))
     source_code = code_scissors.insert_before(source_code, line, new_code)
     try:
-        with open(file_path, "w") as file:
-            file.write(source_code)
+        _write_source(file_path, source_code)
         return (file_path + " successfully written.")
     except Exception as e:
         return (file_path + " write error: " + str(e))
     
 def replace_text_before_matching_line(file_path, line, new_code):
     try:
-        with open(file_path, "r") as file:
-            source_code = file.read()
+        source_code = _read_source(file_path)
     except Exception as e:
         return (file_path + " read error: " + str(e))
     source_code = code_scissors.replace_before(source_code, line, new_code)
     try:
-        with open(file_path, "w") as file:
-            file.write(source_code)
+        _write_source(file_path, source_code)
         return (file_path + " successfully written.")
     except Exception as e:
         return (file_path + " write error: " + str(e))
     
 def replace_text_after_matching_line(file_path, line, new_code):
     try:
-        with open(file_path, "r") as file:
-            source_code = file.read()
+        source_code = _read_source(file_path)
     except Exception as e:
         return (file_path + " read error: " + str(e))
     source_code = code_scissors.replace_after(source_code, line, new_code)
     try:
-        with open(file_path, "w") as file:
-            file.write(source_code)
+        _write_source(file_path, source_code)
         return (file_path + " successfully written.")
     except Exception as e:
         return (file_path + " write error: " + str(e))
     
 def replace_text_between_matching_lines(file_path, line1, line2, new_code):
     try:
-        with open(file_path, "r") as file:
-            source_code = file.read()
+        source_code = _read_source(file_path)
     except Exception as e:
         return (file_path + " read error: " + str(e))
     source_code = code_scissors.replace_between(source_code, line1, line2, new_code)
     try:
-        with open(file_path, "w") as file:
-            file.write(source_code)
+        _write_source(file_path, source_code)
         return (file_path + " successfully written.")
     except Exception as e:
         return (file_path + " write error: " + str(e))
@@ -168,9 +174,8 @@ def read_code_signatures_and_docstrings(file_path):
     str: The signatures and docstrings of the functions and classes in the file, or an error message if reading the file fails.
     """
     try:
-        with open(file_path, "r") as file:
-            source_code = file.read()
-            return codemanipulator.get_signatures_and_docstrings(source_code)
+        source_code = _read_source(file_path)
+        return codemanipulator.get_signatures_and_docstrings(source_code)
     except Exception as e:
         return (file_path + " read error: " + str(e))
 
@@ -187,13 +192,13 @@ def replace_docstring_at_address(file_path, address, new_docstring):
     str: A message indicating whether the operation was successful or an error occurred.
     """
     try:
-        with open(file_path, "r") as file:
-            source_code = file.read()
+        source_code = _read_source(file_path)
     except Exception as e:
         return (file_path + " read error: " + str(e))
     source_code = codemanipulator.change_docstring(source_code, address, new_docstring)
     try:
-        return codemanipulator.write_code(file_path, source_code)
+        _write_source(file_path, source_code)
+        return (file_path + " successfully written.")
     except Exception as e:
         return (file_path + " write error: " + str(e))
 
@@ -209,12 +214,51 @@ def read_code_at_address(file_path, address):
     str: The source code at the specified address, or a message if not found or an error occurred.
     """
     try:
-        with open(file_path, "r") as file:
-            source_code = file.read()
-            return codemanipulator.read_code_at_address(source_code, address)
+        source_code = _read_source(file_path)
+        return codemanipulator.read_code_at_address(source_code, address)
     except Exception as e:
         return (file_path + " read error: " + str(e))
 
+def find_symbol(name, root="."):
+    """
+    Find where a class, function or assignment is defined in the Python files under a directory.
+
+    Parameters:
+    name (str): A qualified name ("package.module.Class.method"), an address ("Class.method") or a name ("method"). End it with "*" to find every symbol starting with it.
+    root (str): The directory whose files are searched; the index is kept in .llmide/symbols.db under it.
+
+    Returns:
+    str: The file, line span, qualified name, signature and docstring summary of each match, or a message if none matched or an error occurred.
+    """
+    from . import symbolindex
+    try:
+        symbols = symbolindex.get_index(root).find(name)
+    except Exception as e:
+        return f"Symbol index error: {e}"
+    if not symbols:
+        return f"No symbols match '{name}'."
+    return symbolindex.format_symbols(symbols)
+
+def list_symbols(package="", root="."):
+    """
+    List the classes, functions and assignments of a package or module and its subpackages.
+
+    Parameters:
+    package (str): A dotted package or module name relative to root, such as "llmide" or "llmide.codemanipulator". Leave it out to list every module.
+    root (str): The directory whose files are searched; the index is kept in .llmide/symbols.db under it.
+
+    Returns:
+    str: The file, line span, qualified name, signature and docstring summary of each symbol, or a message if there are none or an error occurred.
+    """
+    from . import symbolindex
+    try:
+        symbols = symbolindex.get_index(root).list_package(package)
+    except Exception as e:
+        return f"Symbol index error: {e}"
+    if not symbols:
+        return f"No symbols found in '{package}'."
+    return symbolindex.format_symbols(symbols)
+
 def replace_code_at_address(file_path, address, new_code):
     """
     Replace the code at a specific address within the provided source code file with the new code.
@@ -229,8 +273,7 @@ def replace_code_at_address(file_path, address, new_code):
     """
     source_code = ""
     try:
-        with open(file_path, "r") as file:
-            source_code = file.read()
+        source_code = _read_source(file_path)
     except Exception as e:
         return (file_path + " read error: " + str(e))
     try:
@@ -238,7 +281,8 @@ def replace_code_at_address(file_path, address, new_code):
     except Exception as e:
         return (file_path + " replace error: " + str(e))
     try:
-        return codemanipulator.write_code(file_path, source_code)
+        _write_source(file_path, source_code)
+        return (file_path + " successfully written.")
     except Exception as e:
         return (file_path + " write error: " + str(e))
 
@@ -255,14 +299,12 @@ def add_code_after_address(file_path, address, new_code):
     str: A message indicating whether the operation was successful or an error occurred.
     """
     try:
-        with open(file_path, "r") as file:
-            source_code = file.read()
+        source_code = _read_source(file_path)
     except Exception as e:
         return (file_path + " read error: " + str(e))
     source_code = codemanipulator.insert_code_after(source_code, address, new_code)
     try:
-        with open(file_path, "w") as file:
-            file.write(source_code)
+        _write_source(file_path, source_code)
         return (file_path + " successfully written.")
     except Exception as e:
         return (file_path + " write error: " + str(e))
@@ -280,14 +322,12 @@ def add_code_before_address(file_path, address, new_code):
     str: A message indicating whether the operation was successful or an error occurred.
     """
     try:
-        with open(file_path, "r") as file:
-            source_code = file.read()
+        source_code = _read_source(file_path)
     except Exception as e:
         return (file_path + " read error: " + str(e))
     source_code = codemanipulator.insert_code_before(source_code, address, new_code)
     try:
-        with open(file_path, "w") as file:
-            file.write(source_code)
+        _write_source(file_path, source_code)
         return (file_path + " successfully written.")
     except Exception as e:
         return (file_path + " write error: " + str(e))
@@ -304,19 +344,62 @@ def remove_code_at_address(file_path, address):
     str: A message indicating whether the operation was successful or an error occurred.
     """
     try:
-        with open(file_path, "r") as file:
-            source_code = file.read()
+        source_code = _read_source(file_path)
     except Exception as e:
         return (file_path + " read error: " + str(e))
     source_code = codemanipulator.remove_code(source_code, address)
     try:
-        with open(file_path, "w") as file:
-            file.write(source_code)
+        _write_source(file_path, source_code)
         return (file_path + " successfully written.")
     except Exception as e:
         return (file_path + " write error: " + str(e))
 
 
+def apply_code_edits(file_path, edits):
+    """
+    Apply several code edits to a source code file at once and return the diff. Nothing is written unless every edit succeeds.
+
+    Each edit starts with a line "@@ <action> <address>", followed by its code:
+
+        @@ replace Greeter.greet
+        def greet(self, name):
+            return f"Hi, {name}"
+        @@ insert_after Greeter.greet
+        def wave(self):
+            return "o/"
+        @@ docstring Greeter
+        "Greets people."
+        @@ remove old_helper
+
+    Parameters:
+    file_path (str): The path to the source code file.
+    edits (str): The edits, applied in order. The actions are create, replace, remove (which takes no code), insert_before, insert_after and docstring; addresses are as for replace_code_at_address.
+
+    Returns:
+    str: A message indicating whether the file was written, with the diff of all the edits, or the error that stopped them.
+    """
+    try:
+        original_content = _read_source(file_path)
+    except Exception as e:
+        return (file_path + " read error: " + str(e))
+    try:
+        modified_content = codemanipulator.apply_edits(original_content, codemanipulator.parse_edits(edits))
+    except Exception as e:
+        return (file_path + " edit error: " + str(e) + " No edits were written.")
+    diff = "\n".join(difflib.unified_diff(
+        original_content.splitlines(),
+        modified_content.splitlines(),
+        lineterm="",
+        fromfile="original",
+        tofile="modified"
+    ))
+    try:
+        _write_source(file_path, modified_content, atomic=True)
+        return (f"{file_path} successfully written.\n\nDiff:\n{diff}")
+    except Exception as e:
+        return (file_path + " write error: " + str(e))
+
+
 def manipulate_file_agent(file_path, instructions):
 
     client = claudeclient.AIClient()
@@ -494,9 +577,8 @@ def write_file(file_path, code):
     try:
         # Check if the file exists and read its contents to get the original length
         try:
-            with open(file_path, "r") as file:
-                original_content = file.read()
-                original_length = len(original_content)
+            original_content = _read_source(file_path)
+            original_length = len(original_content)
         except FileNotFoundError:
             original_content = ""  # File does not exist, so original content is empty
             original_length = 0
@@ -511,8 +593,7 @@ def write_file(file_path, code):
         ))
 
         # Write the new content to the file
-        with open(file_path, "w") as file:
-            file.write(code)
+        _write_source(file_path, code)
 
         return (f"{file_path} successfully written. Original length: {original_length}, "
                 f"New length: {new_length}.\n\nDiff:\n{diff}")
@@ -530,96 +611,354 @@ def read_file(file_path):
     Returns:
     str: The code as a string.
     """
-    with open(file_path, "r") as file:
-        return file.read()
+    return _read_source(file_path)
+
+def read_file_lines(file_path, start_line, line_count=200):
+    """
+    Read a range of lines from a file, such as a saved console log, without loading the whole file.
+
+    Parameters:
+    file_path (str): The path of the file to read from.
+    start_line (int): The 1-based number of the first line to read.
+    line_count (int): The number of lines to read (default: 200).
+
+    Returns:
+    str: The requested lines, preceded by a header with the line range.
+    """
+    start_line = max(1, int(start_line))
+    line_count = max(1, int(line_count))
+    lines = []
+    with open(file_path, "r", errors="replace") as file:
+        for line in itertools.islice(file, start_line - 1, start_line - 1 + line_count):
+            lines.append(line)
+    if not lines:
+        return f"{file_path} has fewer than {start_line} lines."
+    return f"{file_path} lines {start_line}-{start_line + len(lines) - 1}:\n" + "".join(lines)
     
 def terminate_process():
-    global process
-    if process: 
+    """Stop the current session's foreground console command and its background jobs."""
+    session = current_session()
+    if session.process:
         print("Terminating process...", file=_get_tty())
-        process.terminate()
+    running = [job for job in session.console_jobs.jobs() if job.returncode is None]
+    if running:
+        print(f"Terminating {len(running)} background job(s)...", file=_get_tty())
+    # Console commands lead their own process group; signal everything they started.
+    session.terminate(signal.SIGTERM)
 
 # Signal handler for SIGTERM
 def handle_sigterm(signum, frame):
     print("Sigterm caught", file=_get_tty())
-    terminate_process()
+    for session in all_sessions():
+        session.terminate(signal.SIGTERM)
 
 #register it
 signal.signal(signal.SIGTERM, handle_sigterm)
-    
-def run_console_command(command: str) -> str:
+
+# Console output is captured as a bounded head and tail; the middle is counted and,
+# with CONSOLE_SPILL enabled, saved to a temporary file for paging with read_file_lines.
+CONSOLE_HEAD_BYTES = DEFAULT_HEAD_BYTES
+CONSOLE_TAIL_BYTES = DEFAULT_TAIL_BYTES
+CONSOLE_SPILL = False
+# Console output is echoed to the tty at most once per interval (seconds).
+CONSOLE_ECHO_INTERVAL = 0.05
+# With CONSOLE_COMPACT enabled, progress-bar redraws and escape sequences are removed and
+# runs of repeated lines collapsed before capture. CONSOLE_SPILL then saves the raw stream.
+CONSOLE_COMPACT = True
+
+# With PERSISTENT_SHELL enabled, console commands run one after another in a single
+# long-lived shell, so the working directory and exported variables carry over and
+# the shell's startup cost is paid once.  Otherwise every command gets a fresh shell.
+# Each Session has its own shell.
+PERSISTENT_SHELL = os.getenv("LLMIDE_PERSISTENT_SHELL", "") == "1"
+
+def _get_shell_session():
+    """Return the current session's persistent shell, creating it on first use."""
+    session = current_session()
+    if session.shell_session is None:
+        session.shell_session = ShellSession(get_default_shell())
+    return session.shell_session
+
+def _prepare_console_command(command):
+    """Turn a run_console_command argument string into the command line for the shell."""
+    if (command.startswith('"') and command.endswith('"')) or (command.startswith("'") and command.endswith("'")):
+        command = command[1:-1]
+    # Replace escaped inner quotes (\") with literal quotes (")
+    # so that bash -c receives proper double-quoted strings.
+    # Without this, \" in bash only escapes a single " character
+    # but does NOT create a double-quoted context, causing spaces
+    # and special characters (like parentheses) to be misinterpreted.
+    return command.replace('\\"', '"')
+
+def reset_console():
     """
-    Executes a console command using a specified shell or the system default and returns the command's output.
+    Restart the persistent console shell, discarding its working directory, variables and background jobs.
 
-    :param command: A string containing the console command to be executed.
-    :return: The output from the command.
+    Returns:
+    str: A confirmation message.
+    """
+    shell = current_session().shell_session
+    if shell is None or not shell.alive:
+        return "Console shell is not running; the next command starts a fresh one."
+    shell.reset()
+    return "Console shell restarted."
+    
+# Default limits for console commands. set_console_limits changes them for the current
+# session, and limits= overrides them for one run_console_command. CPU and memory limits
+# apply to spawned shells only, since a persistent shell would carry them over to every
+# later command.
+CONSOLE_LIMITS = NO_LIMITS
+
+def _console_limits():
+    """Return the current session's default console limits."""
+    limits = current_session().console_limits
+    return limits if limits is not None else CONSOLE_LIMITS
+
+ConsoleResult = namedtuple("ConsoleResult", ["output", "returncode", "tripped", "usage"])
+ConsoleResult.__doc__ = """The outcome of a console command: its rendered output, exit status (None if
+unknown), the ConsoleLimits field of the limit that stopped it (or None) and its ResourceUsage (or None)."""
+
+def set_console_limits(*settings):
     """
-    global process
+    Set the default limits for console commands in the current session.
 
-    def remove_surrounding_quotes(s: str) -> str:
-        if (s.startswith('"') and s.endswith('"')) or (s.startswith("'") and s.endswith("'")):
-            return s[1:-1]
-        return s
+    Parameters:
+    *settings: Settings such as wall=30 (seconds), cpu=10 (seconds), memory=2G or output=1M (bytes).
+               A value of none removes the limit. With no settings, the current limits are shown.
 
-    def read_output(fd, output_list):
-        try:
-            while True:
-                data = os.read(fd, io.DEFAULT_BUFFER_SIZE).decode()
-                if not data:
-                    break
-                _get_tty().write(data)
-                _get_tty().flush()
-                output_list.append(data)
-        except OSError:
-            # Handle the case where the file descriptor is closed
-            pass
+    Returns:
+    str: The limits now in effect.
+    """
+    session = current_session()
+    try:
+        session.console_limits = parse_limits(settings, _console_limits())
+    except ValueError as e:
+        return f"Error: {e}"
+    return f"Console limits: {describe_limits(session.console_limits)}"
+
+def _new_console_capture(limits, on_limit):
+    """Return a ConsoleCapture configured from the CONSOLE_* settings."""
+    return ConsoleCapture(CONSOLE_HEAD_BYTES, CONSOLE_TAIL_BYTES, spill=CONSOLE_SPILL, compact=CONSOLE_COMPACT,
+                          echo=TtyEcho(_get_tty(), interval=CONSOLE_ECHO_INTERVAL),
+                          output_limit=limits.output_bytes, on_limit=on_limit)
+
+def _spawn_console(command, limits):
+    """
+    Start a prepared command line in a fresh shell on a new pseudo-terminal.
 
+    Returns:
+    tuple: (subprocess.Popen, master_fd) - the process and the pty master to read its output from.
+    """
+    # Create a pseudo-terminal
+    master_fd, slave_fd = open_pty()
+    shell_path = get_default_shell()
     try:
-        output = []
+        # Each command gets its own session, so that a limit or an interrupt can
+        # kill everything it started.
+        process = subprocess.Popen(shell_argv(command, shell_path, limits), stdin=slave_fd, stdout=slave_fd,
+                                   stderr=slave_fd, close_fds=True, start_new_session=True)
+    except Exception:
+        os.close(master_fd)
+        raise
+    finally:
+        # Close the slave fd in the parent process
+        os.close(slave_fd)
+    return process, master_fd
+
+def _run_console(command, limits):
+    """
+    Run a prepared command line under limits, echoing its output to the tty.
+
+    Returns:
+    ConsoleResult: The outcome of the command.
+    """
+    session = current_session()
+    capture = _new_console_capture(limits, lambda: kill_group(session.process.pid))
+    state = {"tripped": None}
+
+    def echo_and_capture(data):
+        capture.write(data)
+        if capture.limit_exceeded and not state["tripped"]:
+            state["tripped"] = "output_bytes"
+
+    returncode = None
+    usage = None
+    if PERSISTENT_SHELL:
+        shell = _get_shell_session()
+        with session.shell_lock:
+            try:
+                shell.start()
+                session.process = shell.process
+                returncode = shell.run(command, echo_and_capture, timeout=limits.wall_seconds)
+                if returncode is None and not state["tripped"]:
+                    capture.write(b"\n[Console shell exited; the next command starts a fresh one]\n")
+            except subprocess.TimeoutExpired:
+                state["tripped"] = "wall_seconds"
+            except KeyboardInterrupt:
+                # The interrupted command may still be running; start over with a clean shell.
+                shell.close()
+            finally:
+                session.process = None
+    else:
+        deadline = time.monotonic() + limits.wall_seconds if limits.wall_seconds is not None else None
+        process, master_fd = _spawn_console(command, limits)
+        session.process = process
         try:
-            # Create a pseudo-terminal
-            master_fd, slave_fd = pty.openpty()
-            stripped_command = remove_surrounding_quotes(command)
-            # Replace escaped inner quotes (\") with literal quotes (")
-            # so that bash -c receives proper double-quoted strings.
-            # Without this, \" in bash only escapes a single " character
-            # but does NOT create a double-quoted context, causing spaces
-            # and special characters (like parentheses) to be misinterpreted.
-            stripped_command = stripped_command.replace('\\"', '"')
-
-            shell_path = get_default_shell()
-            
-            # Specify the executable shell if provided
-            if shell_path:
-                process = subprocess.Popen(stripped_command, shell=True, executable=shell_path, stdin=slave_fd, stdout=slave_fd, stderr=slave_fd, text=True, close_fds=True)
-            else:
-                process = subprocess.Popen(stripped_command, shell=True, stdin=slave_fd, stdout=slave_fd, stderr=slave_fd, text=True, close_fds=True)
-
-            # Close the slave fd in the parent process
-            os.close(slave_fd)
-
-            # Start a thread to read the output
-            output_thread = threading.Thread(target=read_output, args=(master_fd, output))
-            output_thread.start()
-
-            # Wait for the process to complete
-            process.wait()
-            output_thread.join()
-
-            # Close the master fd after the thread completes
-            os.close(master_fd)
+            # Read output until the process exits, or until the wall-clock limit
+            usage, timed_out = pump_pty(master_fd, process, echo_and_capture, deadline)
+            if timed_out:
+                state["tripped"] = "wall_seconds"
+                kill_group(process.pid)
+                usage, _ = pump_pty(master_fd, process, echo_and_capture)
         except KeyboardInterrupt:
-            pass
+            kill_group(process.pid, signal.SIGINT)
+            usage, timed_out = pump_pty(master_fd, process, echo_and_capture, time.monotonic() + 1)
+            if timed_out:
+                kill_group(process.pid)
+                usage, _ = pump_pty(master_fd, process, echo_and_capture)
+        finally:
+            os.close(master_fd)
+            session.process = None
+        returncode = process.returncode
+        if not state["tripped"]:
+            state["tripped"] = tripped_limit(limits, returncode, usage)
+
+    rendered = capture.finish()
+    return ConsoleResult(rendered, returncode, state["tripped"], usage)
 
-        process = None
-        # Combine the output
-        combined_output = ''.join(output)
-        return combined_output if combined_output else "ok"
+def run_console_command(command: str, *, limits=None) -> str:
+    """
+    Executes a console command using a specified shell or the system default and returns the command's output.
+
+    :param command: A string containing the console command to be executed.
+    :param limits: ConsoleLimits for this call, instead of the session's default limits.
+    :return: The output from the command.
+    """
+    limits = limits if limits is not None else _console_limits()
+    try:
+        result = _run_console(_prepare_console_command(command), limits)
     except subprocess.CalledProcessError as e:
         return f"An error occurred: {e.stderr}"
     except Exception as e:
         return f"An error occurred: {str(e)}"
 
+    return _report_console_result(result, limits)
+
+def _report_console_result(result, limits):
+    """Record result in the session for logging and turn it into the text returned to the LLM."""
+    current_session().last_console_result = result
+    if result.usage is not None:
+        print(f"[exit {result.returncode}; {describe_usage(result.usage)}]", file=_get_tty())
+    combined_output = result.output
+    if result.tripped:
+        combined_output += f"\n[Command stopped: {describe_tripped(limits, result.tripped)}]"
+    elif limits.memory_bytes is not None and result.returncode and not PERSISTENT_SHELL:
+        combined_output += f"\n[Command failed with a memory limit of {limits.memory_bytes} bytes in effect]"
+    return combined_output if combined_output else "ok"
+
+# Background console jobs live in the session's job table. Each poll returns the output
+# gathered since the previous poll, bounded to the table's head and tail sizes.
+
+def _describe_job(job, output=None):
+    header = f"Job {job.job_id} ({job.status()}): {job.command}"
+    if output is None:
+        return header
+    return f"{header}\n{output if output else '(no new output)'}"
+
+def start_console_job(command):
+    """
+    Start a console command in the background and return its job id.
+
+    Parameters:
+    command (str): The console command to run.
+
+    Returns:
+    str: The job id, for use with poll_console_job, wait_console_job and kill_console_job.
+    """
+    try:
+        job = current_session().console_jobs.start(_prepare_console_command(command), get_default_shell())
+    except Exception as e:
+        return f"An error occurred: {str(e)}"
+    print(f"Started job {job.job_id}: {job.command}", file=_get_tty())
+    return f"Started job {job.job_id}: {job.command}"
+
+def poll_console_job(job_id):
+    """
+    Return the output a background job produced since it was last polled.
+
+    Parameters:
+    job_id (int): The job id returned by start_console_job.
+
+    Returns:
+    str: The job's state followed by its new output.
+    """
+    try:
+        job = current_session().console_jobs.get(job_id)
+    except KeyError as e:
+        return str(e.args[0])
+    return _describe_job(job, job.take_output())
+
+def wait_console_job(job_id, timeout_seconds=30):
+    """
+    Wait for a background job to exit, then return its new output.
+
+    Parameters:
+    job_id (int): The job id returned by start_console_job.
+    timeout_seconds (float): How long to wait before returning while the job is still running.
+
+    Returns:
+    str: The job's state followed by its new output.
+    """
+    try:
+        job = current_session().console_jobs.get(job_id)
+    except KeyError as e:
+        return str(e.args[0])
+    try:
+        job.wait(timeout_seconds)
+    except KeyboardInterrupt:
+        pass
+    return _describe_job(job, job.take_output())
+
+def kill_console_job(job_id):
+    """
+    Stop a background job and everything it started.
+
+    Parameters:
+    job_id (int): The job id returned by start_console_job.
+
+    Returns:
+    str: The job's final state followed by its remaining output.
+    """
+    try:
+        job = current_session().console_jobs.kill(job_id)
+    except KeyError as e:
+        return str(e.args[0])
+    return _describe_job(job, job.take_output())
+
+def kill_all_console_jobs():
+    """
+    Stop every running background job.
+
+    Returns:
+    str: The jobs that were stopped.
+    """
+    killed = current_session().console_jobs.kill_all()
+    if not killed:
+        return "No background jobs are running."
+    return "\n".join(_describe_job(job) for job in killed)
+
+def list_console_jobs():
+    """
+    List the background jobs and their states.
+
+    Returns:
+    str: One line per job.
+    """
+    jobs = current_session().console_jobs.jobs()
+    if not jobs:
+        return "No background jobs."
+    return "\n".join(_describe_job(job) for job in jobs)
+
 def stdout(*args):
     """
     Write content to stdout. This is the only way to produce stdout output,
@@ -633,8 +972,9 @@ def stdout(*args):
     str: A confirmation message.
     """
     content = args[-1] if args else ""
-    sys.stdout.write(content)
-    sys.stdout.flush()
+    stream = current_session().stdout or sys.stdout
+    stream.write(content)
+    stream.flush()
     return "Content written to stdout."
 
 def summarize(*args):
@@ -722,7 +1062,25 @@ def test_function(arg, backticks):
 
 # ── Web Browser Commands (Playwright) ──────────────────────────────
 
-from .web_browser import get_browser, close_browser
+def _web_browser():
+    """Import the browser module on first use, so only the web commands need Playwright."""
+    try:
+        from . import web_browser
+    except ImportError as e:
+        raise ImportError(f"the web commands need Playwright ({e}); install it with "
+                          "`pip install playwright && playwright install chromium`") from e
+    return web_browser
+
+
+def get_browser():
+    """Return the current session's WebBrowser."""
+    return _web_browser().get_browser()
+
+
+def close_browser():
+    """Close the current session's browser if it exists."""
+    if current_session().browser is not None:
+        _web_browser().close_browser()
 
 
 def web_navigate(url):
@@ -0,0 +1,139 @@
+"""
+Wire format between the llmide daemon and its clients.
+
+Every message is a JSON object, encoded as UTF-8 and sent as one frame: a
+4-byte big-endian length followed by that many bytes.  Requests carry an "op"
+field naming the operation; replies carry either the operation's fields or an
+"error" field.  Blocking socket helpers serve the client, and asyncio stream
+helpers serve the daemon.
+
+This module only uses the standard library, so clients stay cheap to import.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+
+_HEADER = struct.Struct(">I")
+
+# Frames larger than this are refused rather than buffered.
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+
+def default_socket_path(cwd=None):
+    """
+    Return the daemon's socket path: $LLMIDE_SOCKET, or one per user and working directory in the
+    runtime or temp directory.
+
+    A daemon runs every command in its own working directory, so each directory gets its own daemon.
+
+    Parameters:
+    cwd (str): The working directory, or None for the current one.
+    """
+    path = os.getenv("LLMIDE_SOCKET")
+    if path:
+        return path
+    directory = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    cwd_hash = hashlib.blake2b(os.path.realpath(cwd or os.getcwd()).encode("utf-8", "surrogateescape"),
+                               digest_size=8).hexdigest()
+    return os.path.join(directory, f"llmide-{os.getuid()}-{cwd_hash}.sock")
+
+
+def shared_socket_path():
+    """
+    Return the socket of the daemon shared by every directory: $LLMIDE_SOCKET, or one per user in the
+    runtime or temp directory.
+
+    It is used for requests that do not depend on the working directory, such as formatting.
+    """
+    path = os.getenv("LLMIDE_SOCKET")
+    if path:
+        return path
+    directory = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(directory, f"llmide-{os.getuid()}.sock")
+
+
+def encode_message(message):
+    """Return the frame for a message."""
+    payload = json.dumps(message).encode()
+    if len(payload) > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Message of {len(payload)} bytes exceeds the limit of {MAX_MESSAGE_BYTES} bytes.")
+    return _HEADER.pack(len(payload)) + payload
+
+
+def decode_message(payload):
+    """Return the message held in a frame's payload."""
+    message = json.loads(payload.decode())
+    if not isinstance(message, dict):
+        raise ValueError("Message is not a JSON object.")
+    return message
+
+
+def _check_length(length):
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Message of {length} bytes exceeds the limit of {MAX_MESSAGE_BYTES} bytes.")
+
+
+def send_message(sock, message):
+    """Send a message on a blocking socket."""
+    sock.sendall(encode_message(message))
+
+
+def _receive_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(min(size - len(data), 1 << 20))
+        if not chunk:
+            return None
+        data += chunk
+    return bytes(data)
+
+
+def receive_message(sock):
+    """
+    Receive a message from a blocking socket.
+
+    Returns:
+    dict: The message, or None if the peer closed the connection before a new frame.
+
+    Raises:
+    ConnectionError: If the connection closes partway through a frame.
+    ValueError: If the frame is too large or does not hold a JSON object.
+    """
+    header = _receive_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    (length,) = _HEADER.unpack(header)
+    _check_length(length)
+    payload = _receive_exactly(sock, length)
+    if payload is None:
+        raise ConnectionError("Connection closed in the middle of a message.")
+    return decode_message(payload)
+
+
+async def read_message(reader):
+    """
+    Read a message from an asyncio StreamReader.
+
+    Returns:
+    dict: The message, or None if the peer closed the connection before a new frame.
+    """
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except EOFError:
+        return None
+    (length,) = _HEADER.unpack(header)
+    _check_length(length)
+    try:
+        payload = await reader.readexactly(length)
+    except EOFError:
+        raise ConnectionError("Connection closed in the middle of a message.")
+    return decode_message(payload)
+
+
+async def write_message(writer, message):
+    """Write a message to an asyncio StreamWriter."""
+    writer.write(encode_message(message))
+    await writer.drain()
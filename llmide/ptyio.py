@@ -0,0 +1,244 @@
+"""
+Single-threaded reading of console output from a pseudo-terminal.
+
+pump_pty multiplexes the pty and, where the platform offers one, a pidfd for
+the child with selectors, so one loop both drains output in large reads and
+notices the command exiting.  Once the command has exited, output still
+arriving from processes it left behind is read until the pty goes quiet,
+instead of waiting for them to close it.
+
+open_pty creates the pseudo-terminal with output post-processing turned off.
+With it on, the line discipline rewrites every newline as CRLF on the way
+through, which caps throughput far below what the reader can take; with it
+off, output arrives with the plain newlines the command wrote.
+
+TtyEcho mirrors output to the terminal.  It decodes with an incremental UTF-8
+decoder, so multi-byte characters split across reads are not mangled, and it
+coalesces writes: text is written and flushed at most once per interval, and
+when output outpaces the terminal only the most recent text of each interval
+is echoed.
+
+pump_pty_async does the same on an asyncio event loop, watching the pty and
+the pidfd with add_reader, so one loop can drive many commands at once.
+"""
+
+import codecs
+import os
+import pty
+import selectors
+import termios
+import time
+
+from .limits import wait_with_usage
+
+READ_SIZE = 65536
+
+# How long to keep reading after the command exits, for output still in flight.
+_DRAIN_GRACE = 0.05
+# How often to check for the command exiting when no pidfd is available.
+_POLL_INTERVAL = 0.05
+
+
+class TtyEcho:
+    """
+    Coalescing, rate-limited echo of a byte stream to a text stream.
+
+    Parameters:
+    stream (file): The text stream to echo to.
+    interval (float): Minimum seconds between writes to stream.
+    max_pending (int): Characters kept between writes; older ones are skipped.
+    """
+
+    def __init__(self, stream, interval=0.05, max_pending=65536):
+        self.stream = stream
+        self.interval = interval
+        self.max_pending = max_pending
+        self.skipped = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = []
+        self._pending_size = 0
+        self._skipped_since_flush = 0
+        self._last_flush = time.monotonic()
+
+    def write(self, data):
+        """Decode and queue bytes, echoing them if the interval has passed."""
+        text = self._decoder.decode(data)
+        if text:
+            self._pending.append(text)
+            self._pending_size += len(text)
+            if self._pending_size > self.max_pending:
+                text = "".join(self._pending)
+                dropped = len(text) - self.max_pending
+                self._pending = [text[dropped:]]
+                self._pending_size = self.max_pending
+                self._skipped_since_flush += dropped
+        if time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self, final=False):
+        """Echo everything queued. With final set, also flush a trailing incomplete character."""
+        if final:
+            tail = self._decoder.decode(b"", final=True)
+            if tail:
+                self._pending.append(tail)
+        if self._skipped_since_flush:
+            self.stream.write(f"\n[... {self._skipped_since_flush} characters not echoed ...]\n")
+            self.skipped += self._skipped_since_flush
+            self._skipped_since_flush = 0
+        if self._pending:
+            self.stream.write("".join(self._pending))
+            self._pending = []
+            self._pending_size = 0
+        self.stream.flush()
+        self._last_flush = time.monotonic()
+
+
+def open_pty():
+    """
+    Open a pseudo-terminal for a command's output.
+
+    Returns:
+    tuple: (master_fd, slave_fd), with output post-processing disabled on the slave.
+    """
+    master_fd, slave_fd = pty.openpty()
+    try:
+        attributes = termios.tcgetattr(slave_fd)
+        attributes[1] &= ~termios.OPOST
+        termios.tcsetattr(slave_fd, termios.TCSANOW, attributes)
+    except termios.error:
+        pass
+    return master_fd, slave_fd
+
+
+def _open_pidfd(pid):
+    if not hasattr(os, "pidfd_open"):
+        return None
+    try:
+        return os.pidfd_open(pid)
+    except OSError:
+        return None
+
+
+def pump_pty(fd, process, on_output, deadline=None):
+    """
+    Pass output from fd to on_output until process has exited and fd is drained.
+
+    Parameters:
+    fd (int): The pty master the process writes to.
+    process (subprocess.Popen): The process, which is reaped with wait4.
+    on_output (callable): Called with each chunk of output bytes, in order.
+    deadline (float): A time.monotonic() deadline, or None to wait indefinitely.
+
+    Returns:
+    tuple: (ResourceUsage or None, bool) - the process's resource usage, and whether the
+           deadline passed first, in which case the process is still running.
+    """
+    usage = None
+    exited = process.returncode is not None
+    selector = selectors.DefaultSelector()
+    pidfd = None if exited else _open_pidfd(process.pid)
+    try:
+        selector.register(fd, selectors.EVENT_READ, "output")
+        if pidfd is not None:
+            selector.register(pidfd, selectors.EVENT_READ, "exit")
+        while True:
+            if exited:
+                timeout = _DRAIN_GRACE
+            else:
+                timeout = None if pidfd is not None else _POLL_INTERVAL
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return usage, True
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+
+            events = selector.select(timeout)
+            if not events and exited:
+                break
+            if not exited and (pidfd is None or any(key.data == "exit" for key, _ in events)):
+                usage = wait_with_usage(process, time.monotonic())
+                if process.returncode is not None:
+                    exited = True
+                    if pidfd is not None:
+                        selector.unregister(pidfd)
+            if any(key.data == "output" for key, _ in events):
+                try:
+                    data = os.read(fd, READ_SIZE)
+                except OSError:
+                    # The pty reports EIO once every process holding it has exited.
+                    data = b""
+                if not data:
+                    break
+                on_output(data)
+    finally:
+        selector.close()
+        if pidfd is not None:
+            os.close(pidfd)
+
+    if not exited:
+        usage = wait_with_usage(process, deadline)
+        if process.returncode is None:
+            return usage, True
+    return usage, False
+
+
+async def pump_pty_async(fd, process, on_output, deadline=None):
+    """
+    Pass output from fd to on_output until process has exited and fd is drained, without blocking the event loop.
+
+    Parameters and return value are as for pump_pty.
+    """
+    # Imported here so that synchronous users of this module do not pay for asyncio.
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    output_seen = asyncio.Event()
+    closed = asyncio.Event()
+    exit_seen = asyncio.Event()
+
+    def read_output():
+        try:
+            data = os.read(fd, READ_SIZE)
+        except OSError:
+            # The pty reports EIO once every process holding it has exited.
+            data = b""
+        if not data:
+            loop.remove_reader(fd)
+            closed.set()
+            return
+        on_output(data)
+        output_seen.set()
+
+    usage = None
+    pidfd = None if process.returncode is not None else _open_pidfd(process.pid)
+    loop.add_reader(fd, read_output)
+    if pidfd is not None:
+        loop.add_reader(pidfd, exit_seen.set)
+    try:
+        while process.returncode is None:
+            timeout = None if pidfd is not None else _POLL_INTERVAL
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return usage, True
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            try:
+                await asyncio.wait_for(exit_seen.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            usage = wait_with_usage(process, time.monotonic())
+
+        # Drain until the pty closes or goes quiet for the grace period.
+        while not closed.is_set():
+            output_seen.clear()
+            try:
+                await asyncio.wait_for(closed.wait(), _DRAIN_GRACE)
+            except asyncio.TimeoutError:
+                if not output_seen.is_set():
+                    break
+    finally:
+        loop.remove_reader(fd)
+        if pidfd is not None:
+            loop.remove_reader(pidfd)
+            os.close(pidfd)
+    return usage, False
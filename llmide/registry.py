@@ -0,0 +1,272 @@
+"""
+Registry of the commands an LLM response can invoke.
+
+The registry is built once at import.  Each entry records the callable, its
+arity, whether its last argument is the attached backtick block, whether it
+only reads state, which of its arguments are file paths, and how to coerce
+arguments that are not strings.  Dispatch, the execution planner and tool
+schema export all read the same entries.
+"""
+
+import inspect
+import os
+import re
+
+from . import llmide_functions
+
+_argument_re = re.compile(r'(?:"[^"]*"|\'[^\']*\'|\S)+')
+
+
+def split_preserving_quotes(s):
+    """Split s on whitespace, keeping quoted segments together and removing their quotes."""
+    matches = _argument_re.findall(s or "")
+    return [match[1:-1] if match[0] in ('"', "'") else match for match in matches]
+
+
+class CommandSpec:
+    """
+    Describes a registered command.
+
+    Attributes:
+    name (str): The command name used in responses.
+    function (callable): The implementation.
+    parameters (tuple of str): Positional parameter names; a variadic parameter is prefixed with '*'.
+    min_args (int): The minimum number of positional arguments, including the backtick block.
+    max_args (int): The maximum number of positional arguments, or None if variadic.
+    takes_backticks (bool): Whether the attached backtick block is passed as the last argument.
+    raw_arguments (bool): Whether the argument string is passed whole instead of being split.
+    read_only (bool): Whether the command leaves files and other state unchanged.
+    paths (callable): Maps the split arguments to the file paths the command touches, or None
+                      when the command acts on a shared resource such as the console or browser.
+    coercers (dict): Maps argument indexes to functions converting the string argument.
+    returns_images (bool): Whether the command returns a (text, images) tuple.
+    async_function (callable): A coroutine function with the same arguments, used by llmide.aio, or None
+                               to run function on a worker thread there.
+    """
+
+    def __init__(self, name, function, takes_backticks=False, raw_arguments=False, read_only=False,
+                 paths=None, coercers=None, returns_images=False):
+        self.name = name
+        self.function = function
+        self.takes_backticks = takes_backticks
+        self.raw_arguments = raw_arguments
+        self.read_only = read_only
+        self.paths = paths
+        self.coercers = coercers or {}
+        self.returns_images = returns_images
+        self.async_function = None
+
+        parameters = []
+        min_args = 0
+        max_args = 0
+        for parameter in inspect.signature(function).parameters.values():
+            if parameter.kind == inspect.Parameter.VAR_POSITIONAL:
+                parameters.append("*" + parameter.name)
+                max_args = None
+            elif parameter.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD):
+                parameters.append(parameter.name)
+                if parameter.default is inspect.Parameter.empty:
+                    min_args += 1
+                if max_args is not None:
+                    max_args += 1
+        self.parameters = tuple(parameters)
+        self.min_args = min_args
+        self.max_args = max_args
+        self.description = inspect.getdoc(function) or ""
+
+    @property
+    def inline(self):
+        """Whether the command must run alone on the calling thread."""
+        return self.paths is None
+
+    def __repr__(self):
+        return f"CommandSpec({self.name!r})"
+
+
+_commands = {}
+
+
+def register(name, function, **traits):
+    """
+    Register function as the command name, replacing any previous registration.
+
+    Parameters:
+    name (str): The command name used in responses.
+    function (callable): The implementation.
+    **traits: Keyword arguments for CommandSpec.
+
+    Returns:
+    CommandSpec: The new registry entry.
+    """
+    spec = CommandSpec(name, function, **traits)
+    _commands[name.lower()] = spec
+    return spec
+
+
+def register_async(name, function):
+    """
+    Register the coroutine function as the asyncio implementation of the command name.
+
+    Raises:
+    KeyError: If no command is registered as name.
+    """
+    spec = lookup(name)
+    if spec is None:
+        raise KeyError(f"No command registered as {name}.")
+    spec.async_function = function
+    return spec
+
+
+def lookup(name):
+    """Return the CommandSpec registered as name (case-insensitive), or None."""
+    return _commands.get(name.lower()) if name else None
+
+
+def commands():
+    """Return all registered CommandSpecs, sorted by name."""
+    return [_commands[name] for name in sorted(_commands)]
+
+
+def prepare_arguments(spec, arguments, backticks):
+    """
+    Build the positional arguments for a call to spec.function.
+
+    Parameters:
+    spec (CommandSpec): The command being called.
+    arguments (str): The argument string from the Command: line.
+    backticks (str): The attached backtick block, or None.
+
+    Returns:
+    list: The arguments, split, coerced and validated against the command's arity.
+
+    Raises:
+    ValueError: If the number of arguments is wrong or an argument cannot be coerced.
+    """
+    if spec.raw_arguments:
+        args = [arguments if arguments is not None else ""]
+    else:
+        args = split_preserving_quotes(arguments)
+    if backticks is not None:
+        args.append(backticks)
+
+    count = len(args)
+    if count < spec.min_args or (spec.max_args is not None and count > spec.max_args):
+        if spec.max_args is None:
+            expected = f"at least {spec.min_args}"
+        elif spec.min_args == spec.max_args:
+            expected = str(spec.min_args)
+        else:
+            expected = f"{spec.min_args} to {spec.max_args}"
+        raise ValueError(f"{spec.name} expects {expected} argument(s) ({', '.join(spec.parameters)}), got {count}.")
+
+    for index, coerce in spec.coercers.items():
+        if index < count:
+            try:
+                args[index] = coerce(args[index])
+            except ValueError:
+                raise ValueError(f"{spec.name}: invalid value {args[index]!r} for argument {index + 1}.")
+    return args
+
+
+def argument_paths(spec, arguments):
+    """Return the file paths a call to spec touches, or None if it uses a shared resource."""
+    if spec.paths is None:
+        return None
+    return spec.paths(split_preserving_quotes(arguments))
+
+
+def export_schema():
+    """
+    Describe every registered command for tool schema export.
+
+    Returns:
+    list of dict: One JSON-serializable description per command.
+    """
+    schema = []
+    for spec in commands():
+        schema.append({
+            "name": spec.name,
+            "description": spec.description.split("\n\n")[0],
+            "parameters": [
+                {"name": parameter.lstrip("*"), "variadic": parameter.startswith("*")}
+                for parameter in spec.parameters
+            ],
+            "min_args": spec.min_args,
+            "max_args": spec.max_args,
+            "takes_backticks": spec.takes_backticks,
+            "read_only": spec.read_only,
+        })
+    return schema
+
+
+def _first_argument(args):
+    return args[:1]
+
+
+def _first_non_flag(args):
+    return [arg for arg in args if not arg.startswith("-")][:1]
+
+
+def _symbol_database(args):
+    # The symbol index commands take the root directory as their second argument.
+    return [os.path.join(args[1] if len(args) > 1 else ".", ".llmide", "symbols.db")]
+
+
+# File commands: name -> (read_only, takes_backticks). Their first argument is the file path.
+_FILE_COMMANDS = {
+    "read_file": (True, False),
+    "read_file_lines": (True, False),
+    "read_code_at_address": (True, False),
+    "read_code_signatures_and_docstrings": (True, False),
+    "write_file": (False, True),
+    "append_to_file": (False, True),
+    "find_and_replace": (False, True),
+    "insert_text_after_matching_line": (False, True),
+    "insert_text_before_matching_line": (False, True),
+    "replace_text_before_matching_line": (False, True),
+    "replace_text_after_matching_line": (False, True),
+    "replace_text_between_matching_lines": (False, True),
+    "replace_docstring_at_address": (False, True),
+    "replace_code_at_address": (False, True),
+    "add_code_after_address": (False, True),
+    "add_code_before_address": (False, True),
+    "remove_code_at_address": (False, False),
+    "apply_code_edits": (False, True),
+    "manipulate_file_agent": (False, True),
+}
+
+# Commands that drive the browser. The Playwright sync API is bound to the thread that
+# started it, so these use a shared resource even when they only inspect the page.
+_BROWSER_READERS = frozenset(["web_read", "web_read_html", "web_links", "web_page_info"])
+_BROWSER_COMMANDS = [
+    "web_navigate", "web_back", "web_forward", "web_read", "web_read_html", "web_links", "web_click",
+    "web_type", "web_press_key", "web_select", "web_screenshot", "web_execute_js", "web_wait",
+    "web_page_info", "web_close",
+]
+
+
+def _register_builtin_commands():
+    for name, (read_only, takes_backticks) in _FILE_COMMANDS.items():
+        register(name, getattr(llmide_functions, name), read_only=read_only,
+                 takes_backticks=takes_backticks, paths=_first_argument)
+    # summarize writes a .summary companion next to every file it summarizes.
+    register("summarize", llmide_functions.summarize, takes_backticks=True, paths=_first_non_flag)
+    # The symbol index commands read source files but update the index database.
+    for name in ("find_symbol", "list_symbols"):
+        register(name, getattr(llmide_functions, name), paths=_symbol_database)
+    register("run_console_command", llmide_functions.run_console_command, raw_arguments=True)
+    register("reset_console", llmide_functions.reset_console)
+    register("set_console_limits", llmide_functions.set_console_limits)
+    register("start_console_job", llmide_functions.start_console_job, raw_arguments=True)
+    for name in ("poll_console_job", "wait_console_job", "kill_console_job"):
+        register(name, getattr(llmide_functions, name), coercers={0: int, 1: float})
+    register("kill_all_console_jobs", llmide_functions.kill_all_console_jobs)
+    register("list_console_jobs", llmide_functions.list_console_jobs, read_only=True)
+    register("stdout", llmide_functions.stdout, takes_backticks=True)
+    register("test_function", llmide_functions.test_function, takes_backticks=True)
+    for name in _BROWSER_COMMANDS:
+        register(name, getattr(llmide_functions, name), read_only=name in _BROWSER_READERS,
+                 takes_backticks=name == "web_execute_js", coercers={1: int} if name == "web_wait" else None)
+
+
+_register_builtin_commands()
@@ -0,0 +1,128 @@
+"""
+Per-agent state, so one process can serve many agents.
+
+A Session owns everything that belongs to one agent: its tty and stdout, its foreground
+console process, persistent shell, background jobs, console limits, file
+cache, browser and summarization backend.  Commands find the session they run for with
+current_session(), which reads a context variable: use_session sets it for a
+block of code, the executor carries it to its worker threads and asyncio
+carries it to tasks.  Code that never sets a session uses the default session,
+which behaves like the module-level state it replaces.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import threading
+import weakref
+
+from .filecache import FileCache
+from .jobs import JobTable
+from .limits import kill_group
+
+
+class Session:
+    """
+    The resources of one agent.
+
+    Parameters:
+    tty (file): The text stream feedback is written to, or None for /dev/tty (falling back to stderr).
+    stdout (file): The text stream the stdout command writes to, or None for sys.stdout.
+    llm_generate (callable): The summarization backend, ``(system_prompt, user_message) -> str``, or None
+                             for the one registered with summarize.register_llm.
+    console_limits (ConsoleLimits): Default limits for console commands, or None for
+                                    llmide_functions.CONSOLE_LIMITS.
+    """
+
+    def __init__(self, tty=None, llm_generate=None, console_limits=None, stdout=None):
+        self.tty = tty
+        self.stdout = stdout
+        self.llm_generate = llm_generate
+        self.console_limits = console_limits
+        # The foreground console process, while a console command is running.
+        self.process = None
+        # The persistent shell, created on first use, and the lock that keeps it to one command at a time.
+        self.shell_session = None
+        self.shell_lock = threading.Lock()
+        self.console_jobs = JobTable()
+        # The ConsoleResult of the most recent console command, for logging.
+        self.last_console_result = None
+        self.file_cache = FileCache()
+        self.browser = None
+        self.async_browser = None
+        _sessions.add(self)
+
+    def terminate(self, sig):
+        """Send sig to the foreground console process group, and kill the running background jobs."""
+        process = self.process
+        if process is not None:
+            kill_group(process.pid, sig)
+        self.console_jobs.kill_all()
+
+    def close(self):
+        """
+        Release everything the session started: console processes, background jobs, the
+        persistent shell and the browser.
+
+        An async browser needs its event loop to close; use aclose from a coroutine.
+        """
+        process = self.process
+        if process is not None:
+            kill_group(process.pid)
+        self.console_jobs.kill_all()
+        if self.shell_session is not None:
+            self.shell_session.close()
+            self.shell_session = None
+        if self.browser is not None:
+            self.browser.close()
+            self.browser = None
+
+    async def aclose(self):
+        """
+        Release everything the session started, including an async browser.
+
+        The rest is released on a worker thread, as killing jobs and the shell waits for them to exit.
+        """
+        if self.async_browser is not None:
+            await self.async_browser.close()
+            self.async_browser = None
+        await asyncio.to_thread(self.close)
+
+
+_sessions = weakref.WeakSet()
+_default_session = Session()
+_current_session = contextvars.ContextVar("llmide_session", default=None)
+
+
+def current_session():
+    """Return the session the calling code runs for: the one set by use_session, or the default session."""
+    session = _current_session.get()
+    return session if session is not None else _default_session
+
+
+def default_session():
+    """Return the session used when none is set."""
+    return _default_session
+
+
+def all_sessions():
+    """Return every session that is still alive."""
+    return list(_sessions)
+
+
+@contextlib.contextmanager
+def use_session(session):
+    """
+    Run the body of the with statement for session. None leaves the current session in place.
+
+    Parameters:
+    session (Session): The session, or None.
+    """
+    if session is None:
+        yield current_session()
+        return
+    token = _current_session.set(session)
+    try:
+        yield session
+    finally:
+        _current_session.reset(token)
@@ -0,0 +1,181 @@
+"""
+A long-lived shell that runs console commands one after another.
+
+Spawning a new shell for every command pays its startup cost each time and
+loses the working directory and exported variables in between.  ShellSession
+keeps one POSIX shell running behind a pseudo-terminal and feeds it commands
+over a pipe.  Each command is followed by a sentinel line carrying a random
+token and the exit status, which frames the command's output on the pty.
+
+If the shell dies (for example after ``exit``) it is restarted on the next
+command; reset() restarts it explicitly, dropping all shell state.
+"""
+
+import os
+import select
+import shlex
+import signal
+import subprocess
+import time
+import uuid
+
+from .ptyio import open_pty
+
+# Shells that understand the POSIX syntax used for command framing.
+_POSIX_SHELLS = ("sh", "bash", "zsh", "dash", "ksh", "ash")
+
+_READ_SIZE = 65536
+
+
+class ShellSession:
+    """
+    Runs commands in a persistent shell.
+
+    Parameters:
+    shell_path (str): The shell executable. Shells without POSIX syntax fall back to /bin/sh.
+    """
+
+    def __init__(self, shell_path=None):
+        if not shell_path or os.path.basename(shell_path) not in _POSIX_SHELLS:
+            shell_path = "/bin/sh"
+        self.shell_path = shell_path
+        self.process = None
+        self._master_fd = None
+        self._token = uuid.uuid4().hex.encode()
+        self._counter = 0
+
+    @property
+    def alive(self):
+        """Whether the shell process is running."""
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Start the shell if it is not running."""
+        if self.alive:
+            return
+        self._cleanup()
+        master_fd, slave_fd = open_pty()
+        try:
+            self.process = subprocess.Popen(
+                [self.shell_path],
+                stdin=subprocess.PIPE,
+                stdout=slave_fd,
+                stderr=slave_fd,
+                close_fds=True,
+                start_new_session=True,
+            )
+        finally:
+            os.close(slave_fd)
+        self._master_fd = master_fd
+
+    def run(self, command, on_output, timeout=None):
+        """
+        Run command in the shell and stream its output.
+
+        Parameters:
+        command (str): The shell command line.
+        on_output (callable): Called with each chunk of output bytes, in order.
+        timeout (float): Seconds to wait before killing the shell and everything it started.
+
+        Returns:
+        int: The command's exit status, or None if the shell exited before the command finished.
+
+        Raises:
+        subprocess.TimeoutExpired: If the command ran longer than timeout.
+        """
+        self.start()
+        self._counter += 1
+        marker = b"__LLMIDE_DONE_" + self._token + b"_" + str(self._counter).encode() + b"__ "
+        # The command is passed to eval as a single-quoted word, so unbalanced quotes or syntax
+        # errors in it cannot swallow the sentinel line.
+        script = (
+            f"eval {shlex.quote(command)} < /dev/null; "
+            f"printf '\\n%s%d\\n' '{marker.decode()}' \"$?\"\n"
+        )
+        try:
+            self.process.stdin.write(script.encode())
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self._cleanup()
+            return None
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        try:
+            return self._read_until(marker, on_output, deadline)
+        except subprocess.TimeoutExpired as e:
+            e.cmd = command
+            raise
+
+    def _read_until(self, marker, on_output, deadline):
+        # Hold back enough bytes that a marker split across reads is never passed to on_output.
+        pending = b""
+        holdback = len(marker) + 2
+        while True:
+            try:
+                remaining = max(0, deadline - time.monotonic()) if deadline is not None else None
+                if not select.select([self._master_fd], [], [], remaining)[0]:
+                    if pending:
+                        on_output(pending)
+                    self.close()
+                    raise subprocess.TimeoutExpired(None, remaining)
+                data = os.read(self._master_fd, _READ_SIZE)
+            except OSError:
+                data = b""
+            if not data:
+                if pending:
+                    on_output(pending)
+                self._cleanup()
+                return None
+            pending += data
+            index = pending.find(marker)
+            if index != -1:
+                end = pending.find(b"\n", index)
+                while end == -1:
+                    more = os.read(self._master_fd, _READ_SIZE)
+                    if not more:
+                        break
+                    pending += more
+                    end = pending.find(b"\n", index)
+                output = pending[:index]
+                # Drop the line break the sentinel printed before itself.
+                if output.endswith(b"\n"):
+                    output = output[:-1]
+                if output:
+                    on_output(output)
+                status = pending[index + len(marker):end if end != -1 else len(pending)].strip()
+                return int(status) if status.isdigit() else None
+            if len(pending) > holdback:
+                on_output(pending[:-holdback])
+                pending = pending[-holdback:]
+
+    def reset(self):
+        """Kill the shell and everything it started, and start a fresh one."""
+        self.close()
+        self.start()
+
+    def close(self):
+        """Kill the shell and everything it started."""
+        if self.process is not None and self.process.poll() is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+            self.process.wait()
+        self._cleanup()
+
+    def _cleanup(self):
+        if self._master_fd is not None:
+            os.close(self._master_fd)
+            self._master_fd = None
+        if self.process is not None:
+            if self.process.stdin:
+                try:
+                    self.process.stdin.close()
+                except OSError:
+                    pass
+            if self.process.poll() is None:
+                try:
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+                self.process.wait()
+            self.process = None
@@ -0,0 +1,291 @@
+"""
+Edits that splice new code into the original source text.
+
+codemanipulator used to apply every edit to the syntax tree and write the
+whole module back out with ast.unparse, black and the quote conversion.  That
+costs seconds on a large module and loses every comment in it.  splice_code
+instead finds the lines of the target definition (decorators included) and
+replaces, removes or inserts text at those lines, leaving the rest of the
+source as it was.  Only the new code is validated and formatted, at the line
+length left over by the indentation it is put at, so the cost of an edit
+follows the size of the new code rather than the size of the file.
+
+Targets are looked up in the address index (see addressindex), which finds
+them as codemanipulator's CodeManipulator does, and the edits put the new
+code where it would.  When an edit cannot be spliced safely (the target is
+missing or ambiguous, shares its lines with other statements, or removing it
+would leave an empty block), splice_code returns None and the caller falls
+back to rewriting the tree.
+
+Like codemanipulator, this module only uses the standard library.
+"""
+
+import ast
+import io
+import textwrap
+import tokenize
+
+try:
+    from . import addressindex
+except ImportError:
+    # Imported as a top-level module, as the tests do.
+    import addressindex
+
+_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+# black's default; formatted fragments are shortened by their indentation.
+LINE_LENGTH = 88
+MIN_LINE_LENGTH = 40
+_FSTRING_START = getattr(tokenize, "FSTRING_START", None)
+_FSTRING_END = getattr(tokenize, "FSTRING_END", None)
+
+
+class _Edit:
+    """Replace lines[start:end] with before + body + after, where before and after are blank separators."""
+
+    __slots__ = ("start", "end", "before", "body", "after", "number")
+
+    def __init__(self, start, end, body, before=(), after=()):
+        self.start = start
+        self.end = end
+        self.body = body
+        self.before = before
+        self.after = after
+        self.number = 0
+
+
+# Returned by _plan for a create whose target is already there.
+_UNCHANGED = object()
+
+
+def splice_code(source_code, address, new_code, action, insert_position=None, format_fragment=None):
+    """
+    Apply an edit to source_code by splicing text, or return None if it must be applied to the tree instead.
+
+    Parameters:
+    source_code (str): The module to edit.
+    address (str): The dot-separated address of the target, as for CodeManipulator.
+    new_code (str): The code to put in, or None to remove the target.
+    action (str): "replace", "remove", "insert", "create" or "docstring".
+    insert_position (str): "before" or "after", for inserts.
+    format_fragment (callable): Formats the dedented new code, given it and a line length, or None to keep
+                                it as written.
+
+    Returns:
+    str: The edited source, or None.
+
+    Raises:
+    SyntaxError: If new_code does not parse.
+    """
+    return splice_edits(source_code, [(address, new_code, action, insert_position)], format_fragment)
+
+
+def splice_edits(source_code, edits, format_fragment=None):
+    """
+    Apply several edits to source_code in one pass, or return None if they must be applied one at a time.
+
+    Every edit is found in source_code as it is, so the source is parsed once whatever the number of
+    edits.  That is only the same as applying them in order when they touch different lines, so None is
+    returned as soon as one edit cannot be spliced or two of them overlap.  Edits at the same place are
+    applied in order.
+
+    Parameters:
+    source_code (str): The module to edit.
+    edits (list): (address, new_code, action, insert_position) tuples, as for splice_code.
+    format_fragment (callable): As for splice_code.
+
+    Returns:
+    str: The edited source, or None.
+
+    Raises:
+    SyntaxError: If the new code of an edit does not parse.
+    """
+    if "\r" in source_code:
+        return None
+    index = addressindex.address_index(source_code)
+    lines = source_code.split("\n")
+    planned = []
+    appends = False
+    for number, (address, new_code, action, insert_position) in enumerate(edits):
+        edit = _plan(lines, index, address, new_code, action, insert_position, format_fragment)
+        if edit is None:
+            return None
+        if edit is not _UNCHANGED:
+            edit.number = number
+            planned.append(edit)
+            appends = appends or (action == "create" and "." not in address)
+    planned.sort(key=lambda edit: (edit.start, edit.end, edit.number))
+
+    result = []
+    position = 0
+    for edit in planned:
+        if edit.start < position:
+            return None
+        result.extend(lines[position:edit.start])
+        # Separators next to each other, from two inserts at the same place, are merged.
+        blank_lines = 0
+        while blank_lines < len(result) and not result[len(result) - 1 - blank_lines].strip():
+            blank_lines += 1
+        result.extend([""] * max(0, len(edit.before) - blank_lines))
+        result.extend(edit.body)
+        result.extend(edit.after)
+        position = edit.end
+    result.extend(lines[position:])
+    if appends:
+        # Definitions added at the end of the module end it with a single newline.
+        while result and not result[-1].strip():
+            result.pop()
+        result.append("")
+    return _join(result)
+
+
+def _plan(lines, index, address, new_code, action, insert_position, format_fragment):
+    """Return the _Edit that applies one edit to lines, _UNCHANGED, or None if it cannot be spliced."""
+    if not address:
+        return None
+    fragment = None
+    if new_code:
+        fragment = textwrap.dedent(new_code).strip("\n") + "\n"
+        fragment_tree = ast.parse(fragment)
+        fragment_is_definition = any(isinstance(node, _DEFINITIONS) for node in fragment_tree.body)
+
+    def place(indent):
+        """Return the lines of the new code, formatted for and indented by indent."""
+        formatted = fragment
+        if format_fragment is not None:
+            formatted = format_fragment(fragment, max(MIN_LINE_LENGTH, LINE_LENGTH - len(indent.expandtabs())))
+        return _indent(formatted, indent)
+
+    if fragment is None and action != "remove":
+        return None
+    if action == "create":
+        return _create(lines, index, address, place, fragment_is_definition)
+    if action == "docstring":
+        return _docstring(lines, index, address, fragment, fragment_tree)
+
+    matches = _outermost(index.edit_targets.get(address, []))
+    if len(matches) != 1:
+        return None
+    node, sibling_count = matches[0]
+    span = _line_span(lines, node)
+    if span is None:
+        return None
+    start, end, indent = span
+
+    if action == "remove":
+        if sibling_count == 1:
+            return None
+        return _Edit(start, end, [])
+    if action == "replace":
+        return _Edit(start, end, place(indent))
+    if action == "insert" and isinstance(node, ast.ClassDef):
+        # Inserting at a class puts the code inside it, at the start or the end of its body.
+        body_span = _line_span(lines, node.body[0]) if insert_position == "before" else _line_span(lines, node.body[-1])
+        if body_span is None:
+            return None
+        position = body_span[0] if insert_position == "before" else body_span[1]
+        return _insert(lines, position, place(body_span[2]), body_span[2], fragment_is_definition)
+    if action == "insert":
+        position = start if insert_position == "before" else end
+        return _insert(lines, position, place(indent), indent, fragment_is_definition)
+    return None
+
+
+def _outermost(matches):
+    """Drop the matches inside another match; CodeManipulator does not look inside the nodes it edits."""
+    return [(node, count) for node, count in matches
+            if not any(other is not node and other.lineno <= node.lineno and node.end_lineno <= other.end_lineno
+                       for other, _ in matches)]
+
+
+def _line_span(lines, node):
+    """
+    Return (start, end, indent) for the whole lines node takes up, as 0-based indexes with end exclusive,
+    or None if node shares its first or last line with other code.
+    """
+    decorators = getattr(node, "decorator_list", None)
+    start_line = min([node.lineno] + [decorator.lineno for decorator in decorators or ()])
+    first = lines[start_line - 1]
+    indent = first[:len(first) - len(first.lstrip())]
+    if decorators:
+        if not first.lstrip().startswith("@"):
+            return None
+    elif first.encode("utf-8")[:node.col_offset].strip():
+        return None
+    rest = lines[node.end_lineno - 1].encode("utf-8")[node.end_col_offset:].decode("utf-8").strip()
+    if rest and not rest.startswith("#"):
+        return None
+    return start_line - 1, node.end_lineno, indent
+
+
+def _create(lines, index, address, place, fragment_is_definition):
+    """Add the new code, placed by place(indent), as address at the end of its class or of the module, unless a function of that name is there."""
+    parent, _, name = address.rpartition(".")
+    if not parent:
+        if name in index.module_functions:
+            return _UNCHANGED
+        end = len(lines)
+        while end > 0 and not lines[end - 1].strip():
+            end -= 1
+        return _insert(lines, end, place(""), "", fragment_is_definition)
+    classes = [(node, count) for node, count in _outermost(index.edit_targets.get(parent, [])) if isinstance(node, ast.ClassDef)]
+    if len(classes) != 1:
+        return None
+    node = classes[0][0]
+    if any(isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)) and child.name == name for child in node.body):
+        return _UNCHANGED
+    span = _line_span(lines, node.body[-1])
+    if span is None:
+        return None
+    return _insert(lines, span[1], place(span[2]), span[2], fragment_is_definition)
+
+
+def _docstring(lines, index, address, fragment, fragment_tree):
+    """Replace the docstring of the class or function at address, or add one at the start of its body."""
+    symbol = index.lookup(address)
+    if symbol is None or symbol.kind == "assignment" or address in index.duplicates:
+        return None
+    if len(fragment_tree.body) != 1 or not isinstance(fragment_tree.body[0], ast.Expr):
+        return None
+    first = symbol.node.body[0]
+    span = _line_span(lines, first)
+    if span is None:
+        return None
+    start, end, indent = span
+    # Unlike other code, the lines of a docstring are indented with it.
+    body = [indent + line if line.strip() else line for line in fragment.rstrip("\n").split("\n")]
+    if ast.get_docstring(symbol.node, clean=False) is not None:
+        return _Edit(start, end, body)
+    # The new docstring goes right after the header, above any comments at the start of the body.
+    position = start
+    while position > symbol.node.lineno and (not lines[position - 1].strip() or lines[position - 1].lstrip().startswith("#")):
+        position -= 1
+    return _Edit(position, position, body)
+
+
+def _insert(lines, position, new_lines, indent, fragment_is_definition):
+    """Insert new_lines at line index position, separated from its neighbours by blank lines if they define something."""
+    separator = [""] * ((2 if not indent else 1) if fragment_is_definition else 0)
+    before = separator if position > 0 and lines[position - 1].strip() else []
+    after = separator if position < len(lines) and lines[position].strip() else []
+    return _Edit(position, position, new_lines, before, after)
+
+
+def _indent(fragment, indent):
+    """Return the lines of fragment indented by indent, except lines that continue a multi-line string."""
+    lines = fragment.rstrip("\n").split("\n")
+    inside_string = set()
+    fstring_starts = []
+    for token in tokenize.generate_tokens(io.StringIO(fragment).readline):
+        # From Python 3.12, f-strings are split into FSTRING_START, their parts and FSTRING_END.
+        if token.type == _FSTRING_START:
+            fstring_starts.append(token.start[0])
+            continue
+        start = fstring_starts.pop() if token.type == _FSTRING_END else token.start[0]
+        if token.type in (tokenize.STRING, _FSTRING_END) and token.end[0] > start:
+            inside_string.update(range(start + 1, token.end[0] + 1))
+    return [indent + line if line.strip() and number not in inside_string else line
+            for number, line in enumerate(lines, start=1)]
+
+
+def _join(lines):
+    return "\n".join(lines)
@@ -28,7 +28,10 @@ import os
 import re
 from typing import Callable, Optional
 
-# Module-level LLM callable.  Signature:
+from . import tracing
+from .session import current_session
+
+# Module-level LLM callable, used by sessions without their own.  Signature:
 #   generate(system_prompt: str, user_message: str) -> str
 _llm_generate: Optional[Callable[[str, str], str]] = None
 
@@ -53,14 +56,15 @@ def register_llm(generate_fn: Callable[[str, str], str]) -> None:
 
 
 def _ensure_llm() -> Callable[[str, str], str]:
-    """Return the registered LLM callable or raise a clear error."""
-    if _llm_generate is None:
+    """Return the current session's LLM callable, or the registered one, or raise a clear error."""
+    generate = current_session().llm_generate or _llm_generate
+    if generate is None:
         raise RuntimeError(
             "No LLM backend registered for summarization. "
             "Call llmide.summarize.register_llm() first — this is normally "
             "done automatically by the agents layer during Agent.__init__."
         )
-    return _llm_generate
+    return generate
 
 
 def summarize_text(
@@ -99,7 +103,10 @@ def summarize_text(
     if len(user_message) > max_chars:
         user_message = user_message[:max_chars] + "\n\n[... truncated ...]"
 
-    return generate(system, user_message)
+    with tracing.span("llm_generate", bytes_in=tracing.utf8_size(system) + tracing.utf8_size(user_message)) as span:
+        summary = generate(system, user_message)
+        span.set(bytes_out=tracing.utf8_size(summary))
+    return summary
 
 
 _MTIME_HEADER_RE = re.compile(r"^<!-- source_mtime: ([\d.]+) -->$")
@@ -179,6 +186,7 @@ def summarize_file(file_path: str, instruction: str = "") -> str:
 
     # Fast path: reuse the cached summary if the source file hasn't changed.
     is_current, cached_body = _is_summary_current(file_path, summary_path)
+    tracing.annotate(cache_hit=is_current)
     if is_current:
         return f"## {file_path}\n{cached_body}\n\n(Cached — file unchanged since last summary)"
 
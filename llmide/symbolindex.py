@@ -0,0 +1,389 @@
+"""
+Project-wide index of Python symbols, stored in SQLite.
+
+read_code_at_address needs the file a definition is in, so finding where
+Foo.bar is defined used to take a grep or reads of many files.  The symbol
+index maps the qualified name of every class, function and module or class
+level assignment under a root directory to its file, line span, signature
+and docstring, so find_symbol and list_symbols answer with one indexed query.
+
+The index is kept in .llmide/symbols.db under the root and shared by every
+process working there.  It is brought up to date before queries, at most
+once every RESCAN_SECONDS per process: files whose modification time and
+size are unchanged are skipped, files whose content hash is unchanged are
+not parsed again, and only the rest are parsed, on all cores when there are
+many of them.  The files a query returns are checked again each time, so an
+edited definition is never reported at its old place.
+
+Addresses are found as addressindex finds them, so the address part of a
+qualified name can be passed to read_code_at_address with the file.
+"""
+
+import ast
+import concurrent.futures
+import hashlib
+import os
+import pickle
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+from . import tracing
+from .addressindex import AddressIndex
+
+SCHEMA_VERSION = 1
+DATABASE_PATH = os.path.join(".llmide", "symbols.db")
+# A full rescan of the root is done at most this often per process.
+RESCAN_SECONDS = 5.0
+# Below this many changed files, parsing them here is faster than starting worker interpreters.
+PARALLEL_THRESHOLD = 256
+FILES_PER_TASK = 32
+MAX_RESULTS = 200
+MAX_VALUE_CHARS = 60
+SKIPPED_DIRECTORIES = frozenset(["__pycache__", "node_modules", "venv", "env", "site-packages"])
+
+_SCHEMA = """
+CREATE TABLE files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash BLOB NOT NULL,
+    error TEXT
+);
+CREATE TABLE symbols (
+    path TEXT NOT NULL,
+    module TEXT NOT NULL,
+    qualname TEXT NOT NULL,
+    address TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    start_line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    signature TEXT NOT NULL,
+    docstring TEXT
+);
+CREATE INDEX symbols_qualname ON symbols (qualname);
+CREATE INDEX symbols_address ON symbols (address);
+CREATE INDEX symbols_name ON symbols (name);
+CREATE INDEX symbols_module ON symbols (module);
+CREATE INDEX symbols_path ON symbols (path);
+"""
+
+_COLUMNS = "path, module, qualname, address, name, kind, start_line, end_line, signature, docstring"
+# Sorts after every other character, so "p" <= text < "p" + _LAST matches the texts starting with "p".
+_LAST = "\U0010ffff"
+
+
+def module_name(path):
+    """Return the dotted module name of a relative path to a .py file."""
+    parts = path[:-len(".py")].replace(os.sep, "/").split("/")
+    if parts[-1] == "__init__" and len(parts) > 1:
+        parts.pop()
+    return ".".join(parts)
+
+
+def _signature(symbol):
+    node = symbol.node
+    if symbol.kind == "function":
+        prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+        returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+        return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+    if symbol.kind == "class":
+        bases = [ast.unparse(base) for base in node.bases] + [ast.unparse(keyword) for keyword in node.keywords]
+        return f"class {node.name}({', '.join(bases)})" if bases else f"class {node.name}"
+    value = ast.unparse(node.value)
+    if len(value) > MAX_VALUE_CHARS:
+        value = value[:MAX_VALUE_CHARS] + "..."
+    return f"{node.targets[0].id} = {value}"
+
+
+def symbol_rows(path, source_code):
+    """
+    Return the symbols table rows for the Python source at path.
+
+    Function-local assignments are left out; definitions nested in functions are kept.
+
+    Raises:
+    SyntaxError: If source_code does not parse.
+    """
+    module = module_name(path)
+    index = AddressIndex(ast.parse(source_code))
+    rows = []
+    for address, symbol in index.symbols.items():
+        if symbol.kind == "assignment":
+            parent = index.symbols.get(address.rpartition(".")[0])
+            if parent is not None and parent.kind == "function":
+                continue
+        docstring = ast.get_docstring(symbol.node) if symbol.kind != "assignment" else None
+        rows.append((path, module, f"{module}.{address}", address, address.rpartition(".")[2], symbol.kind,
+                     symbol.start, symbol.end, _signature(symbol), docstring))
+    return rows
+
+
+def _index_files(root, jobs):
+    """
+    Index the files in jobs, a list of (relative path, hash already indexed or None).
+
+    Runs in worker processes, so it only takes and returns plain data.
+
+    Returns:
+    list: (path, mtime_ns, size, hash, rows, error) per file that still exists, with rows None if the
+          content hash is the one already indexed.
+    """
+    results = []
+    for path, indexed_hash in jobs:
+        try:
+            with open(os.path.join(root, path), "rb") as file:
+                stat = os.fstat(file.fileno())
+                data = file.read()
+        except OSError:
+            continue
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        rows, error = None, None
+        if digest != indexed_hash:
+            try:
+                rows = symbol_rows(path, data.decode("utf-8"))
+            except (SyntaxError, ValueError, UnicodeDecodeError, RecursionError) as e:
+                rows, error = [], f"{type(e).__name__}: {e}"
+        results.append((path, stat.st_mtime_ns, stat.st_size, digest, rows, error))
+    return results
+
+
+class SymbolIndex:
+    """
+    The symbol index of the Python files under root.
+
+    Parameters:
+    root (str): The directory to index.
+    database (str): The SQLite file, or None for DATABASE_PATH under root.
+    """
+
+    def __init__(self, root=".", database=None):
+        self.root = os.path.abspath(root)
+        self.database = database or os.path.join(self.root, DATABASE_PATH)
+        self.last_scan = None
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(self.database), exist_ok=True)
+        self._connection = sqlite3.connect(self.database, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            if self._connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                self._connection.execute("DROP TABLE IF EXISTS files")
+                self._connection.execute("DROP TABLE IF EXISTS symbols")
+                self._connection.executescript(_SCHEMA)
+                self._connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _python_files(self):
+        """Yield (relative path, stat) for every Python file under root, skipping hidden and tool directories."""
+        pending = [self.root]
+        while pending:
+            directory = pending.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIPPED_DIRECTORIES:
+                            pending.append(entry.path)
+                    elif entry.name.endswith(".py") and entry.is_file():
+                        yield os.path.relpath(entry.path, self.root), entry.stat()
+                except OSError:
+                    continue
+
+    def update(self, workers=None):
+        """
+        Bring the index up to date with the files under root.
+
+        Parameters:
+        workers (int): The most worker processes to parse with, or None for one per core.
+
+        Returns:
+        dict: The number of files "scanned", "parsed" and "removed".
+        """
+        with self._lock, tracing.span("symbol_index_update") as span:
+            indexed = {path: (mtime_ns, size, digest) for path, mtime_ns, size, digest in
+                       self._connection.execute("SELECT path, mtime_ns, size, hash FROM files")}
+            jobs = []
+            scanned = 0
+            for path, stat in self._python_files():
+                scanned += 1
+                known = indexed.pop(path, None)
+                if known is None or known[:2] != (stat.st_mtime_ns, stat.st_size):
+                    jobs.append((path, known[2] if known else None))
+            results = self._index(jobs, workers)
+            parsed = self._store(results, removed=list(indexed))
+            self.last_scan = time.monotonic()
+            counts = {"scanned": scanned, "parsed": parsed, "removed": len(indexed)}
+            span.set(**counts)
+            return counts
+
+    def _index(self, jobs, workers):
+        workers = min(workers or os.cpu_count() or 1, -(-len(jobs) // FILES_PER_TASK))
+        if len(jobs) < PARALLEL_THRESHOLD or workers < 2:
+            return _index_files(self.root, jobs)
+        # Every worker is a fresh interpreter running this module's __main__ block.  Forking would copy
+        # the locks other threads of this process hold, and multiprocessing's spawn and forkserver would
+        # run the agent's main script again when it has no __main__ guard.
+        shares = [jobs[i::workers] for i in range(workers)]
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+                return [result for share_results in pool.map(self._run_worker, shares) for result in share_results]
+        except (OSError, subprocess.CalledProcessError, pickle.UnpicklingError, EOFError):
+            return _index_files(self.root, jobs)
+
+    def _run_worker(self, jobs):
+        """Run _index_files(root, jobs) in a worker process and return its results."""
+        # Import this copy of llmide, and not a module that happens to share its name in the working directory.
+        package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        environment = dict(os.environ, PYTHONSAFEPATH="1")
+        environment["PYTHONPATH"] = os.pathsep.join(filter(None, [package_parent, os.getenv("PYTHONPATH")]))
+        worker = subprocess.run([sys.executable, "-m", "llmide.symbolindex"], input=pickle.dumps((self.root, jobs)),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=environment, check=True)
+        return pickle.loads(worker.stdout)
+
+    def _store(self, results, removed=()):
+        """Write the results of _index_files and drop the removed paths. Returns the number of files parsed."""
+        parsed = 0
+        with self._connection:
+            for path in removed:
+                self._connection.execute("DELETE FROM files WHERE path = ?", (path,))
+                self._connection.execute("DELETE FROM symbols WHERE path = ?", (path,))
+            for path, mtime_ns, size, digest, rows, error in results:
+                if rows is not None:
+                    parsed += 1
+                    self._connection.execute("DELETE FROM symbols WHERE path = ?", (path,))
+                    self._connection.executemany(
+                        f"INSERT INTO symbols ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO files (path, mtime_ns, size, hash, error) VALUES (?, ?, ?, ?, ?)",
+                        (path, mtime_ns, size, digest, error))
+                else:
+                    self._connection.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?",
+                                             (mtime_ns, size, path))
+        return parsed
+
+    def refresh(self):
+        """Update the index if it was last scanned by this process more than RESCAN_SECONDS ago."""
+        if self.last_scan is None or time.monotonic() - self.last_scan > RESCAN_SECONDS:
+            self.update()
+
+    def _revalidate(self, paths):
+        """Re-index the given paths if they changed since they were indexed. Returns True if any did."""
+        stale = []
+        for path in set(paths):
+            try:
+                stat = os.stat(os.path.join(self.root, path))
+            except OSError:
+                stale.append((path, None))
+                continue
+            row = self._connection.execute("SELECT mtime_ns, size, hash FROM files WHERE path = ?", (path,)).fetchone()
+            if row is None or row[:2] != (stat.st_mtime_ns, stat.st_size):
+                stale.append((path, row[2] if row else None))
+        if not stale:
+            return False
+        results = _index_files(self.root, stale)
+        present = {result[0] for result in results}
+        self._store(results, removed=[path for path, _ in stale if path not in present])
+        return True
+
+    def _query(self, sql, parameters, limit):
+        """Run a symbols query, re-running it if files it returned have changed. Rows are dicts."""
+        with self._lock:
+            self.refresh()
+            for _ in range(2):
+                rows = self._connection.execute(sql + " LIMIT ?", parameters + (limit + 1,)).fetchall()
+                if not self._revalidate(row[0] for row in rows):
+                    break
+        names = _COLUMNS.split(", ")
+        return [dict(zip(names, row)) for row in rows]
+
+    def find(self, query, limit=MAX_RESULTS):
+        """
+        Find the symbols named query, or starting with it if it ends in "*".
+
+        query is matched against the qualified name ("package.module.Class.method"), the address in the
+        file ("Class.method") and the name ("method").
+
+        Returns:
+        list of dict: Up to limit + 1 symbols, ordered by qualified name; one more than limit means there
+                      are more.
+        """
+        if query.endswith("*"):
+            prefix = query[:-1]
+            condition = "{0} >= ? AND {0} < ?"
+            values = (prefix, prefix + _LAST)
+        else:
+            condition = "{0} = ?"
+            values = (query,)
+        selects = " UNION ".join(f"SELECT {_COLUMNS} FROM symbols WHERE {condition.format(column)}"
+                                 for column in ("qualname", "address", "name"))
+        return self._query(f"SELECT * FROM ({selects}) ORDER BY qualname", values * 3, limit)
+
+    def list_package(self, package, limit=MAX_RESULTS):
+        """
+        List the symbols of the modules in package and its subpackages, by file and line.
+
+        Parameters:
+        package (str): A dotted package or module name, or "" for every module.
+
+        Returns:
+        list of dict: As for find.
+        """
+        package = package.strip(".")
+        if not package:
+            return self._query(f"SELECT {_COLUMNS} FROM symbols ORDER BY path, start_line", (), limit)
+        # "." sorts just before "/", so the second range holds the submodules of package.
+        return self._query(f"SELECT {_COLUMNS} FROM symbols WHERE module = ? OR (module > ? AND module < ?) "
+                           f"ORDER BY path, start_line", (package, package + ".", package + "/"), limit)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(root="."):
+    """Return this process's SymbolIndex for root, opening it on first use."""
+    key = os.path.abspath(root)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = SymbolIndex(key)
+        return index
+
+
+def close_indexes():
+    """Close and forget every SymbolIndex opened by get_index."""
+    with _indexes_lock:
+        for index in _indexes.values():
+            index.close()
+        _indexes.clear()
+
+
+def format_symbols(symbols, limit=MAX_RESULTS):
+    """Describe symbols for the agent: location, address, signature and the first line of the docstring."""
+    lines = []
+    for symbol in symbols[:limit]:
+        lines.append(f"{symbol['path']}:{symbol['start_line']}-{symbol['end_line']} {symbol['qualname']}")
+        lines.append(f"    {symbol['signature']}")
+        if symbol["docstring"]:
+            lines.append(f"    {symbol['docstring'].strip().splitlines()[0]}")
+    if len(symbols) > limit:
+        lines.append(f"... more than {limit} symbols; narrow the query.")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # The entry point of the worker processes started by SymbolIndex._index.
+    worker_root, worker_jobs = pickle.load(sys.stdin.buffer)
+    pickle.dump(_index_files(worker_root, worker_jobs), sys.stdout.buffer)
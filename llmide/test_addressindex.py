@@ -0,0 +1,85 @@
+import unittest
+from llmide import codemanipulator
+from llmide.addressindex import address_index
+
+SOURCE = '''
+import functools
+
+LIMIT = 10
+
+class Greeter:
+    greeting = "Hello"
+
+    class Style:
+        loud = False
+
+    @functools.lru_cache()
+    @staticmethod
+    def greet(name):
+        def shout(text):
+            return text.upper()
+        return shout(name)
+
+    if LIMIT:
+        def wave(self):
+            pass
+
+def helper():
+    nonlocal_value = 1
+    return nonlocal_value
+'''
+
+class TestAddressIndex(unittest.TestCase):
+    def test_symbols(self):
+        """Test that every class, function and assignment is indexed with its span, decorators included."""
+        index = address_index(SOURCE)
+        self.assertEqual(sorted(index.symbols), [
+            "Greeter", "Greeter.Style", "Greeter.Style.loud", "Greeter.greet", "Greeter.greet.shout",
+            "Greeter.greeting", "Greeter.wave", "LIMIT", "helper", "helper.nonlocal_value"])
+        greet = index.lookup("Greeter.greet")
+        self.assertEqual((greet.kind, greet.start, greet.end), ("function", 12, 17))
+        self.assertEqual(index.lookup("Greeter.Style").kind, "class")
+        self.assertIsNone(index.lookup("Greeter.missing"))
+
+    def test_edit_targets(self):
+        """Test that edit targets do not include function names, as CodeManipulator finds them."""
+        index = address_index(SOURCE)
+        self.assertIn("Greeter.shout", index.edit_targets)
+        self.assertNotIn("Greeter.greet.shout", index.edit_targets)
+        self.assertIn("nonlocal_value", index.edit_targets)
+        self.assertEqual(index.module_functions, {"helper"})
+
+    def test_built_once(self):
+        """Test that the index is cached with the parsed source."""
+        self.assertIs(address_index(SOURCE), address_index(SOURCE))
+
+    def test_suggestions(self):
+        """Test that addresses ending in the same name come first, then similarly spelled ones."""
+        index = address_index(SOURCE)
+        self.assertEqual(index.suggestions("greet")[0], "Greeter.greet")
+        self.assertIn("Greeter.greeting", index.suggestions("Greeter.greting"))
+        self.assertEqual(index.suggestions("completely_unrelated"), [])
+        self.assertEqual(index.did_you_mean("completely_unrelated"), "")
+
+    def test_did_you_mean_messages(self):
+        """Test that the address-based commands suggest addresses when the one given is missing."""
+        self.assertTrue(codemanipulator.read_code_at_address(SOURCE, "greet").startswith(
+            "No code found at address 'greet'. Did you mean 'Greeter.greet'"))
+        with self.assertRaisesRegex(ValueError, r"does not exist\. Did you mean 'Greeter.wave'\?"):
+            codemanipulator.remove_code(SOURCE, "wave")
+        with self.assertRaisesRegex(ValueError, "Did you mean 'helper'"):
+            codemanipulator.replace_code(SOURCE, "helpers", "def helpers():\n    pass\n")
+        with self.assertRaisesRegex(ValueError, "Did you mean 'Greeter.Style'"):
+            codemanipulator.change_docstring(SOURCE, "Style", '"""Styles."""')
+
+    def test_tree_rewrite_keeps_expressions(self):
+        """Test that an edit applied to the tree leaves names in statements it does not target alone."""
+        # Carriage returns keep the edit from being spliced.
+        source = "def f():\r\n    x = 1\r\n    def g():\r\n        nonlocal x\r\n        x = 2\r\n    return {**{}}\r\n"
+        result = codemanipulator.remove_code(source, "g")
+        self.assertEqual(result, "def f():\n    x = 1\n    return {**{}}\n")
+        result = codemanipulator.insert_code_after(source, "g", "def h():\n    pass\n")
+        self.assertIn("        nonlocal x\n", result)
+
+if __name__ == '__main__':
+    unittest.main()
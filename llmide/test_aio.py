@@ -0,0 +1,103 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from llmide import aio
+from llmide.limits import ConsoleLimits
+from llmide.session import current_session
+
+class TestAsyncProcessContent(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'notes.txt')
+        with open(self.path, 'w') as file:
+            file.write('hello')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_matches_sync_response(self):
+        """Test that the async response is the same as the sync one, in document order."""
+        content = (
+            f"Command: read_file {self.path}\n"
+            f"Command: write_file {self.path}\n`````\nupdated\n`````\n"
+            f"Command: run_console_command cat {self.path}\n"
+            f"Command: read_file {self.path}\n"
+            "Command: no_such_command\n"
+        )
+        response, images = asyncio.run(aio.process_content(content))
+        self.assertEqual(images, [])
+        self.assertTrue(response.startswith('hello\n'))
+        self.assertIn('updated\n\n', response)
+        self.assertTrue(response.endswith('Error: Command not found\n'))
+
+    def test_no_commands(self):
+        """Test the response when there is nothing to execute."""
+        self.assertEqual(asyncio.run(aio.process_content("Just prose.")), ("End.", []))
+
+    def test_argument_errors(self):
+        """Test that commands with an asyncio implementation report bad arguments like the sync ones."""
+        response, _ = asyncio.run(aio.process_content("Command: web_click\n"))
+        self.assertTrue(response.startswith("Error: web_click expects 1 argument(s)"))
+
+class TestAsyncConsole(unittest.TestCase):
+    def test_output_and_status(self):
+        """Test console output, exit status and resource usage."""
+        self.assertEqual(asyncio.run(aio.run_console_command('"echo one; echo two"')), "one\ntwo\n")
+        self.assertEqual(asyncio.run(aio.run_console_command("exit 3")), "ok")
+        result = current_session().last_console_result
+        self.assertEqual(result.returncode, 3)
+        self.assertGreater(result.usage.max_rss_bytes, 0)
+
+    def test_commands_overlap(self):
+        """Test that one event loop runs several console commands at once."""
+        async def run_all():
+            return await asyncio.gather(*(aio.run_console_command("sleep 0.5; echo done") for _ in range(4)))
+
+        start = time.monotonic()
+        self.assertEqual(asyncio.run(run_all()), ["done\n"] * 4)
+        self.assertLess(time.monotonic() - start, 1.5)
+
+    def test_wall_clock_limit(self):
+        """Test that a hung command and its children are killed at the wall-clock limit."""
+        output = asyncio.run(aio.run_console_command("echo started; sleep 30 & sleep 30",
+                                                     limits=ConsoleLimits(wall_seconds=0.3)))
+        self.assertIn("started", output)
+        self.assertIn("[Command stopped: wall-clock limit of 0.3s exceeded]", output)
+
+    def test_output_limit(self):
+        """Test that a runaway writer is stopped by the output limit."""
+        output = asyncio.run(aio.run_console_command("yes", limits=ConsoleLimits(output_bytes=100000,
+                                                                                 wall_seconds=20)))
+        self.assertIn("[Command stopped: output limit of 100000 bytes exceeded]", output)
+
+    def test_cancel_kills_command(self):
+        """Test that cancelling the call kills the command."""
+        async def cancel():
+            task = asyncio.ensure_future(aio.run_console_command("sleep 30"))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        start = time.monotonic()
+        asyncio.run(cancel())
+        self.assertLess(time.monotonic() - start, 5)
+
+class TestAsyncFileCommands(unittest.TestCase):
+    def test_file_commands(self):
+        """Test that the threaded file commands keep their names and results."""
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'a.txt')
+            asyncio.run(aio.write_file(path, 'first\n'))
+            asyncio.run(aio.append_to_file(path, 'second'))
+            self.assertEqual(asyncio.run(aio.read_file(path)), 'first\nsecond\n')
+            self.assertEqual(aio.read_file.__name__, 'read_file')
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from llmide import astcache, codemanipulator, llmide_functions
+
+SOURCE = '''import os
+
+
+class Greeter:
+    """Says hello."""
+
+    def greet(self, name):
+        return "Hello, " + name
+
+    def wave(self):
+        return "o/"
+
+
+def helper():
+    # Kept as it is.
+    return 1
+
+
+def old_helper():
+    return 0
+'''
+
+EDITS = '''@@ replace Greeter.greet
+def greet(self, name):
+    return "Hi, " + name
+@@ insert_after Greeter.wave
+def bow(self):
+    return "_o_"
+@@ docstring Greeter
+"""Greets people."""
+@@ docstring helper
+"""Return one."""
+@@ remove old_helper
+@@ create other
+def other():
+    return 2
+@@ create another
+def another():
+    return 3
+'''
+
+EXPECTED = '''import os
+
+
+class Greeter:
+    """Greets people."""
+
+    def greet(self, name):
+        return "Hi, " + name
+
+    def wave(self):
+        return "o/"
+
+    def bow(self):
+        return "_o_"
+
+
+def helper():
+    """Return one."""
+    # Kept as it is.
+    return 1
+
+
+def other():
+    return 2
+
+
+def another():
+    return 3
+'''
+
+class TestApplyEdits(unittest.TestCase):
+    def test_parse_edits(self):
+        """Test that an edit list is split into actions, addresses and code."""
+        edits = codemanipulator.parse_edits(EDITS)
+        self.assertEqual([edit[:2] for edit in edits], [
+            ("replace", "Greeter.greet"), ("insert_after", "Greeter.wave"), ("docstring", "Greeter"),
+            ("docstring", "helper"), ("remove", "old_helper"), ("create", "other"), ("create", "another")])
+        self.assertEqual(edits[0][2], 'def greet(self, name):\n    return "Hi, " + name\n')
+        self.assertIsNone(edits[4][2])
+        for text in ("def f():\n    pass\n", "@@ rename f\n", "@@ replace f\n", "@@ remove f\npass\n", ""):
+            with self.assertRaises(ValueError):
+                codemanipulator.parse_edits(text)
+
+    def test_one_parse(self):
+        """Test that edits of different definitions are spliced in from a single parse of the source."""
+        cache = astcache.get_cache()
+        cache.clear()
+        misses = cache.misses
+        result = codemanipulator.apply_edits(SOURCE, codemanipulator.parse_edits(EDITS))
+        self.assertEqual(result, EXPECTED)
+        self.assertEqual(cache.misses, misses + 1)
+
+    def test_same_as_one_at_a_time(self):
+        """Test that edits depending on each other are applied in order."""
+        edits = codemanipulator.parse_edits(
+            "@@ create Greeter.nod\ndef nod(self):\n    return 0\n"
+            "@@ replace Greeter.nod\ndef nod(self):\n    return 1\n"
+            "@@ replace Greeter\nclass Greeter:\n    pass\n@@ remove Greeter.wave\n")
+        with self.assertRaisesRegex(ValueError, "Greeter.wave"):
+            codemanipulator.apply_edits(SOURCE, edits)
+        result = codemanipulator.apply_edits(SOURCE, edits[:2])
+        self.assertIn("    def nod(self):\n        return 1\n", result)
+        self.assertEqual(result.count("def nod"), 1)
+
+    def test_docstring_splice(self):
+        """Test that change_docstring replaces or adds the docstring and leaves the other lines alone."""
+        result = codemanipulator.change_docstring(SOURCE, "Greeter.wave", '"""Wave.\n\nWith a hand."""')
+        self.assertEqual(result, SOURCE.replace('    def wave(self):\n',
+                                                '    def wave(self):\n        """Wave.\n\n        With a hand."""\n'))
+
+class TestApplyCodeEditsCommand(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "greeter.py")
+        with open(self.path, "w") as file:
+            file.write(SOURCE)
+        os.chmod(self.path, 0o640)
+
+    def read(self):
+        with open(self.path) as file:
+            return file.read()
+
+    def test_combined_diff(self):
+        """Test that every edit is written at once, keeping the file's mode, and reported in one diff."""
+        output = llmide_functions.apply_code_edits(self.path, EDITS)
+        self.assertTrue(output.startswith(f"{self.path} successfully written.\n\nDiff:\n--- original\n+++ modified"))
+        self.assertIn("-def old_helper():", output)
+        self.assertIn("+def another():", output)
+        self.assertEqual(self.read(), EXPECTED)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o640)
+        self.assertEqual(os.listdir(self.directory), ["greeter.py"])
+        self.assertEqual(llmide_functions.read_file(self.path), EXPECTED)
+
+    def test_nothing_written_on_error(self):
+        """Test that a failing edit leaves the file as it was."""
+        output = llmide_functions.apply_code_edits(self.path, EDITS + "@@ remove missing_function\n")
+        self.assertIn("edit error: The target 'missing_function' does not exist.", output)
+        self.assertTrue(output.endswith("No edits were written."))
+        self.assertEqual(self.read(), SOURCE)
+        output = llmide_functions.apply_code_edits(self.path, "@@ replace helper\ndef helper(:\n")
+        self.assertIn("edit error", output)
+        self.assertEqual(self.read(), SOURCE)
+
+if __name__ == '__main__':
+    unittest.main()
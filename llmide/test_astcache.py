@@ -0,0 +1,96 @@
+import ast
+import threading
+import unittest
+from llmide import addressindex, astcache, codemanipulator
+from llmide.astcache import ASTCache
+
+SOURCE = '''
+class Greeter:
+    """Says hello."""
+
+    def greet(self, name):
+        """Return a greeting."""
+        return f"Hello, {name}"
+
+def helper():
+    return 1
+
+def helper():
+    return 2
+'''
+
+class TestASTCache(unittest.TestCase):
+    def test_derived_is_computed_once(self):
+        """Test that metadata is built once per source and counted as hits afterwards."""
+        cache = ASTCache()
+        builds = []
+        build = lambda tree: builds.append(tree) or len(tree.body)
+        self.assertEqual(cache.derived(SOURCE, "count", build), 3)
+        self.assertEqual(cache.derived(SOURCE, "count", build), 3)
+        self.assertEqual(len(builds), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.derived(SOURCE + "\n", "count", build)
+        self.assertEqual(cache.misses, 2)
+
+    def test_take_returns_a_private_tree(self):
+        """Test that take never hands out the cached tree, so changing its tree leaves readers' trees alone."""
+        cache = ASTCache()
+        shared = cache.derived(SOURCE, "tree", lambda tree: tree)
+        taken = cache.take(SOURCE)
+        self.assertIsNot(taken, shared)
+        self.assertEqual(ast.dump(taken), ast.dump(shared))
+        taken.body.clear()
+        self.assertIs(cache.derived(SOURCE, "tree", lambda tree: tree), shared)
+        self.assertEqual(len(shared.body), 3)
+
+    def test_memory_budget(self):
+        """Test that the least recently used trees are evicted to stay within the budget."""
+        sources = [f"value_{i} = {i}\n" for i in range(3)]
+        cache = ASTCache(max_bytes=2 * len(sources[0]) * astcache.TREE_BYTES_PER_CHAR)
+        for source in sources:
+            cache.derived(source, "tree", lambda tree: tree)
+        self.assertLessEqual(cache.size, cache.max_bytes)
+        cache.derived(sources[2], "tree", lambda tree: tree)
+        cache.derived(sources[0], "tree", lambda tree: tree)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+        cache.clear()
+        self.assertEqual(cache.size, 0)
+
+class TestCodeManipulatorCaching(unittest.TestCase):
+    def test_reads_share_one_parse(self):
+        """Test that consecutive reads of one source parse it once and match the uncached results."""
+        cache = astcache.get_cache()
+        cache.clear()
+        misses = cache.misses
+        self.assertIn("def greet(self, name):", codemanipulator.get_signatures_and_docstrings(SOURCE))
+        self.assertEqual(codemanipulator.read_code_at_address(SOURCE, "Greeter.greet").splitlines()[0],
+                         "    def greet(self, name):")
+        self.assertEqual(codemanipulator.read_code_at_address(SOURCE, "helper"), "def helper():\n    return 2")
+        self.assertEqual(codemanipulator.read_code_at_address(SOURCE, "missing"),
+                         "No code found at address 'missing'.")
+        self.assertEqual(cache.misses, misses + 1)
+
+    def test_edit_does_not_corrupt_reads(self):
+        """Test that an edit of a source leaves later reads of that source unchanged."""
+        before = codemanipulator.read_code_at_address(SOURCE, "Greeter")
+        edited = codemanipulator.remove_code(SOURCE, "Greeter")
+        self.assertNotIn("class Greeter", edited)
+        self.assertEqual(codemanipulator.read_code_at_address(SOURCE, "Greeter"), before)
+
+    def test_edit_while_index_is_held(self):
+        """Test that an edit in another thread does not change the nodes of an address index held for the same source."""
+        source = SOURCE + "\nclass Pair:\n    first = 1; second = 2\n"
+        node = addressindex.address_index(source).lookup("Pair").node
+        before = ast.dump(node)
+        results = []
+        # A target sharing its line with another statement cannot be spliced, so the edit changes a parsed tree.
+        thread = threading.Thread(target=lambda: results.append(codemanipulator.replace_code(source, "Pair.first",
+                                                                                             "first = 3")))
+        thread.start()
+        thread.join()
+        self.assertIn("first = 3", results[0])
+        self.assertEqual(ast.dump(node), before)
+        self.assertIs(addressindex.address_index(source).lookup("Pair").node, node)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import unittest
+from llmide.capture import HeadTailBuffer
+
+class TestHeadTailBuffer(unittest.TestCase):
+    def test_small_output_is_kept_whole(self):
+        """Test that output smaller than the head is returned unchanged."""
+        buffer = HeadTailBuffer(head_size=16, tail_size=16)
+        buffer.write(b"hello\n")
+        buffer.write(b"world\n")
+        self.assertEqual(buffer.render(), "hello\nworld\n")
+        self.assertEqual(buffer.dropped_bytes, 0)
+
+    def test_output_fitting_head_and_tail(self):
+        """Test that nothing is dropped while head and tail can hold everything."""
+        buffer = HeadTailBuffer(head_size=4, tail_size=8)
+        buffer.write(b"0123456789")
+        self.assertEqual(buffer.head(), b"0123")
+        self.assertEqual(buffer.tail(), b"456789")
+        self.assertEqual(buffer.render(), "0123456789")
+
+    def test_ring_buffer_keeps_last_bytes(self):
+        """Test that the tail holds the most recent bytes across many small writes."""
+        buffer = HeadTailBuffer(head_size=3, tail_size=5)
+        data = bytes(range(256)) * 4
+        for i in range(0, len(data), 7):
+            buffer.write(data[i:i + 7])
+        self.assertEqual(buffer.head(), data[:3])
+        self.assertEqual(buffer.tail(), data[-5:])
+        self.assertEqual(buffer.total_bytes, len(data))
+        self.assertEqual(buffer.dropped_bytes, len(data) - 8)
+
+    def test_large_write(self):
+        """Test a single write larger than head and tail together."""
+        buffer = HeadTailBuffer(head_size=4, tail_size=4)
+        buffer.write(b"abcdefghijkl")
+        self.assertEqual(buffer.head(), b"abcd")
+        self.assertEqual(buffer.tail(), b"ijkl")
+
+    def test_dropped_lines_and_render(self):
+        """Test that the rendered output reports dropped bytes and lines."""
+        buffer = HeadTailBuffer(head_size=10, tail_size=10)
+        for i in range(100):
+            buffer.write(f"line {i:03d}\n".encode())
+        self.assertEqual(buffer.total_lines, 100)
+        self.assertEqual(buffer.dropped_lines, 97)
+        rendered = buffer.render()
+        self.assertTrue(rendered.startswith("line 000\n"))
+        self.assertTrue(rendered.endswith("line 099\n"))
+        self.assertIn(f"[{buffer.dropped_bytes} bytes, 97 lines omitted]", rendered)
+
+    def test_spill_contains_full_stream(self):
+        """Test that the spill file receives the complete stream once output is dropped."""
+        buffer = HeadTailBuffer(head_size=8, tail_size=8, spill=True)
+        data = b"".join(f"{i}\n".encode() for i in range(1000))
+        for i in range(0, len(data), 13):
+            buffer.write(data[i:i + 13])
+        buffer.close()
+        try:
+            with open(buffer.spill_path, "rb") as file:
+                self.assertEqual(file.read(), data)
+            self.assertIn(buffer.spill_path, buffer.render())
+        finally:
+            os.remove(buffer.spill_path)
+
+    def test_no_spill_without_drop(self):
+        """Test that no spill file is created for output that fits."""
+        buffer = HeadTailBuffer(head_size=8, tail_size=8, spill=True)
+        buffer.write(b"short")
+        buffer.close()
+        self.assertIsNone(buffer.spill_path)
+
+if __name__ == '__main__':
+    unittest.main()
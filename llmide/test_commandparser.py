@@ -0,0 +1,118 @@
+import random
+import unittest
+from commandparser import CommandInfo, CommandTokenizer, StreamingCommandParser, iter_stream_commands, parse_commands, tokenize_commands
+
+class TestCommandParser(unittest.TestCase):
+    def setUp(self):
+        self.content = """I will read the file first.
+
+Command: read_file test.py
+Then write the new version.
+
+Command: write_file "out dir/test.py"
+`````python
+def f():
+    return 1
+`````
+Command: run_console_command ls -la
+"""
+
+    def test_parse_commands(self):
+        """Test that every command is found in document order."""
+        commands = parse_commands(self.content)
+        self.assertEqual(commands, [
+            CommandInfo('read_file', 'test.py', None),
+            CommandInfo('write_file', '"out dir/test.py"', 'def f():\n    return 1\n'),
+            CommandInfo('run_console_command', 'ls -la', None),
+        ])
+
+    def test_token_offsets(self):
+        """Test that token spans cover the command line and its block."""
+        tokens = list(tokenize_commands(self.content))
+        self.assertEqual(len(tokens), 3)
+        self.assertEqual(self.content[tokens[0].start:tokens[0].end], "Command: read_file test.py")
+        self.assertTrue(self.content[tokens[1].start:tokens[1].end].endswith('`````'))
+        self.assertTrue(all(a.end <= b.start for a, b in zip(tokens, tokens[1:])))
+
+    def test_detached_block_is_ignored(self):
+        """Test that a block separated from the command by a blank line is not attached."""
+        content = "Command: read_file a.py\n\n`````\nnot an argument\n`````\n"
+        self.assertEqual(parse_commands(content), [CommandInfo('read_file', 'a.py', None)])
+
+    def test_block_without_arguments(self):
+        """Test that a command with only a block gets empty arguments."""
+        content = "Command: stdout\n`````\nhello\n`````\n"
+        self.assertEqual(parse_commands(content), [CommandInfo('stdout', '', 'hello\n')])
+
+    def test_language_specifier_with_symbols(self):
+        """Test that language specifiers such as c++ are skipped."""
+        content = "Command: write_file a.cpp\n`````c++\nint main() {}\n`````"
+        self.assertEqual(parse_commands(content)[0].backtick_content, 'int main() {}\n')
+
+    def test_unclosed_block(self):
+        """Test that an unclosed block leaves the command without block content."""
+        content = "Command: write_file a.py\n`````python\nprint(1)\n"
+        self.assertEqual(parse_commands(content), [CommandInfo('write_file', 'a.py', None)])
+
+    def test_command_must_start_line(self):
+        """Test that Command: in the middle of a line is not a command."""
+        self.assertEqual(parse_commands("See the Command: read_file a.py syntax."), [])
+
+    def test_custom_syntax(self):
+        """Test a tokenizer configured with a different prefix and fence."""
+        tokenizer = CommandTokenizer(command_prefix="Command:", fence="```")
+        tokens = list(tokenizer.tokenize("Command:test_function arg1\n```Python\nstuff\n```\n"))
+        self.assertEqual(tokens[0].info, CommandInfo('test_function', 'arg1', 'stuff\n'))
+
+    def test_many_commands(self):
+        """Test a long response with many commands and blocks."""
+        block = "`````\n" + "x = 1\n" * 100 + "`````\n"
+        content = "".join(f"Prose {i}\nCommand: write_file f{i}.py\n{block}" for i in range(500))
+        commands = parse_commands(content)
+        self.assertEqual(len(commands), 500)
+        self.assertEqual(commands[-1].arguments, 'f499.py')
+
+class TestStreamingCommandParser(unittest.TestCase):
+    def setUp(self):
+        self.samples = [
+            "I will read.\n\nCommand: read_file test.py\nThen\nCommand: write_file a.py\n`````python\ndef f():\n    return 1\n`````\nCommand: run_console_command ls -la\n",
+            "Command: stdout\n`````\nhello\n`````Command: not_a_command\nCommand: web_back\n",
+            "Command: write_file a.py\n`````python\nprint(1)\nCommand: read_file inside_unclosed_block.py\n",
+            "Command: a\n``````\nx`````\ntext\nCommand: b arg\n\n`````\nnot attached\n`````\n",
+            "Comm\nCommand:  not_a_command\nCommand: c\n``",
+            "Command: e\r\n`````\r\nx\r\n`````\r\n",
+            "prose Command: f\nCommand: g 1 2 3",
+        ]
+
+    def split(self, text, rnd):
+        cuts = sorted(rnd.sample(range(len(text) + 1), rnd.randint(0, min(len(text), 12))))
+        return [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+    def test_matches_tokenizer_for_any_chunking(self):
+        """Test that streamed parsing returns the same tokens as the batch tokenizer."""
+        rnd = random.Random(0)
+        for sample in self.samples:
+            expected = list(tokenize_commands(sample))
+            self.assertEqual(list(iter_stream_commands(list(sample))), expected)
+            for _ in range(200):
+                self.assertEqual(list(iter_stream_commands(self.split(sample, rnd))), expected)
+
+    def test_emits_when_block_closes(self):
+        """Test that a command is emitted as soon as its block closes, before the stream ends."""
+        parser = StreamingCommandParser()
+        self.assertEqual(parser.feed("Command: write_file a.py\n`````python\nx = 1\n"), [])
+        self.assertEqual(parser.feed("y = 2\n``"), [])
+        tokens = parser.feed("```\nMore prose")
+        self.assertEqual([token.info for token in tokens], [CommandInfo('write_file', 'a.py', 'x = 1\ny = 2\n')])
+        self.assertEqual(parser.close(), [])
+
+    def test_emits_when_next_line_starts(self):
+        """Test that a command without a block is emitted once the next line rules out a block."""
+        parser = StreamingCommandParser()
+        self.assertEqual(parser.feed("Command: read_file a.py"), [])
+        self.assertEqual(parser.feed("\n"), [])
+        tokens = parser.feed("Next")
+        self.assertEqual([token.info for token in tokens], [CommandInfo('read_file', 'a.py', None)])
+
+if __name__ == '__main__':
+    unittest.main()
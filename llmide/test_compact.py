@@ -0,0 +1,73 @@
+import io
+import os
+import unittest
+from unittest import mock
+from llmide import llmide_functions
+from llmide.compact import ConsoleCompactor
+
+class TestConsoleCompactor(unittest.TestCase):
+    def compact(self, data, chunk_size=None):
+        sink = io.BytesIO()
+        compactor = ConsoleCompactor(sink)
+        chunk_size = chunk_size or len(data) or 1
+        for i in range(0, len(data), chunk_size):
+            compactor.write(data[i:i + chunk_size])
+        compactor.close()
+        return sink.getvalue(), compactor
+
+    def test_carriage_return_redraws(self):
+        """Test that only the final frame of a redrawn line is kept."""
+        data = b"start\n" + b"".join(b"\rprogress %d%%" % i for i in range(101)) + b"\ndone\r\n"
+        output, compactor = self.compact(data)
+        self.assertEqual(output, b"start\nprogress 100%\ndone\n")
+        self.assertEqual(compactor.saved_bytes, len(data) - len(output))
+
+    def test_ansi_escapes(self):
+        """Test that colour, cursor and title escape sequences are removed."""
+        data = b"\x1b[1;32mPASSED\x1b[0m test\n\x1b]0;title\x07\x1b[2Kplain\x1b(B\n"
+        self.assertEqual(self.compact(data)[0], b"PASSED test\nplain\n")
+
+    def test_identical_lines(self):
+        """Test that a run of identical lines becomes one line and a count."""
+        data = b"a\n" + b"y\n" * 1000 + b"b\n"
+        self.assertEqual(self.compact(data)[0], b"a\ny\n[... previous line repeated 999 more times ...]\nb\n")
+        self.assertEqual(self.compact(b"y\ny\nz")[0], b"y\ny\nz")
+
+    def test_similar_lines(self):
+        """Test that lines differing only in numbers keep their first and last line."""
+        data = b"".join(b"Downloading chunk %d of 50\n" % i for i in range(1, 51))
+        self.assertEqual(self.compact(data)[0],
+                         b"Downloading chunk 1 of 50\n[... 48 similar lines omitted ...]\nDownloading chunk 50 of 50\n")
+
+    def test_numeric_data_is_kept(self):
+        """Test that lines that are mostly numbers are not treated as similar."""
+        data = b"".join(b"%d,%d,%d\n" % (i, i * 2, i * 3) for i in range(20))
+        self.assertEqual(self.compact(data)[0], data)
+
+    def test_chunking_does_not_matter(self):
+        """Test that output is the same however the stream is split."""
+        data = (b"\x1b[33mwarn\x1b[0m\r\n" + b"".join(b"\r%d/10 \x1b[32m#\x1b[0m" % i for i in range(10)) + b"\n"
+                + b"ok\n" * 5 + b"".join(b"step %d done\n" % i for i in range(7)) + b"tail")
+        expected = self.compact(data)[0]
+        for chunk_size in (1, 2, 3, 7, 64):
+            self.assertEqual(self.compact(data, chunk_size)[0], expected)
+
+    def test_raw_spill(self):
+        """Test that the raw stream is saved when spilling."""
+        compactor = ConsoleCompactor(io.BytesIO(), spill=True)
+        compactor.write(b"\x1b[31mred\x1b[0m\n")
+        compactor.close()
+        with open(compactor.spill_path, "rb") as file:
+            self.assertEqual(file.read(), b"\x1b[31mred\x1b[0m\n")
+        os.remove(compactor.spill_path)
+
+    def test_run_console_command(self):
+        """Test that console output is compacted and the saving reported."""
+        output = llmide_functions.run_console_command("for i in 1 2 3 4 5; do printf 'x\\rloading %s\\n' $i; done")
+        self.assertTrue(output.startswith("loading 1\n[... 3 similar lines omitted ...]\nloading 5\n"))
+        self.assertIn("[Compacted:", output)
+        with mock.patch.object(llmide_functions, "CONSOLE_COMPACT", False):
+            self.assertEqual(llmide_functions.run_console_command("printf 'a\\rb\\n'"), "a\rb\n")
+
+if __name__ == '__main__':
+    unittest.main()
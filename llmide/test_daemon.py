@@ -0,0 +1,238 @@
+import asyncio
+import contextlib
+import io
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import unittest.mock
+from llmide import client
+from llmide.client import DaemonClient, DaemonError, DaemonTimeoutError
+from llmide.daemon import Daemon
+from llmide.protocol import MAX_MESSAGE_BYTES, receive_message, send_message
+
+class TestProtocol(unittest.TestCase):
+    def test_round_trip(self):
+        """Test that messages survive framing, including partial reads and a clean close."""
+        first, second = socket.socketpair()
+
+        def send():
+            send_message(first, {"op": "process", "content": "é" * 100000})
+            send_message(first, {"op": "ping"})
+            first.close()
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        try:
+            self.assertEqual(receive_message(second), {"op": "process", "content": "é" * 100000})
+            self.assertEqual(receive_message(second), {"op": "ping"})
+            self.assertIsNone(receive_message(second))
+        finally:
+            sender.join()
+            second.close()
+
+    def test_oversized_frame(self):
+        """Test that a frame above the size limit is refused."""
+        first, second = socket.socketpair()
+        try:
+            first.sendall((MAX_MESSAGE_BYTES + 1).to_bytes(4, "big"))
+            with self.assertRaises(ValueError):
+                receive_message(second)
+        finally:
+            first.close()
+            second.close()
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.directory, 'llmide.sock')
+        self.path = os.path.join(self.directory, 'notes.txt')
+        with open(self.path, 'w') as file:
+            file.write('hello')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def start(self, **options):
+        daemon = Daemon(self.socket_path, **options)
+        ready = threading.Event()
+        thread = threading.Thread(target=asyncio.run, args=(daemon.serve(ready=ready.set),))
+        thread.start()
+        self.assertTrue(ready.wait(10))
+        connection = DaemonClient(self.socket_path)
+
+        def stop():
+            connection.request("shutdown")
+            connection.close()
+            thread.join(10)
+            self.assertFalse(os.path.exists(self.socket_path))
+
+        self.addCleanup(stop)
+        return connection
+
+    def test_session_lifecycle(self):
+        """Test opening a session, running commands in it and closing it."""
+        connection = self.start()
+        session = connection.open_session()
+        content = f"Command: read_file {self.path}\nCommand: run_console_command echo hi\n"
+        self.assertEqual(connection.process_content(session, content), ("hello\nhi\n\n", []))
+        self.assertEqual(connection.request("ping")["sessions"], 1)
+        self.assertTrue(connection.close_session(session))
+        self.assertFalse(connection.close_session(session))
+        with self.assertRaises(DaemonError):
+            connection.process_content(session, content)
+        with self.assertRaises(DaemonError):
+            connection.request("no_such_operation")
+
+    def test_sessions_are_isolated(self):
+        """Test that each session keeps its own console limits."""
+        connection = self.start()
+        first, second = connection.open_session(), connection.open_session()
+        connection.process_content(first, "Command: set_console_limits wall=0.2\n")
+        self.assertIn("wall-clock limit", connection.process_content(first, "Command: run_console_command sleep 5\n")[0])
+        self.assertEqual(connection.process_content(second, "Command: set_console_limits\n")[0],
+                         "Console limits: no limits\n")
+
+    def test_output_is_sent_to_the_client(self):
+        """Test that stdout output and tty feedback come back with the reply of the session that wrote them."""
+        connection = self.start()
+        first, second = connection.open_session(), connection.open_session()
+        tty, stdout = io.StringIO(), io.StringIO()
+        with unittest.mock.patch.object(client, "_tty", tty), contextlib.redirect_stdout(stdout):
+            response, _ = connection.process_content(first, "Command: stdout\n`````\nresult\n`````\n"
+                                                             "Command: run_console_command echo hi\n")
+            self.assertEqual(connection.process_content(second, "Command: stdout\n`````\nother\n`````\n")[0],
+                             "Content written to stdout.\n")
+        self.assertIn("Content written to stdout.", response)
+        self.assertEqual(stdout.getvalue(), "result\nother\n")
+        self.assertIn("hi", tty.getvalue())
+        self.assertIn("[exit 0", tty.getvalue())
+
+    def test_request_timeout(self):
+        """Test that a reply slower than the client's timeout raises and closes the connection."""
+        connection = self.start()
+        session = connection.open_session()
+        slow = DaemonClient(self.socket_path, timeout=0.3)
+        start = time.monotonic()
+        with self.assertRaises(DaemonTimeoutError):
+            slow.process_content(session, "Command: run_console_command sleep 5\n")
+        self.assertLess(time.monotonic() - start, 3)
+        with self.assertRaises(OSError):
+            slow.request("ping")
+        self.assertTrue(connection.close_session(session))
+
+    def test_idle_eviction(self):
+        """Test that idle sessions are closed and the module-level client opens a new one."""
+        connection = self.start(idle_timeout=0.2)
+        try:
+            self.assertEqual(client.process_content(f"Command: read_file {self.path}\n",
+                                                    socket_path=self.socket_path)[0], "hello\n")
+            time.sleep(0.6)
+            self.assertEqual(connection.request("ping")["sessions"], 0)
+            self.assertEqual(client.process_content(f"Command: read_file {self.path}\n")[0], "hello\n")
+        finally:
+            client.close()
+
+    def test_shutdown_with_connected_client(self):
+        """Test that shutting down closes open connections without logging errors."""
+        daemon = Daemon(self.socket_path)
+        ready = threading.Event()
+        thread = threading.Thread(target=asyncio.run, args=(daemon.serve(ready=ready.set),))
+        thread.start()
+        self.assertTrue(ready.wait(10))
+        idle = DaemonClient(self.socket_path)
+        idle.open_session()
+        connection = DaemonClient(self.socket_path)
+        try:
+            with self.assertNoLogs("asyncio", level="ERROR"):
+                connection.request("shutdown")
+                thread.join(10)
+            self.assertFalse(thread.is_alive())
+            with self.assertRaises(ConnectionError):
+                idle.request("ping")
+        finally:
+            idle.close()
+            connection.close()
+
+    def test_open_from_other_directory(self):
+        """Test that a session opened from another working directory is refused."""
+        connection = self.start()
+        cwd = os.getcwd()
+        os.chdir(self.directory)
+        try:
+            with self.assertRaises(DaemonError):
+                connection.open_session()
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(connection.request("ping")["sessions"], 0)
+
+    def test_stale_socket(self):
+        """Test that a socket file left by a dead daemon is replaced and a live one is not."""
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.socket_path)
+        stale.close()
+        self.start()
+        with self.assertRaises(RuntimeError):
+            asyncio.run(Daemon(self.socket_path).serve())
+
+class TestServeCommand(unittest.TestCase):
+    def test_start_daemon(self):
+        """Test that the client starts `python -m llmide serve` and talks to it."""
+        directory = tempfile.mkdtemp()
+        socket_path = os.path.join(directory, 'llmide.sock')
+        try:
+            connection = client.start_daemon(socket_path)
+            try:
+                self.assertNotEqual(connection.request("ping")["pid"], os.getpid())
+            finally:
+                connection.request("shutdown")
+                connection.close()
+            deadline = time.monotonic() + 10
+            while os.path.exists(socket_path) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertFalse(os.path.exists(socket_path))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_clients_in_different_directories(self):
+        """Test that clients in different working directories get daemons running commands there."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        environment = {key: value for key, value in os.environ.items() if key != "LLMIDE_SOCKET"}
+        environment["XDG_RUNTIME_DIR"] = directory
+        package_parent = os.path.dirname(os.path.dirname(os.path.abspath(client.__file__)))
+        environment["PYTHONPATH"] = os.pathsep.join(filter(None, [package_parent, os.getenv("PYTHONPATH")]))
+        script = ("import sys\n"
+                  "from llmide import client\n"
+                  "content = 'Command: write_file hello.txt\\n`````\\n' + sys.argv[1] + '\\n`````\\n'\n"
+                  "content += 'Command: run_console_command pwd\\n'\n"
+                  "print(client.process_content(content)[0].strip().splitlines()[-1])\n"
+                  "client.close()\n")
+        for name in ("first", "second"):
+            os.mkdir(os.path.join(directory, name))
+        try:
+            for name in ("first", "second"):
+                cwd = os.path.join(directory, name)
+                # The daemon the client starts keeps its output streams open, so they are files rather than pipes.
+                with tempfile.TemporaryFile("w+") as output:
+                    subprocess.run([sys.executable, "-c", script, name], cwd=cwd, env=environment, stdout=output,
+                                   stderr=subprocess.DEVNULL, timeout=60)
+                    output.seek(0)
+                    self.assertEqual(output.read().strip(), os.path.realpath(cwd))
+            for name in ("first", "second"):
+                with open(os.path.join(directory, name, "hello.txt")) as file:
+                    self.assertEqual(file.read().strip(), name)
+        finally:
+            for socket_path in [os.path.join(directory, entry) for entry in os.listdir(directory)]:
+                if socket_path.endswith(".sock"):
+                    connection = DaemonClient(socket_path)
+                    connection.request("shutdown")
+                    connection.close()
+
+if __name__ == '__main__':
+    unittest.main()
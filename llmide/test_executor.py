@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+import unittest
+from llmide.commandparser import CommandInfo
+from llmide.executor import classify, execute_commands, plan
+
+class TestExecutor(unittest.TestCase):
+    def test_classify(self):
+        """Test read-only, writing and inline classification."""
+        read = classify(CommandInfo('read_file', 'a.py', None))
+        self.assertTrue(read.read_only)
+        self.assertEqual(read.paths, (os.path.realpath('a.py'),))
+        self.assertFalse(read.inline)
+        write = classify(CommandInfo('write_file', '"dir/b c.py"', 'x'))
+        self.assertFalse(write.read_only)
+        self.assertEqual(write.paths, (os.path.realpath('dir/b c.py'),))
+        self.assertTrue(classify(CommandInfo('run_console_command', 'ls', None)).inline)
+        self.assertTrue(classify(CommandInfo('web_read', '', None)).inline)
+        self.assertTrue(classify(CommandInfo('unknown_command', 'a.py', None)).inline)
+
+    def test_plan_dependencies(self):
+        """Test that only conflicting commands depend on each other."""
+        commands = [
+            CommandInfo('read_file', 'a.py', None),
+            CommandInfo('read_file', 'b.py', None),
+            CommandInfo('write_file', 'a.py', 'x'),
+            CommandInfo('read_file', 'b.py', None),
+            CommandInfo('summarize', 'pkg --recursive', None),
+            CommandInfo('write_file', 'pkg/mod.py', 'x'),
+            CommandInfo('run_console_command', 'ls', None),
+            CommandInfo('read_file', 'c.py', None),
+        ]
+        dependencies = [step.dependencies for step in plan(commands)]
+        self.assertEqual(dependencies[:6], [(), (), (0,), (), (), (4,)])
+        self.assertEqual(dependencies[6], (0, 1, 2, 3, 4, 5))
+        self.assertEqual(dependencies[7], (6,))
+
+    def test_results_in_document_order(self):
+        """Test that results come back in document order even when later commands finish first."""
+        commands = [CommandInfo('read_file', f'file{i}.py', None) for i in range(6)]
+
+        def run(command):
+            index = int(command.arguments[4])
+            time.sleep(0.01 * (6 - index))
+            return command.arguments
+
+        self.assertEqual(execute_commands(commands, run, max_workers=4), [c.arguments for c in commands])
+
+    def test_writes_to_same_path_stay_ordered(self):
+        """Test that writes to one path run in document order."""
+        order = []
+        commands = [CommandInfo('append_to_file', 'log.txt', str(i)) for i in range(5)]
+
+        def run(command):
+            time.sleep(0.001 * (5 - int(command.backtick_content)))
+            order.append(command.backtick_content)
+
+        execute_commands(commands, run, max_workers=4)
+        self.assertEqual(order, ['0', '1', '2', '3', '4'])
+
+    def test_inline_commands_run_on_calling_thread(self):
+        """Test that console and browser commands run on the calling thread."""
+        threads = {}
+        commands = [
+            CommandInfo('read_file', 'a.py', None),
+            CommandInfo('web_navigate', 'http://example.com', None),
+            CommandInfo('read_file', 'b.py', None),
+        ]
+
+        def run(command):
+            threads[command.command] = threading.current_thread()
+
+        execute_commands(commands, run, max_workers=4)
+        self.assertIs(threads['web_navigate'], threading.current_thread())
+
+if __name__ == '__main__':
+    unittest.main()
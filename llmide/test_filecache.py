@@ -0,0 +1,107 @@
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from llmide import llmide_functions
+from llmide.filecache import FileCache
+from llmide.session import Session, use_session
+
+class TestFileCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'module.py')
+        with open(self.path, 'w') as file:
+            file.write('a = 1\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_hit_and_external_change(self):
+        """Test that an unchanged file is served from the cache and a changed one is reread."""
+        cache = FileCache()
+        self.assertEqual(cache.read(self.path), 'a = 1\n')
+        self.assertEqual(cache.read(self.path), 'a = 1\n')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        with open(self.path, 'w') as file:
+            file.write('a = 22\n')
+        self.assertEqual(cache.read(self.path), 'a = 22\n')
+        self.assertEqual(cache.misses, 2)
+
+    def test_same_size_rewrite(self):
+        """Test that a rewrite keeping the size is noticed through the modification time."""
+        cache = FileCache()
+        cache.read(self.path)
+        with open(self.path, 'w') as file:
+            file.write('b = 2\n')
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        self.assertEqual(cache.read(self.path), 'b = 2\n')
+
+    def test_write_through(self):
+        """Test that writes through the cache are served without reading the file."""
+        cache = FileCache()
+        cache.write(self.path, 'c = 3\n')
+        self.assertEqual(cache.read(self.path), 'c = 3\n')
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        with open(self.path) as file:
+            self.assertEqual(file.read(), 'c = 3\n')
+
+    def test_atomic_write(self):
+        """Test that an atomic write replaces the file a link points to and keeps the cache in step."""
+        link = os.path.join(self.directory, 'link.py')
+        os.symlink(self.path, link)
+        cache = FileCache()
+        self.assertEqual(cache.read(link), 'a = 1\n')
+        cache.write(link, 'a = 2\n', atomic=True)
+        self.assertTrue(os.path.islink(link))
+        with open(self.path) as file:
+            self.assertEqual(file.read(), 'a = 2\n')
+        self.assertEqual(cache.read(link), 'a = 2\n')
+        self.assertEqual(cache.read(self.path), 'a = 2\n')
+        self.assertEqual(sorted(os.listdir(self.directory)), ['link.py', 'module.py'])
+
+    def test_atomic_write_new_file_mode(self):
+        """Test that an atomic write creates a missing file with the mode open() would give it."""
+        path = os.path.join(self.directory, 'new.py')
+        FileCache().write(path, 'b = 1\n', atomic=True)
+        plain = os.path.join(self.directory, 'plain.py')
+        with open(plain, 'w') as file:
+            file.write('b = 1\n')
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), stat.S_IMODE(os.stat(plain).st_mode))
+
+    def test_byte_budget(self):
+        """Test that the least recently used files are evicted to stay within the budget."""
+        cache = FileCache(max_bytes=12)
+        paths = []
+        for name in ('one', 'two', 'three'):
+            path = os.path.join(self.directory, name)
+            cache.write(path, name * 2)
+            paths.append(path)
+        self.assertNotIn(paths[0], cache)
+        self.assertIn(paths[2], cache)
+        self.assertLessEqual(cache.size, 12)
+        cache.write(paths[0], 'x' * 100)
+        self.assertNotIn(paths[0], cache)
+        cache.invalidate()
+        self.assertEqual(cache.size, 0)
+
+    def test_missing_file(self):
+        """Test that a missing file raises as open() would."""
+        with self.assertRaises(FileNotFoundError):
+            FileCache().read(os.path.join(self.directory, 'missing.py'))
+
+    def test_editing_commands(self):
+        """Test that consecutive edits of one file read it once and see outside changes."""
+        with use_session(Session()) as session:
+            llmide_functions.insert_text_after_matching_line(self.path, 'a = 1', 'b = 2\n')
+            llmide_functions.insert_text_after_matching_line(self.path, 'b = 2', 'c = 3\n')
+            self.assertEqual(llmide_functions.read_file(self.path), 'a = 1\nb = 2\nc = 3\n')
+            self.assertEqual(session.file_cache.misses, 1)
+            with open(self.path, 'a') as file:
+                file.write('d = 4\n')
+            self.assertIn('d = 4', llmide_functions.read_file(self.path))
+            self.assertEqual(session.file_cache.misses, 2)
+
+if __name__ == '__main__':
+    unittest.main()
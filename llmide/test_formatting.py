@@ -0,0 +1,118 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import unittest.mock
+from llmide import codemanipulator, formatting, protocol
+from llmide.client import DaemonClient
+from llmide.daemon import Daemon
+from llmide.formatting import FormatCache
+
+UNFORMATTED = "def f( a,b ):\n  return {'a':a,'b':b}\n"
+
+class TestFormatCache(unittest.TestCase):
+    def test_identical_inputs_are_formatted_once(self):
+        """Test that a repeated input is served from the cache and counted as a hit."""
+        cache = FormatCache()
+        calls = []
+        formatter = lambda code, line_length: calls.append(code) or formatting.format_with_black(code, line_length)
+        first = cache.format(UNFORMATTED, 88, formatter)
+        self.assertEqual(first, "def f(a, b):\n    return {\"a\": a, \"b\": b}\n")
+        self.assertEqual(cache.format(UNFORMATTED, 88, formatter), first)
+        cache.format(UNFORMATTED, 40, formatter)
+        self.assertEqual(len(calls), 2)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+        self.assertAlmostEqual(stats["hit_rate"], 1 / 3)
+        self.assertGreater(stats["format_seconds"], 0)
+
+    def test_failures_are_not_cached(self):
+        """Test that code that does not parse raises every time."""
+        cache = FormatCache()
+        for _ in range(2):
+            with self.assertRaises(SyntaxError):
+                cache.format("def f(:\n", 88, formatting.format_with_black)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_memory_budget(self):
+        """Test that the least recently used results are evicted to stay within the budget."""
+        cache = FormatCache(max_bytes=25)
+        identity = lambda code, line_length: code
+        for i in range(4):
+            cache.format(f"value_{i} = {i}\n", 88, identity)
+        self.assertLessEqual(cache.size, cache.max_bytes)
+        self.assertEqual(cache.stats()["entries"], 2)
+        cache.clear()
+        self.assertEqual(cache.size, 0)
+
+    def test_fragment_line_length(self):
+        """Test that spliced code is formatted to the line length left over by its indentation."""
+        source = "class A:\n    def f(self):\n        return 1\n"
+        new_code = "def f(self):\n    return some_function(argument_one, argument_two, argument_three, argument_fourth)\n"
+        result = codemanipulator.replace_code(source, "A.f", new_code)
+        self.assertTrue(all(len(line) <= 88 for line in result.splitlines()), result)
+        self.assertIn("        return some_function(\n", result)
+
+class TestFormattingWorker(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.directory, 'llmide.sock')
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(formatting.use_worker, enabled=False)
+
+    def test_worker_formats_misses(self):
+        """Test that cache misses are formatted by the daemon when a worker is configured."""
+        daemon = Daemon(self.socket_path)
+        ready = threading.Event()
+        thread = threading.Thread(target=asyncio.run, args=(daemon.serve(ready=ready.set),))
+        thread.start()
+        self.assertTrue(ready.wait(10))
+        try:
+            formatting.use_worker(self.socket_path)
+            code = "worker_value  =  [ 1,2 ]\n"
+            self.assertEqual(formatting.format_code(code), "worker_value = [1, 2]\n")
+            with self.assertRaises(SyntaxError):
+                formatting.format_code("worker_value = [\n")
+            self.assertEqual(formatting.format_stats()["worker_requests"], 2)
+            # Each thread formats over its own connection.
+            threads = [threading.Thread(target=formatting.format_code, args=(f"thread_value_{i}  =  {i}\n",))
+                       for i in range(3)]
+            for worker_thread in threads:
+                worker_thread.start()
+            for worker_thread in threads:
+                worker_thread.join()
+            self.assertEqual(formatting.format_stats()["worker_requests"], 5)
+            self.assertEqual(len(formatting._worker._clients), 4)
+        finally:
+            formatting.use_worker(enabled=False)
+            connection = DaemonClient(self.socket_path)
+            connection.request("shutdown")
+            connection.close()
+            thread.join(10)
+
+    def test_unreachable_worker_falls_back(self):
+        """Test that formatting carries on in this process when the worker cannot be reached."""
+        formatting.use_worker(self.socket_path, autostart=False)
+        self.assertEqual(formatting.format_code("fallback_value  =  1\n"), "fallback_value = 1\n")
+        stats = formatting.format_stats()
+        self.assertEqual((stats["worker_requests"], stats["worker_failures"]), (0, 1))
+
+    def test_shared_socket_does_not_depend_on_the_directory(self):
+        """Test that the worker's default socket is the same from every working directory."""
+        cwd = os.getcwd()
+        with unittest.mock.patch.dict(os.environ):
+            os.environ.pop("LLMIDE_SOCKET", None)
+            formatting.use_worker(autostart=False)
+            first = formatting._worker.socket_path
+            os.chdir(self.directory)
+            try:
+                formatting.use_worker(autostart=False)
+                self.assertEqual(formatting._worker.socket_path, first)
+                self.assertNotEqual(protocol.default_socket_path(), protocol.default_socket_path(cwd))
+            finally:
+                os.chdir(cwd)
+
+if __name__ == '__main__':
+    unittest.main()
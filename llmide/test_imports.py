@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# Cumulative import time allowed for llmide.llmide, in microseconds. Importing it used to
+# take several hundred milliseconds, most of it spent loading black, Playwright, PIL and requests.
+IMPORT_TIME_BUDGET_US = 150000
+HEAVY_MODULES = ("black", "playwright", "PIL", "requests", "anthropic")
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Makes importing playwright fail, as if it were not installed.
+BLOCK_PLAYWRIGHT = """
+import sys
+class BlockPlaywright:
+    def find_spec(self, name, path=None, target=None):
+        if name == "playwright" or name.startswith("playwright."):
+            raise ImportError("No module named 'playwright'")
+sys.meta_path.insert(0, BlockPlaywright())
+"""
+
+
+def run_python(*args):
+    environment = dict(os.environ, PYTHONPATH=PACKAGE_PARENT, PYTHONSAFEPATH="1")
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, env=environment, check=True)
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_heavy_modules_not_imported(self):
+        """Test that importing llmide.llmide loads none of the heavy dependencies."""
+        result = run_python("-c", f"import sys, llmide.llmide, llmide.aio; "
+                                  f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_import_time(self):
+        """Test that the cold import time of llmide.llmide stays within its budget."""
+        times = []
+        for _ in range(3):
+            result = run_python("-X", "importtime", "-c", "import llmide.llmide")
+            for line in result.stderr.splitlines():
+                fields = [field.strip() for field in line.split("|")]
+                if len(fields) == 3 and fields[2] == "llmide.llmide":
+                    times.append(int(fields[1]))
+        self.assertTrue(times)
+        self.assertLess(min(times), IMPORT_TIME_BUDGET_US)
+
+    def test_missing_playwright(self):
+        """Test that without Playwright only the web commands fail, and with a clear message."""
+        script = BLOCK_PLAYWRIGHT + (
+            "from llmide.llmide import process_content\n"
+            "print(process_content('Command: run_console_command echo hi\\nCommand: web_navigate http://x/\\n')[0])\n"
+        )
+        output = run_python("-c", script).stdout
+        self.assertTrue(output.startswith("hi\n"))
+        self.assertIn("the web commands need Playwright", output)
+
+if __name__ == '__main__':
+    unittest.main()
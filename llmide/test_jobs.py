@@ -0,0 +1,88 @@
+import time
+import unittest
+from llmide import llmide_functions
+from llmide.jobs import JobTable
+
+class TestJobTable(unittest.TestCase):
+    def setUp(self):
+        self.table = JobTable()
+
+    def tearDown(self):
+        self.table.kill_all(timeout=1)
+
+    def test_jobs_run_side_by_side(self):
+        """Test that jobs run concurrently and report their exit status."""
+        slow = self.table.start("sleep 0.3; echo slow")
+        fast = self.table.start("echo fast")
+        self.assertTrue(fast.wait(5))
+        self.assertEqual(fast.take_output(), "fast\n")
+        self.assertIsNone(slow.returncode)
+        self.assertTrue(slow.wait(5))
+        self.assertEqual(slow.take_output(), "slow\n")
+        self.assertEqual(slow.status(), "exited with status 0")
+        self.assertEqual([job.job_id for job in self.table.jobs()], [slow.job_id, fast.job_id])
+
+    def test_incremental_output(self):
+        """Test that each poll returns only the output produced since the previous poll."""
+        job = self.table.start("echo first; sleep 0.3; echo second")
+        deadline = time.time() + 5
+        output = ""
+        while "first" not in output and time.time() < deadline:
+            output += job.take_output()
+            time.sleep(0.02)
+        self.assertEqual(output, "first\n")
+        job.wait(5)
+        self.assertEqual(job.take_output(), "second\n")
+        self.assertEqual(job.take_output(), "")
+
+    def test_finished_jobs_are_forgotten(self):
+        """Test that finished jobs are dropped once their output is taken, and beyond max_finished."""
+        table = JobTable(max_finished=2)
+        self.addCleanup(table.kill_all, timeout=1)
+        read = table.start("echo read")
+        self.assertTrue(read.wait(5))
+        self.assertEqual(read.take_output(), "read\n")
+        self.assertTrue(read.collected)
+        unread = [table.start(f"echo unread {i}") for i in range(3)]
+        for job in unread:
+            self.assertTrue(job.wait(5))
+        self.assertEqual([job.job_id for job in table.jobs()], [job.job_id for job in unread])
+        running = table.start("sleep 30")
+        self.assertEqual([job.job_id for job in table.jobs()], [unread[1].job_id, unread[2].job_id, running.job_id])
+        with self.assertRaises(KeyError):
+            table.get(read.job_id)
+
+    def test_wait_timeout_and_kill(self):
+        """Test that wait times out on a running job and kill stops its whole process group."""
+        job = self.table.start("sleep 30 & sleep 30; wait")
+        self.assertFalse(job.wait(0.1))
+        self.table.kill(job.job_id)
+        self.assertEqual(job.status(), "killed by signal 15")
+
+    def test_kill_all(self):
+        """Test that kill_all stops every running job."""
+        jobs = [self.table.start("sleep 30") for _ in range(3)]
+        self.assertEqual(self.table.kill_all(), jobs)
+        self.assertTrue(all(job.returncode is not None for job in jobs))
+
+    def test_unknown_job(self):
+        """Test that looking up an unknown job raises KeyError."""
+        with self.assertRaises(KeyError):
+            self.table.get(42)
+
+class TestJobCommands(unittest.TestCase):
+    def tearDown(self):
+        llmide_functions.kill_all_console_jobs()
+
+    def test_commands(self):
+        """Test the job commands end to end, including terminate_process."""
+        started = llmide_functions.start_console_job('"echo hi; sleep 30"')
+        job_id = int(started.split()[2].rstrip(":"))
+        self.assertIn("running", llmide_functions.wait_console_job(job_id, 0.2))
+        self.assertIn(f"Job {job_id} (running)", llmide_functions.list_console_jobs())
+        llmide_functions.terminate_process()
+        self.assertIn("killed by signal 15", llmide_functions.poll_console_job(job_id))
+        self.assertEqual(llmide_functions.poll_console_job(999999), "No console job with id 999999.")
+
+if __name__ == '__main__':
+    unittest.main()
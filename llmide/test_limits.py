@@ -0,0 +1,104 @@
+import time
+import unittest
+from unittest import mock
+from llmide import llmide_functions
+import signal
+from llmide.limits import ConsoleLimits, ResourceUsage, parse_limits, tripped_limit
+from llmide.shell import ShellSession
+from llmide.session import Session, current_session, use_session
+
+class TestParseLimits(unittest.TestCase):
+    def test_parse(self):
+        """Test parsing of limit settings, sizes and removal."""
+        limits = parse_limits(["wall=30", "cpu=1.5", "memory=2G", "output=512k"])
+        self.assertEqual(limits, ConsoleLimits(30.0, 1.5, 2 * 1024 ** 3, 512 * 1024))
+        self.assertEqual(parse_limits(["timeout=none", "output=100"], limits).wall_seconds, None)
+        self.assertEqual(parse_limits(["output=100"], limits).output_bytes, 100)
+
+    def test_invalid(self):
+        """Test that unknown limits and bad values raise ValueError."""
+        for setting in ("disk=1", "wall", "wall=soon", "memory=lots"):
+            with self.assertRaises(ValueError):
+                parse_limits([setting])
+
+    def test_tripped_cpu_limit(self):
+        """Test that the CPU limit is only reported for commands it killed."""
+        limits = ConsoleLimits(cpu_seconds=1.5)
+        busy = ResourceUsage(1.5, 0.2, 0)
+        self.assertIsNone(tripped_limit(limits, 0, busy))
+        self.assertIsNone(tripped_limit(limits, 1, busy))
+        self.assertEqual(tripped_limit(limits, -signal.SIGXCPU, busy), "cpu_seconds")
+        self.assertEqual(tripped_limit(limits, 128 + signal.SIGXCPU, busy), "cpu_seconds")
+        self.assertEqual(tripped_limit(limits, -signal.SIGKILL, busy), "cpu_seconds")
+        self.assertIsNone(tripped_limit(limits, -signal.SIGKILL, ResourceUsage(0.1, 0.0, 0)))
+        self.assertIsNone(tripped_limit(ConsoleLimits(), -signal.SIGXCPU, busy))
+
+class TestConsoleLimits(unittest.TestCase):
+    def run_limited(self, command, **limits):
+        return llmide_functions.run_console_command(command, limits=ConsoleLimits(**limits))
+
+    def test_wall_clock_limit(self):
+        """Test that a hung command and its children are killed at the wall-clock limit."""
+        start = time.monotonic()
+        output = self.run_limited("echo started; sleep 30 & sleep 30", wall_seconds=0.3)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertIn("started", output)
+        self.assertIn("[Command stopped: wall-clock limit of 0.3s exceeded]", output)
+        self.assertEqual(current_session().last_console_result.tripped, "wall_seconds")
+
+    def test_cpu_limit(self):
+        """Test that a busy loop is stopped by the CPU limit."""
+        output = self.run_limited("while :; do :; done", cpu_seconds=1, wall_seconds=20)
+        self.assertIn("[Command stopped: CPU limit of 1s exceeded]", output)
+        self.assertGreaterEqual(current_session().last_console_result.usage.user_seconds, 0.5)
+
+    def test_kernel_limits_are_set(self):
+        """Test that the command itself runs under the CPU and memory limits."""
+        output = self.run_limited("ulimit -S -t; ulimit -H -t; ulimit -S -v", cpu_seconds=1.5,
+                                  memory_bytes=512 * 1024 ** 2)
+        self.assertEqual(output.split(), ["2", "3", str(512 * 1024)])
+        self.assertEqual(self.run_limited("echo \"$0\" 'quoted; text'").split()[1:], ["quoted;", "text"])
+
+    def test_output_limit(self):
+        """Test that a runaway writer is stopped by the output limit."""
+        output = self.run_limited("yes", output_bytes=100000, wall_seconds=20)
+        self.assertIn("[Command stopped: output limit of 100000 bytes exceeded]", output)
+
+    def test_memory_limit(self):
+        """Test that allocations beyond the memory limit fail."""
+        output = self.run_limited("python3 -c 'bytearray(1 << 30)'", memory_bytes=256 * 1024 ** 2)
+        self.assertIn("MemoryError", output)
+        self.assertIn("memory limit", output)
+
+    def test_usage_and_status(self):
+        """Test that exit status and resource usage are recorded."""
+        self.assertEqual(self.run_limited("exit 3"), "ok")
+        result = current_session().last_console_result
+        self.assertEqual(result.returncode, 3)
+        self.assertIsNone(result.tripped)
+        self.assertGreater(result.usage.max_rss_bytes, 0)
+
+    def test_persistent_shell_wall_clock_limit(self):
+        """Test that the wall-clock limit also applies in the persistent shell."""
+        session = ShellSession("/bin/sh")
+        with mock.patch.object(llmide_functions, "PERSISTENT_SHELL", True), \
+                use_session(Session()) as agent:
+            agent.shell_session = session
+            try:
+                output = self.run_limited("sleep 30", wall_seconds=0.3)
+                self.assertIn("[Command stopped: wall-clock limit of 0.3s exceeded]", output)
+                self.assertEqual(self.run_limited("echo again"), "again\n")
+            finally:
+                session.close()
+
+    def test_set_console_limits(self):
+        """Test changing the default limits through the command."""
+        with mock.patch.object(llmide_functions, "CONSOLE_LIMITS", ConsoleLimits()), use_session(Session()):
+            self.assertEqual(llmide_functions.set_console_limits(), "Console limits: no limits")
+            self.assertEqual(llmide_functions.set_console_limits("wall=0.3"), "Console limits: wall=0.3")
+            self.assertIn("wall-clock limit", llmide_functions.run_console_command("sleep 30"))
+            self.assertTrue(llmide_functions.set_console_limits("disk=1").startswith("Error:"))
+        self.assertIsNone(current_session().console_limits)
+
+if __name__ == '__main__':
+    unittest.main()
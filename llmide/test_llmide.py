@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import unittest
+from llmide.llmide import ResponseWriter, iter_process_content, process_content, process_stream
+
+class TestProcessContent(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'notes.txt')
+        with open(self.path, 'w') as file:
+            file.write('hello')
+        self.content = (
+            f"Command: read_file {self.path}\n"
+            f"Command: write_file {self.path}\n`````\nupdated\n`````\n"
+            f"Command: read_file {self.path}\n"
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_no_commands(self):
+        """Test the response when there is nothing to execute."""
+        self.assertEqual(process_content("Just prose."), ("End.", []))
+
+    def test_commands_run_in_document_order(self):
+        """Test that reads around a write see the file before and after it."""
+        response, images = process_content(self.content)
+        self.assertTrue(response.startswith('hello\n'))
+        self.assertTrue(response.endswith('updated\n\n'))
+        self.assertEqual(images, [])
+
+    def test_parallel_matches_sequential(self):
+        """Test that parallel execution produces the same response as sequential execution."""
+        sequential = process_content(self.content, max_workers=1)
+        with open(self.path, 'w') as file:
+            file.write('hello')
+        self.assertEqual(process_content(self.content), sequential)
+
+    def test_stream_matches_process_content(self):
+        """Test that streamed processing produces the same response as process_content."""
+        expected = process_content(self.content)
+        with open(self.path, 'w') as file:
+            file.write('hello')
+        self.assertEqual(process_stream(self.content[i:i + 7] for i in range(0, len(self.content), 7)), expected)
+
+    def test_iter_process_content(self):
+        """Test that one result is yielded per command."""
+        results = list(iter_process_content(self.content))
+        self.assertEqual([result.command.command for result in results], ['read_file', 'write_file', 'read_file'])
+        self.assertEqual(results[0].response, 'hello\n')
+
+    def test_output_budget(self):
+        """Test that the global output budget truncates the combined response."""
+        response, _ = process_content(self.content, max_output_chars=10)
+        self.assertTrue(response.startswith('hello\n'))
+        self.assertIn('characters of command output omitted', response)
+
+class TestResponseWriter(unittest.TestCase):
+    def test_budget(self):
+        """Test that writes beyond the budget are counted but not kept."""
+        writer = ResponseWriter(max_chars=5)
+        writer.write('abc')
+        writer.write('defg')
+        writer.write('hij')
+        self.assertEqual(writer.written, 5)
+        self.assertEqual(writer.omitted, 5)
+        self.assertTrue(writer.getvalue().startswith('abcde\n['))
+
+    def test_unlimited(self):
+        """Test that without a budget the output is simply concatenated."""
+        writer = ResponseWriter()
+        for part in ['a', 'b', 'c']:
+            writer.write(part)
+        self.assertEqual(writer.getvalue(), 'abc')
+
+if __name__ == '__main__':
+    unittest.main()
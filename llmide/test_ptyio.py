@@ -0,0 +1,79 @@
+import io
+import os
+import subprocess
+import time
+import unittest
+from llmide.ptyio import TtyEcho, open_pty, pump_pty
+
+class TestTtyEcho(unittest.TestCase):
+    def test_split_multibyte_characters(self):
+        """Test that characters split across writes are decoded intact."""
+        stream = io.StringIO()
+        echo = TtyEcho(stream, interval=0)
+        data = "héllo wörld ✓".encode()
+        for i in range(len(data)):
+            echo.write(data[i:i + 1])
+        echo.flush(final=True)
+        self.assertEqual(stream.getvalue(), "héllo wörld ✓")
+
+    def test_coalescing(self):
+        """Test that writes within the interval are held until flushed."""
+        stream = io.StringIO()
+        echo = TtyEcho(stream, interval=60)
+        for i in range(100):
+            echo.write(b"line\n")
+        self.assertEqual(stream.getvalue(), "")
+        echo.flush()
+        self.assertEqual(stream.getvalue(), "line\n" * 100)
+
+    def test_rate_limit_skips_oldest(self):
+        """Test that only the most recent text is echoed when output outpaces the interval."""
+        stream = io.StringIO()
+        echo = TtyEcho(stream, interval=60, max_pending=10)
+        echo.write(b"0123456789abcdef")
+        echo.flush(final=True)
+        self.assertEqual(stream.getvalue(), "\n[... 6 characters not echoed ...]\n6789abcdef")
+        self.assertEqual(echo.skipped, 6)
+
+class TestPumpPty(unittest.TestCase):
+    def spawn(self, command):
+        master_fd, slave_fd = open_pty()
+        process = subprocess.Popen(command, shell=True, stdin=slave_fd, stdout=slave_fd, stderr=slave_fd,
+                                   start_new_session=True)
+        os.close(slave_fd)
+        self.addCleanup(os.close, master_fd)
+        return master_fd, process
+
+    def test_reads_all_output_and_usage(self):
+        """Test that all output is read and the process is reaped with its usage."""
+        fd, process = self.spawn("seq 1 100000; exit 4")
+        chunks = []
+        usage, timed_out = pump_pty(fd, process, chunks.append)
+        self.assertFalse(timed_out)
+        self.assertEqual(process.returncode, 4)
+        self.assertIsNotNone(usage)
+        self.assertEqual(b"".join(chunks).split(b"\n")[-2], b"100000")
+
+    def test_background_child_does_not_block(self):
+        """Test that a child left holding the pty does not keep the reader waiting."""
+        fd, process = self.spawn("sleep 30 & echo done")
+        start = time.monotonic()
+        chunks = []
+        pump_pty(fd, process, chunks.append)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(b"".join(chunks), b"done\n")
+        os.killpg(process.pid, 9)
+
+    def test_deadline(self):
+        """Test that the deadline returns control while the process keeps running."""
+        fd, process = self.spawn("sleep 30")
+        usage, timed_out = pump_pty(fd, process, lambda data: None, time.monotonic() + 0.1)
+        self.assertTrue(timed_out)
+        self.assertIsNone(process.returncode)
+        os.killpg(process.pid, 9)
+        usage, timed_out = pump_pty(fd, process, lambda data: None)
+        self.assertFalse(timed_out)
+        self.assertEqual(process.returncode, -9)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import ast
+import glob
+import os
+import re
+import unittest
+from llmide.codemanipulator import convert_double_quotes_to_single
+
+def legacy_convert_double_quotes_to_single(code):
+    """The regex-based conversion convert_double_quotes_to_single replaced."""
+    def replace_quotes(match):
+        if re.search(r'(f|@\w+\(|print\(|return ).*' + re.escape(match.group(0)) + r'.*[\)]?', code):
+            return match.group(0)
+        return "'" + match.group(1).replace("'", "\\'") + "'"
+    code = re.sub(r'"([^"\\]*(?:\\.[^"\\]*)*)"', replace_quotes, code)
+    return code
+
+# Inputs on which the conversion keeps the output of the regex-based version.
+EQUIVALENT_CASES = [
+    'x = "a"\n',
+    'd = {"key": 1, "other": [1, 2]}\n',
+    'w = "a" + "b"\n',
+    'print("hi")\n',
+    'z = f"{a} and {b}"\n',
+    '@route("/home")\ndef home():\n    pass\n',
+    'def g():\n    return "value"\n',
+    'r = r"\\d+"\n',
+    'b = b"bytes"\n',
+    'q = "say \\"hi\\""\n',
+    'items = ["one", "two"]\n',
+    "already = 'single'\n",
+    'x = call(arg="value")\n',
+]
+
+# Inputs the regex-based version got wrong, with the output now produced.
+CORRECTED_CASES = [
+    # Docstrings keep their double quotes.
+    ('def g():\n    """Doc."""\n    x = 1\n', 'def g():\n    """Doc."""\n    x = 1\n'),
+    # A single quote in the text would need escaping, so the string is left alone.
+    ('y = "it\'s"\n', 'y = "it\'s"\n'),
+    # Any "f" before a string on its line used to count as an f-string.
+    ('self.name = "n"\n', "self.name = 'n'\n"),
+    # Only the first statement of a body is its docstring.
+    ('class A:\n    """Doc."""\n\n    x = """text"""\n', 'class A:\n    """Doc."""\n\n    x = \'\'\'text\'\'\'\n'),
+]
+
+class TestConvertQuotes(unittest.TestCase):
+    def test_equivalent_to_regex_version(self):
+        """Test that the tokenizer-based conversion matches the regex-based one where that one was right."""
+        for code in EQUIVALENT_CASES:
+            with self.subTest(code=code):
+                self.assertEqual(convert_double_quotes_to_single(code), legacy_convert_double_quotes_to_single(code))
+
+    def test_corrected_cases(self):
+        """Test the cases the regex-based conversion got wrong."""
+        for code, expected in CORRECTED_CASES:
+            with self.subTest(code=code):
+                self.assertEqual(convert_double_quotes_to_single(code), expected)
+
+    def test_statements_on_one_line(self):
+        """Test that print calls and return statements only protect their own strings."""
+        code = 'x = "a"; print("b", "c"); y = ("d")\n'
+        self.assertEqual(convert_double_quotes_to_single(code), 'x = \'a\'; print("b", "c"); y = (\'d\')\n')
+
+    def test_nested_fstring_parts(self):
+        """Test that strings inside an f-string's replacement fields are left alone."""
+        code = 'x = f"{d[\'k\']}" + "a"\n'
+        self.assertEqual(convert_double_quotes_to_single(code), 'x = f"{d[\'k\']}" + \'a\'\n')
+
+    def test_invalid_code_is_unchanged(self):
+        """Test that code that does not parse is returned as it is."""
+        self.assertEqual(convert_double_quotes_to_single('x = "a'), 'x = "a')
+
+    def test_package_modules_keep_their_meaning(self):
+        """Test that converting each module of the package leaves its syntax tree unchanged."""
+        for path in glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py")):
+            with open(path) as file:
+                code = file.read()
+            with self.subTest(path=os.path.basename(path)):
+                self.assertEqual(ast.dump(ast.parse(convert_double_quotes_to_single(code))), ast.dump(ast.parse(code)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from llmide import registry
+
+class TestRegistry(unittest.TestCase):
+    def test_lookup_is_case_insensitive(self):
+        """Test that commands are found regardless of case."""
+        self.assertIs(registry.lookup('READ_FILE'), registry.lookup('read_file'))
+        self.assertIsNone(registry.lookup('no_such_command'))
+        self.assertIsNone(registry.lookup('get_default_shell'))
+
+    def test_arity(self):
+        """Test that arity is read from the function signatures."""
+        spec = registry.lookup('replace_code_at_address')
+        self.assertEqual((spec.min_args, spec.max_args), (3, 3))
+        self.assertTrue(spec.takes_backticks)
+        summarize = registry.lookup('summarize')
+        self.assertEqual((summarize.min_args, summarize.max_args), (0, None))
+
+    def test_prepare_arguments(self):
+        """Test splitting, backtick appending and raw argument strings."""
+        spec = registry.lookup('write_file')
+        self.assertEqual(registry.prepare_arguments(spec, '"my file.py"', 'code'), ['my file.py', 'code'])
+        spec = registry.lookup('run_console_command')
+        self.assertEqual(registry.prepare_arguments(spec, 'echo "a b"', None), ['echo "a b"'])
+
+    def test_prepare_arguments_validates_arity(self):
+        """Test that a wrong number of arguments is reported before the call."""
+        spec = registry.lookup('write_file')
+        with self.assertRaisesRegex(ValueError, r"write_file expects 2 argument\(s\) \(file_path, code\), got 1"):
+            registry.prepare_arguments(spec, 'a.py', None)
+
+    def test_coercers(self):
+        """Test that declared coercers convert arguments."""
+        spec = registry.lookup('web_wait')
+        self.assertEqual(registry.prepare_arguments(spec, '#main 500', None), ['#main', 500])
+        with self.assertRaises(ValueError):
+            registry.prepare_arguments(spec, '#main soon', None)
+
+    def test_classification(self):
+        """Test read/write classification and path extraction."""
+        self.assertTrue(registry.lookup('read_code_at_address').read_only)
+        self.assertFalse(registry.lookup('add_code_after_address').read_only)
+        self.assertTrue(registry.lookup('web_read').read_only)
+        self.assertTrue(registry.lookup('web_read').inline)
+        self.assertEqual(registry.argument_paths(registry.lookup('summarize'), '-r src "*.py"'), ['src'])
+
+    def test_export_schema(self):
+        """Test that every command appears in the exported schema."""
+        names = [entry['name'] for entry in registry.export_schema()]
+        self.assertIn('read_file', names)
+        self.assertIn('web_wait', names)
+        self.assertEqual(names, sorted(names))
+
+if __name__ == '__main__':
+    unittest.main()
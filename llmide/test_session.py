@@ -0,0 +1,124 @@
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from llmide import aio, llmide, llmide_functions
+from llmide.session import Session, current_session, default_session, use_session
+
+class TestSessionContext(unittest.TestCase):
+    def test_use_session(self):
+        """Test that use_session sets the current session for its block only."""
+        session = Session()
+        with use_session(session):
+            self.assertIs(current_session(), session)
+            with use_session(None):
+                self.assertIs(current_session(), session)
+        self.assertIs(current_session(), default_session())
+
+    def test_threads_have_their_own_session(self):
+        """Test that sessions set on different threads do not leak into each other."""
+        seen = {}
+        barrier = threading.Barrier(2)
+
+        def run(name):
+            session = Session()
+            with use_session(session):
+                barrier.wait()
+                seen[name] = current_session() is session
+
+        threads = [threading.Thread(target=run, args=(name,)) for name in ("a", "b")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(seen, {"a": True, "b": True})
+
+class TestSessionIsolation(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'notes.txt')
+        with open(self.path, 'w') as file:
+            file.write('hello')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_process_content_routes_state(self):
+        """Test that limits, console results and tty output stay in the session that produced them."""
+        first, second = Session(tty=io.StringIO()), Session(tty=io.StringIO())
+        llmide.process_content("Command: set_console_limits wall=0.3\n", session=first)
+        response, _ = llmide.process_content("Command: run_console_command sleep 30\n", session=first)
+        self.assertIn("wall-clock limit", response)
+        response, _ = llmide.process_content("Command: run_console_command echo second\n", session=second)
+        self.assertEqual(response, "second\n\n")
+        self.assertEqual(first.last_console_result.tripped, "wall_seconds")
+        self.assertEqual(second.last_console_result.output, "second\n")
+        self.assertIsNone(second.console_limits)
+        self.assertIn("second", second.tty.getvalue())
+        self.assertNotIn("second", first.tty.getvalue())
+
+    def test_worker_threads_see_the_session(self):
+        """Test that commands run on the executor's thread pool use the session's LLM backend."""
+        sessions = [Session(llm_generate=lambda system, user, name=name: f"summary from {name}")
+                    for name in ("first", "second")]
+        for name, session in zip(("first", "second"), sessions):
+            path = os.path.join(self.directory, f'{name}.txt')
+            with open(path, 'w') as file:
+                file.write(name)
+            content = f"Command: read_file {self.path}\nCommand: summarize {path}\n"
+            response, _ = llmide.process_content(content, session=session)
+            self.assertIn(f"summary from {name}", response)
+
+    def test_terminate_process(self):
+        """Test that terminating one session leaves another session's jobs running."""
+        first, second = Session(tty=io.StringIO()), Session(tty=io.StringIO())
+        try:
+            with use_session(first):
+                llmide_functions.start_console_job("sleep 30")
+            with use_session(second):
+                llmide_functions.start_console_job("sleep 30")
+            llmide.terminate_process(first)
+            self.assertIsNotNone(first.console_jobs.jobs()[0].returncode)
+            self.assertIsNone(second.console_jobs.jobs()[0].returncode)
+        finally:
+            first.close()
+            second.close()
+
+    def test_aclose_does_not_block_the_loop(self):
+        """Test that closing a session leaves the event loop free to serve others meanwhile."""
+        session = Session(tty=io.StringIO())
+        session.close = lambda: time.sleep(0.5)
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.05)
+
+        async def close_while_ticking():
+            ticker = asyncio.ensure_future(tick())
+            await session.aclose()
+            ticker.cancel()
+
+        asyncio.run(close_while_ticking())
+        self.assertGreater(len(ticks), 3)
+
+    def test_async_sessions(self):
+        """Test that one event loop serves several sessions at once."""
+        sessions = [Session(tty=io.StringIO()) for _ in range(3)]
+
+        async def run_all():
+            return await asyncio.gather(*(
+                aio.process_content(f"Command: run_console_command sleep 0.2; echo {i}\n", session=session)
+                for i, session in enumerate(sessions)))
+
+        responses = asyncio.run(run_all())
+        self.assertEqual([response for response, _ in responses], ["0\n\n", "1\n\n", "2\n\n"])
+        self.assertEqual([session.last_console_result.output for session in sessions], ["0\n", "1\n", "2\n"])
+
+if __name__ == '__main__':
+    unittest.main()
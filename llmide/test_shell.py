@@ -0,0 +1,73 @@
+import unittest
+from unittest import mock
+from llmide import llmide_functions
+from llmide.shell import ShellSession
+from llmide.session import Session, use_session
+
+class TestShellSession(unittest.TestCase):
+    def setUp(self):
+        self.shell = ShellSession("/bin/sh")
+
+    def tearDown(self):
+        self.shell.close()
+
+    def run_command(self, command):
+        chunks = []
+        status = self.shell.run(command, chunks.append)
+        return status, b"".join(chunks).decode()
+
+    def test_output_and_status(self):
+        """Test that output and exit status are framed per command."""
+        self.assertEqual(self.run_command("echo hello"), (0, "hello\n"))
+        self.assertEqual(self.run_command("printf partial"), (0, "partial"))
+        self.assertEqual(self.run_command("exit_code() { return 3; }; exit_code")[0], 3)
+        self.assertEqual(self.run_command("true"), (0, ""))
+
+    def test_state_persists(self):
+        """Test that the working directory and variables carry over between commands."""
+        self.run_command("cd /tmp && export LLMIDE_TEST_VALUE=42")
+        self.assertEqual(self.run_command("pwd; echo $LLMIDE_TEST_VALUE")[1], "/tmp\n42\n")
+
+    def test_quoting_errors_do_not_hang(self):
+        """Test that a command with unbalanced quotes still returns."""
+        status, _ = self.run_command("echo 'unterminated")
+        self.assertNotEqual(status, 0)
+        self.assertEqual(self.run_command("echo next"), (0, "next\n"))
+
+    def test_restart_after_exit(self):
+        """Test that the shell is restarted after the command exits it."""
+        self.run_command("export LLMIDE_TEST_VALUE=1")
+        status, _ = self.run_command("exit 5")
+        self.assertIsNone(status)
+        self.assertFalse(self.shell.alive)
+        self.assertEqual(self.run_command("echo ${LLMIDE_TEST_VALUE:-unset}"), (0, "unset\n"))
+
+    def test_reset(self):
+        """Test that reset discards shell state."""
+        self.run_command("LLMIDE_TEST_VALUE=1")
+        self.shell.reset()
+        self.assertEqual(self.run_command("echo ${LLMIDE_TEST_VALUE:-unset}"), (0, "unset\n"))
+
+    def test_large_output(self):
+        """Test that output larger than one read is passed through completely."""
+        status, output = self.run_command("seq 1 50000")
+        self.assertEqual(status, 0)
+        self.assertEqual(output.split("\n")[:-1], [str(i) for i in range(1, 50001)])
+
+class TestPersistentConsole(unittest.TestCase):
+    def test_run_console_command(self):
+        """Test that run_console_command keeps state in persistent mode until reset_console."""
+        session = ShellSession("/bin/sh")
+        with mock.patch.object(llmide_functions, "PERSISTENT_SHELL", True), \
+                use_session(Session()) as agent:
+            agent.shell_session = session
+            try:
+                llmide_functions.run_console_command("cd /tmp")
+                self.assertEqual(llmide_functions.run_console_command("pwd"), "/tmp\n")
+                self.assertEqual(llmide_functions.reset_console(), "Console shell restarted.")
+                self.assertNotEqual(llmide_functions.run_console_command("pwd"), "/tmp\n")
+            finally:
+                session.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from llmide import codemanipulator
+from llmide.splice import splice_code
+
+SOURCE = '''"""Module docstring."""
+
+import os  # keep this comment
+
+
+class Greeter:
+    """Says hello."""
+
+    # The greeting used by default.
+    greeting = "Hello"
+
+    @staticmethod
+    def greet(name):
+        """Return a greeting."""
+        return f"{Greeter.greeting}, {name}"  # trailing comment
+
+    def wave(self):
+        return "o/"
+
+
+def helper():
+    # helper comment
+    return 1
+'''
+
+class TestSplice(unittest.TestCase):
+    def test_replace_keeps_the_rest(self):
+        """Test that a replace splices the new code in and leaves every other line as it was."""
+        result = codemanipulator.replace_code(SOURCE, "Greeter.greet", "def greet(name):\n    return name\n")
+        self.assertEqual(result, SOURCE.replace(
+            '''    @staticmethod
+    def greet(name):
+        """Return a greeting."""
+        return f"{Greeter.greeting}, {name}"  # trailing comment
+''', '''    def greet(name):
+        return name
+'''))
+
+    def test_remove(self):
+        """Test that a remove takes out the definition with its decorators."""
+        result = codemanipulator.remove_code(SOURCE, "Greeter.greet")
+        self.assertNotIn("greet(", result)
+        self.assertNotIn("@staticmethod", result)
+        self.assertIn("# keep this comment", result)
+        self.assertIn("# helper comment", result)
+
+    def test_insert_after_and_before(self):
+        """Test that inserted definitions get blank lines around them, as black would put them."""
+        after = codemanipulator.insert_code_after(SOURCE, "helper", "def other():\n    return 2\n")
+        self.assertTrue(after.endswith("    return 1\n\n\ndef other():\n    return 2\n"))
+        before = codemanipulator.insert_code_before(SOURCE, "Greeter.wave", "def bow(self):\n    return 0\n")
+        self.assertIn("        return 0\n\n    def wave(self):", before)
+
+    def test_insert_at_class(self):
+        """Test that inserting at a class adds to the end of its body, as CodeManipulator does."""
+        result = codemanipulator.insert_code_after(SOURCE, "Greeter", "def nod(self):\n    return 0\n")
+        self.assertIn('        return "o/"\n\n    def nod(self):\n        return 0\n\n\ndef helper', result)
+
+    def test_create(self):
+        """Test that create adds a missing method or function and leaves existing ones alone."""
+        method = codemanipulator.create_code(SOURCE, "Greeter.nod", "def nod(self):\n    return 0\n")
+        self.assertIn("\n\n    def nod(self):\n        return 0\n\n\ndef helper", method)
+        function = codemanipulator.create_code(SOURCE, "other", "def other():\n    return 2\n")
+        self.assertTrue(function.endswith("    return 1\n\n\ndef other():\n    return 2\n"))
+        self.assertEqual(codemanipulator.create_code(SOURCE, "helper", "def helper():\n    return 3\n"), SOURCE)
+
+    def test_assignment(self):
+        """Test that class attributes are addressed like methods."""
+        result = codemanipulator.replace_code(SOURCE, "Greeter.greeting", 'greeting = "Hey"')
+        self.assertIn("    # The greeting used by default.\n    greeting = 'Hey'\n", result)
+
+    def test_multiline_strings_are_not_reindented(self):
+        """Test that the lines inside a multi-line string in the new code keep their indentation."""
+        new_code = 'def wave(self):\n    text = """a\nb"""\n    return text\n'
+        result = splice_code(SOURCE, "Greeter.wave", new_code, "replace")
+        self.assertIn('    def wave(self):\n        text = """a\nb"""\n        return text\n', result)
+
+    def test_fallbacks(self):
+        """Test that edits that cannot be spliced safely are left to the tree rewrite."""
+        duplicated = "def f():\n    return 1\n\ndef f():\n    return 2\n"
+        self.assertIsNone(splice_code(duplicated, "f", "def f():\n    return 3\n", "replace"))
+        shared_line = "x = 1; y = 2\n"
+        self.assertIsNone(splice_code(shared_line, "y", "y = 3\n", "replace"))
+        only_method = "class A:\n    def f(self):\n        pass\n"
+        self.assertIsNone(splice_code(only_method, "A.f", None, "remove"))
+        self.assertIsNone(splice_code(SOURCE, "missing", "x = 1\n", "replace"))
+
+    def test_invalid_new_code(self):
+        """Test that new code that does not parse is refused."""
+        with self.assertRaises(SyntaxError):
+            codemanipulator.replace_code(SOURCE, "helper", "def helper(:\n")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+from llmide import llmide_functions, symbolindex
+from llmide.symbolindex import SymbolIndex
+
+SHAPES = '''
+"""Shapes."""
+
+DEFAULT_SIDES = 4
+
+
+class Shape:
+    """A shape."""
+
+    sides = DEFAULT_SIDES
+
+    def area(self) -> float:
+        """Return the area."""
+        local_value = 1
+        return local_value
+
+    async def render(self, canvas, *, scale=1):
+        pass
+
+
+def make_shape(kind):
+    return Shape()
+'''
+
+class TestSymbolIndex(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.addCleanup(symbolindex.close_indexes)
+        self.write("geometry/__init__.py", "from .shapes import Shape\n")
+        self.write("geometry/shapes.py", SHAPES)
+        self.write("geometry/solids/cube.py", "class Cube:\n    def area(self):\n        return 6\n")
+        self.write("tools.py", "def area(x):\n    return x\n")
+        self.write(".hidden/skipped.py", "def area():\n    pass\n")
+        self.index = SymbolIndex(self.root)
+        self.addCleanup(self.index.close)
+
+    def write(self, path, text):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+
+    def test_find(self):
+        """Test finding a symbol by qualified name, address, name and prefix."""
+        self.assertEqual(self.index.update(), {"scanned": 4, "parsed": 4, "removed": 0})
+        area = self.index.find("geometry.shapes.Shape.area")
+        self.assertEqual(len(area), 1)
+        self.assertEqual((area[0]["path"], area[0]["start_line"], area[0]["end_line"]),
+                         (os.path.join("geometry", "shapes.py"), 12, 15))
+        self.assertEqual(area[0]["signature"], "def area(self) -> float")
+        self.assertEqual(area[0]["docstring"], "Return the area.")
+        self.assertEqual(self.index.find("Shape.area"), area)
+        self.assertEqual([symbol["qualname"] for symbol in self.index.find("area")],
+                         ["geometry.shapes.Shape.area", "geometry.solids.cube.Cube.area", "tools.area"])
+        self.assertEqual([symbol["qualname"] for symbol in self.index.find("geometry.shapes.Shape.*")],
+                         ["geometry.shapes.Shape.area", "geometry.shapes.Shape.render", "geometry.shapes.Shape.sides"])
+        self.assertEqual(self.index.find("Shape.render")[0]["signature"], "async def render(self, canvas, *, scale=1)")
+        self.assertEqual(self.index.find("local_value"), [])
+
+    def test_list_package(self):
+        """Test listing a package's symbols, its subpackages included, and a single module."""
+        self.index.update()
+        self.assertEqual([symbol["qualname"] for symbol in self.index.list_package("geometry")], [
+            "geometry.shapes.DEFAULT_SIDES", "geometry.shapes.Shape", "geometry.shapes.Shape.sides",
+            "geometry.shapes.Shape.area", "geometry.shapes.Shape.render", "geometry.shapes.make_shape",
+            "geometry.solids.cube.Cube", "geometry.solids.cube.Cube.area"])
+        self.assertEqual(len(self.index.list_package("geometry.solids.cube")), 2)
+        self.assertEqual(self.index.list_package("geometry.sol"), [])
+        self.assertEqual(len(self.index.list_package("")), 9)
+
+    def test_incremental_update(self):
+        """Test that only changed files are parsed again, and removed files are dropped."""
+        self.index.update()
+        self.assertEqual(self.index.update()["parsed"], 0)
+        os.utime(os.path.join(self.root, "tools.py"), ns=(time.time_ns(), time.time_ns() + 10**9))
+        self.assertEqual(self.index.update()["parsed"], 0)
+        self.write("tools.py", "def volume(x):\n    return x\n")
+        os.remove(os.path.join(self.root, "geometry", "solids", "cube.py"))
+        self.assertEqual(self.index.update(), {"scanned": 3, "parsed": 1, "removed": 1})
+        self.assertEqual([symbol["qualname"] for symbol in self.index.find("area")], ["geometry.shapes.Shape.area"])
+        self.assertEqual(len(self.index.find("volume")), 1)
+
+    def test_results_are_revalidated(self):
+        """Test that a query reports a definition at its current place even before the next rescan."""
+        self.index.update()
+        self.write("tools.py", "\n\ndef area(x):\n    return x\n")
+        self.assertEqual(self.index.find("tools.area")[0]["start_line"], 3)
+
+    def test_parallel_build(self):
+        """Test that files parsed in worker processes are indexed like files parsed here."""
+        for i in range(64):
+            self.write(f"generated/module_{i}.py", f"def function_{i}():\n    pass\n")
+        run_worker = symbolindex.SymbolIndex._run_worker
+        from_workers = []
+
+        def record(index, jobs):
+            results = run_worker(index, jobs)
+            from_workers.extend(results)
+            return results
+
+        with mock.patch.object(symbolindex, "PARALLEL_THRESHOLD", 64), \
+                mock.patch.object(symbolindex.SymbolIndex, "_run_worker", record):
+            self.assertEqual(self.index.update(workers=2)["parsed"], 64 + 4)
+        self.assertEqual(len(from_workers), 64 + 4)
+        self.assertEqual(self.index.find("generated.module_63.function_63")[0]["start_line"], 1)
+        self.assertEqual(len(self.index.find("generated.module_*")), 64)
+
+    def test_syntax_errors(self):
+        """Test that a file that does not parse is skipped until it changes."""
+        self.write("broken.py", "def broken(:\n")
+        self.index.update()
+        self.assertEqual(self.index.find("broken"), [])
+        self.write("broken.py", "def broken():\n    pass\n")
+        self.index.update()
+        self.assertEqual(len(self.index.find("broken")), 1)
+
+    def test_commands(self):
+        """Test the find_symbol and list_symbols commands."""
+        output = llmide_functions.find_symbol("Shape", self.root)
+        self.assertEqual(output, f"{os.path.join('geometry', 'shapes.py')}:7-18 geometry.shapes.Shape\n"
+                                 f"    class Shape\n    A shape.")
+        self.assertEqual(llmide_functions.find_symbol("Missing", self.root), "No symbols match 'Missing'.")
+        self.assertIn("geometry.solids.cube.Cube.area", llmide_functions.list_symbols("geometry.solids", self.root))
+        self.assertTrue(os.path.exists(os.path.join(self.root, ".llmide", "symbols.db")))
+
+if __name__ == '__main__':
+    unittest.main()
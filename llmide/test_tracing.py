@@ -0,0 +1,150 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from llmide import aio, tracing
+from llmide.llmide import process_content
+from llmide.session import Session, use_session
+from llmide.tracing import JsonlSink, MemorySink
+
+class TracingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'notes.txt')
+        with open(self.path, 'w') as file:
+            file.write('hello')
+        self.sink = MemorySink()
+        previous = tracing.set_sink(self.sink)
+        self.addCleanup(tracing.set_sink, previous)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def records(self, name):
+        return [record for record in self.sink.records if record["name"] == name]
+
+class TestSpans(TracingTestCase):
+    def test_nesting_and_errors(self):
+        """Test that spans record their parent, attributes and the exception that ended them."""
+        with self.assertRaises(KeyError):
+            with tracing.span("outer", size=1) as outer:
+                with tracing.span("inner"):
+                    tracing.annotate(cache_hit=True)
+                outer.set(size=2)
+                raise KeyError("x")
+        inner, outer = self.sink.records
+        self.assertEqual(inner["parent_id"], outer["span_id"])
+        self.assertIsNone(outer["parent_id"])
+        self.assertTrue(inner["cache_hit"])
+        self.assertEqual((outer["size"], outer["error"]), (2, "KeyError"))
+        self.assertGreaterEqual(outer["wall_seconds"], inner["wall_seconds"])
+        self.assertIsNotNone(outer["cpu_seconds"])
+
+    def test_no_sink(self):
+        """Test that with tracing off spans are no-ops and nothing is recorded."""
+        tracing.set_sink(None)
+        self.assertFalse(tracing.enabled())
+        with tracing.span("ignored") as span:
+            span.set(size=1)
+            tracing.annotate(size=2)
+        process_content(f"Command: read_file {self.path}\n")
+        self.assertEqual(len(self.sink.records), 0)
+
+    def test_jsonl_sink(self):
+        """Test that the file sink writes one JSON record per line."""
+        path = os.path.join(self.directory, 'trace.jsonl')
+        sink = JsonlSink(path)
+        tracing.set_sink(sink)
+        try:
+            with tracing.span("first", path=self.path):
+                pass
+            with tracing.span("second"):
+                pass
+        finally:
+            sink.close()
+        with open(path) as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual([record["name"] for record in records], ["first", "second"])
+        self.assertEqual(records[0]["path"], self.path)
+
+    def test_jsonl_sinks_share_a_file(self):
+        """Test that long lines from several sinks appending to one file never interleave."""
+        path = os.path.join(self.directory, 'shared.jsonl')
+        sinks = [JsonlSink(path) for _ in range(4)]
+
+        def emit(number, sink):
+            for _ in range(25):
+                sink.emit({"name": "span", "sink": number, "payload": str(number) * 100000})
+
+        threads = [threading.Thread(target=emit, args=(number, sink)) for number, sink in enumerate(sinks)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for sink in sinks:
+            sink.close()
+        with open(path) as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual(len(records), 100)
+        for record in records:
+            self.assertEqual(record["payload"], str(record["sink"]) * 100000)
+
+class TestCommandSpans(TracingTestCase):
+    def test_process_content(self):
+        """Test that each command gets a span under the response's span, on the worker threads too."""
+        content = f"Command: read_file {self.path}\nCommand: run_console_command echo hi\n"
+        response, _ = process_content(content)
+        [parent] = self.records("process_content")
+        [parse] = self.records("parse")
+        commands = {record["command"]: record for record in self.records("command")}
+        self.assertEqual(set(commands), {"read_file", "run_console_command"})
+        self.assertEqual(parse["commands"], 2)
+        for record in [parse, *commands.values()]:
+            self.assertEqual(record["parent_id"], parent["span_id"])
+        self.assertEqual(commands["read_file"]["bytes_in"], len(self.path))
+        self.assertEqual(commands["read_file"]["bytes_out"], len("hello\n"))
+        self.assertFalse(commands["read_file"]["cache_hit"])
+        self.assertEqual(parent["bytes_out"], len(response))
+        self.assertEqual(parent["commands"], 2)
+
+    def test_async_process_content(self):
+        """Test that commands run through the asyncio API are traced as well."""
+        asyncio.run(aio.process_content("Command: run_console_command echo hi\n"))
+        [parent] = self.records("process_content")
+        [parse] = self.records("parse")
+        [command] = self.records("command")
+        self.assertEqual(parse["parent_id"], parent["span_id"])
+        self.assertEqual(command["parent_id"], parent["span_id"])
+        self.assertGreater(command["bytes_out"], 0)
+        self.assertIsNone(command["cpu_seconds"])
+
+    def test_summarize(self):
+        """Test that LLM calls are traced and a cached summary is marked as a cache hit."""
+        with use_session(Session(llm_generate=lambda system, user: "A greeting.")):
+            process_content(f"Command: summarize {self.path}\n")
+            process_content(f"Command: summarize {self.path}\n")
+        [generate] = self.records("llm_generate")
+        self.assertEqual(generate["bytes_out"], len("A greeting."))
+        first, second = self.records("command")
+        self.assertEqual(generate["parent_id"], first["span_id"])
+        self.assertFalse(first["cache_hit"])
+        self.assertTrue(second["cache_hit"])
+
+    def test_syntax_tree_cache(self):
+        """Test that a read served from the syntax tree cache is marked as a cache hit."""
+        path = os.path.join(self.directory, 'module.py')
+        with open(path, 'w') as file:
+            # Unique source, so no other test has put its tree in the process-wide cache.
+            file.write(f"def first():\n    return {id(self)}\n\ndef second():\n    return 2\n")
+        process_content(f"Command: read_code_at_address {path} first\n")
+        process_content(f"Command: read_code_at_address {path} second\n")
+        first, second = self.records("command")
+        self.assertNotIn("ast_cache_hit", first)
+        self.assertTrue(second["ast_cache_hit"])
+        self.assertTrue(second["cache_hit"])
+
+if __name__ == '__main__':
+    unittest.main()
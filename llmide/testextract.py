@@ -1,32 +1,21 @@
-import re
 import llmide
+from commandparser import CommandTokenizer
+
+# This scratch format uses "Command:name" and triple backtick blocks.
+_tokenizer = CommandTokenizer(command_prefix="Command:", fence="```")
 
 def parse_content(content):
-    # Regex pattern to find the command and arguments
-    command_pattern = r"^Command:(\S+)\s*(.*)$"
-    # Updated regex pattern to ignore the language specifier in the opening backticks
-    backtick_pattern = r"```(?:\w+)?\s*(.*?)(?=```)"
-    
-    # Searching for the command and arguments
-    command_match = re.search(command_pattern, content, re.MULTILINE)
-    if command_match:
-        command = command_match.group(1)
-        arguments = command_match.group(2)
-    else:
-        command = None
-        arguments = None
-    
-    # Searching for content within backticks
-    backtick_match = re.search(backtick_pattern, content, re.DOTALL)
-    if backtick_match:
-        backtick_content = backtick_match.group(1).strip()
-    else:
-        backtick_content = None
-    
+    for token in _tokenizer.tokenize(content):
+        command, arguments, backtick_content = token.info
+        return {
+            'command': command,
+            'arguments': arguments,
+            'backtick_content': backtick_content.strip() if backtick_content is not None else None
+        }
     return {
-        'command': command,
-        'arguments': arguments,
-        'backtick_content': backtick_content
+        'command': None,
+        'arguments': None,
+        'backtick_content': None
     }
 
 # Example usage:
@@ -0,0 +1,213 @@
+"""
+Low-overhead tracing of command execution.
+
+Code that wants to be measured opens a span:
+
+    with tracing.span("command", command=name) as span:
+        ...
+        span.set(bytes_out=len(response))
+
+Each finished span becomes one flat record, a dict with its name, id, parent
+span id, start time (epoch seconds), wall time, CPU time of the running
+thread, whether it raised, and the attributes given to it.  Records go to the
+sink set with set_sink: MemorySink keeps them in a list and JsonlSink appends
+them to a file, one JSON object per line, for latency histograms across many
+runs.  Setting LLMIDE_TRACE_FILE traces to that file from import.
+
+With no sink, span() returns a shared no-op object, so instrumented code costs
+a function call and a global lookup.
+
+Spans nest through a context variable, so spans opened on the executor's
+worker threads and in asyncio tasks name the span that started them as their
+parent.  annotate() adds attributes to the innermost open span, for code deep
+in a call, such as a cache lookup, that does not hold the span itself.
+"""
+
+import collections
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+
+_sink = None
+_current_span = contextvars.ContextVar("llmide_span", default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """
+    An open span. Use span() or async_span() to create one.
+
+    Parameters:
+    name (str): What is being measured.
+    attributes (dict): Attributes recorded with the span.
+    measure_cpu (bool): Whether to record the CPU time of the running thread.
+    """
+
+    __slots__ = ("name", "span_id", "parent_id", "attributes", "measure_cpu", "_start", "_wall", "_cpu",
+                 "_token")
+
+    def __init__(self, name, attributes, measure_cpu=True):
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = None
+        self.attributes = attributes
+        self.measure_cpu = measure_cpu
+
+    def set(self, **attributes):
+        """Add or replace attributes of the span."""
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self._token = _current_span.set(self)
+        self._start = time.time()
+        self._cpu = time.thread_time() if self.measure_cpu else None
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu if self._cpu is not None else None
+        _current_span.reset(self._token)
+        record = {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self._start,
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+        }
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        record.update(self.attributes)
+        sink = _sink
+        if sink is not None:
+            sink.emit(record)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, **attributes):
+    """Return a context manager measuring its block as a span called name, or a no-op when tracing is off."""
+    if _sink is None:
+        return _NULL_SPAN
+    return Span(name, attributes)
+
+
+def async_span(name, **attributes):
+    """
+    Like span, for a block that awaits.
+
+    Other tasks run on the thread while the block waits, so no CPU time is recorded.
+    """
+    if _sink is None:
+        return _NULL_SPAN
+    return Span(name, attributes, measure_cpu=False)
+
+
+def annotate(**attributes):
+    """Add attributes to the innermost open span, if there is one."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def set_sink(sink):
+    """
+    Send finished spans to sink, an object with an emit(record) method, or turn tracing off with None.
+
+    Returns:
+    The previous sink.
+    """
+    global _sink
+    previous = _sink
+    _sink = sink
+    return previous
+
+
+def get_sink():
+    """Return the current sink, or None when tracing is off."""
+    return _sink
+
+
+def enabled():
+    """Whether spans are being recorded, for attributes that cost something to compute."""
+    return _sink is not None
+
+
+def utf8_size(text):
+    """Return the size of text (which may be None) in bytes, as UTF-8."""
+    return len(text.encode("utf-8", "surrogatepass")) if text else 0
+
+
+class MemorySink:
+    """
+    Keeps span records in memory.
+
+    Parameters:
+    max_records (int): How many of the most recent records to keep, or None for all.
+    """
+
+    def __init__(self, max_records=None):
+        self.records = collections.deque(maxlen=max_records)
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def clear(self):
+        """Discard the records."""
+        self.records.clear()
+
+
+class JsonlSink:
+    """
+    Appends span records to a file as JSON lines.
+
+    Each line is sent in one write to a file opened with O_APPEND, so lines from several processes
+    tracing to the same file do not interleave.
+
+    Parameters:
+    path (str): The file to append to.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        data = (json.dumps(record, default=str) + "\n").encode()
+        with self._lock:
+            # Regular files take the whole line in one write; only a full disk or a signal cuts it short.
+            while data:
+                data = data[os.write(self._fd, data):]
+
+    def close(self):
+        """Close the file."""
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+if os.getenv("LLMIDE_TRACE_FILE"):
+    set_sink(JsonlSink(os.getenv("LLMIDE_TRACE_FILE")))
@@ -1,7 +1,7 @@
 """
 Persistent Playwright browser session for web interaction.
 
-Provides a lazily-initialized singleton browser that persists across
+Provides a lazily-initialized browser per session that persists across
 command invocations, allowing the LLM agent to navigate, read, click,
 type, screenshot, and execute JavaScript on web pages.
 """
@@ -9,6 +9,45 @@ type, screenshot, and execute JavaScript on web pages.
 import os
 import atexit
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
+from playwright.async_api import async_playwright
+
+from .session import all_sessions, current_session
+
+_LAUNCH_ARGS = ["--no-sandbox", "--disable-gpu"]
+_VIEWPORT = {"width": 1280, "height": 900}
+
+_LINKS_SCRIPT = """elements => elements.map(el => ({
+                    text: (el.innerText || '').trim().substring(0, 80),
+                    href: el.href
+                }))"""
+
+
+def _format_text(url, title, text):
+    header = f"URL: {url}\nTitle: {title}\n{'─' * 60}\n"
+    return header + text
+
+
+def _format_links(links):
+    if not links:
+        return "No links found on the page."
+
+    lines = [f"Found {len(links)} links:\n"]
+    for i, link in enumerate(links, 1):
+        text = link.get("text", "").replace("\n", " ").strip()
+        href = link.get("href", "")
+        if text:
+            lines.append(f"  {i}. [{text}] -> {href}")
+        else:
+            lines.append(f"  {i}. {href}")
+    return "\n".join(lines)
+
+
+def _format_page_info(url, title, viewport):
+    return (
+        f"URL: {url}\n"
+        f"Title: {title}\n"
+        f"Viewport: {viewport['width']}x{viewport['height']}"
+    )
 
 
 class WebBrowser:
@@ -26,11 +65,11 @@ class WebBrowser:
         if self._browser is None or not self._browser.is_connected():
             self._browser = self._playwright.chromium.launch(
                 headless=True,
-                args=["--no-sandbox", "--disable-gpu"],
+                args=_LAUNCH_ARGS,
             )
         if self._page is None or self._page.is_closed():
             self._page = self._browser.new_page()
-            self._page.set_viewport_size({"width": 1280, "height": 900})
+            self._page.set_viewport_size(_VIEWPORT)
 
     @property
     def page(self):
@@ -90,10 +129,7 @@ class WebBrowser:
         except Exception as e:
             return f"Error reading text: {e}"
 
-        url = self.page.url
-        title = self.page.title()
-        header = f"URL: {url}\nTitle: {title}\n{'─' * 60}\n"
-        return header + text
+        return _format_text(self.page.url, self.page.title(), text)
 
     def read_html(self, selector=None):
         """Return the outer HTML of the page or a specific element."""
@@ -114,28 +150,10 @@ class WebBrowser:
         """Return a formatted list of all links on the page."""
         self._ensure_running()
         try:
-            links = self.page.eval_on_selector_all(
-                "a[href]",
-                """elements => elements.map(el => ({
-                    text: (el.innerText || '').trim().substring(0, 80),
-                    href: el.href
-                }))"""
-            )
+            links = self.page.eval_on_selector_all("a[href]", _LINKS_SCRIPT)
         except Exception as e:
             return f"Error getting links: {e}"
-
-        if not links:
-            return "No links found on the page."
-
-        lines = [f"Found {len(links)} links:\n"]
-        for i, link in enumerate(links, 1):
-            text = link.get("text", "").replace("\n", " ").strip()
-            href = link.get("href", "")
-            if text:
-                lines.append(f"  {i}. [{text}] -> {href}")
-            else:
-                lines.append(f"  {i}. {href}")
-        return "\n".join(lines)
+        return _format_links(links)
 
     # ── Interaction ─────────────────────────────────────────────────
 
@@ -233,14 +251,7 @@ class WebBrowser:
     def get_page_info(self):
         """Return current URL, title, and viewport size."""
         self._ensure_running()
-        url = self.page.url
-        title = self.page.title()
-        viewport = self.page.viewport_size
-        return (
-            f"URL: {url}\n"
-            f"Title: {title}\n"
-            f"Viewport: {viewport['width']}x{viewport['height']}"
-        )
+        return _format_page_info(self.page.url, self.page.title(), self.page.viewport_size)
 
     # ── Lifecycle ───────────────────────────────────────────────────
 
@@ -270,26 +281,277 @@ class WebBrowser:
         return "Browser closed."
 
 
-# ── Module-level singleton ──────────────────────────────────────────
+class AsyncWebBrowser:
+    """
+    Manages a single Playwright Chromium browser and page through the asyncio API.
+
+    Its methods mirror WebBrowser's and return the same text. The browser belongs to
+    the event loop that started it.
+    """
 
-_browser_instance = None
+    def __init__(self):
+        self._playwright = None
+        self._browser = None
+        self._page = None
 
+    async def _ensure_running(self):
+        """Lazily start the browser and create a page if needed."""
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        if self._browser is None or not self._browser.is_connected():
+            self._browser = await self._playwright.chromium.launch(
+                headless=True,
+                args=_LAUNCH_ARGS,
+            )
+        if self._page is None or self._page.is_closed():
+            self._page = await self._browser.new_page()
+            await self._page.set_viewport_size(_VIEWPORT)
+        return self._page
+
+    # ── Navigation ──────────────────────────────────────────────────
+
+    async def navigate(self, url, timeout=30000):
+        """Navigate to *url* and return a status summary."""
+        page = await self._ensure_running()
+        try:
+            response = await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+            status = response.status if response else "unknown"
+        except PlaywrightTimeout:
+            return f"Timeout navigating to {url} after {timeout}ms."
+        except Exception as e:
+            return f"Navigation error: {e}"
+
+        title = await page.title()
+        return f"Navigated to: {page.url}\nStatus: {status}\nTitle: {title}"
+
+    async def back(self):
+        """Go back one page in history."""
+        page = await self._ensure_running()
+        try:
+            await page.go_back(wait_until="domcontentloaded", timeout=10000)
+        except PlaywrightTimeout:
+            return "Timeout going back."
+        title = await page.title()
+        return f"Went back to: {page.url}\nTitle: {title}"
+
+    async def forward(self):
+        """Go forward one page in history."""
+        page = await self._ensure_running()
+        try:
+            await page.go_forward(wait_until="domcontentloaded", timeout=10000)
+        except PlaywrightTimeout:
+            return "Timeout going forward."
+        title = await page.title()
+        return f"Went forward to: {page.url}\nTitle: {title}"
+
+    # ── Reading ─────────────────────────────────────────────────────
+
+    async def read_text(self, selector=None):
+        """Return visible text content of the page or a specific element."""
+        page = await self._ensure_running()
+        try:
+            if selector:
+                element = await page.query_selector(selector)
+                if element is None:
+                    return f"No element found matching selector: {selector}"
+                text = await element.inner_text()
+            else:
+                text = await page.inner_text("body")
+        except Exception as e:
+            return f"Error reading text: {e}"
+        return _format_text(page.url, await page.title(), text)
+
+    async def read_html(self, selector=None):
+        """Return the outer HTML of the page or a specific element."""
+        page = await self._ensure_running()
+        try:
+            if selector:
+                element = await page.query_selector(selector)
+                if element is None:
+                    return f"No element found matching selector: {selector}"
+                html = await element.evaluate("el => el.outerHTML")
+            else:
+                html = await page.content()
+        except Exception as e:
+            return f"Error reading HTML: {e}"
+        return html
+
+    async def get_links(self):
+        """Return a formatted list of all links on the page."""
+        page = await self._ensure_running()
+        try:
+            links = await page.eval_on_selector_all("a[href]", _LINKS_SCRIPT)
+        except Exception as e:
+            return f"Error getting links: {e}"
+        return _format_links(links)
+
+    # ── Interaction ─────────────────────────────────────────────────
+
+    async def click(self, selector, timeout=5000):
+        """Click an element matching *selector*."""
+        page = await self._ensure_running()
+        try:
+            await page.click(selector, timeout=timeout)
+        except PlaywrightTimeout:
+            return f"Timeout clicking selector: {selector}"
+        except Exception as e:
+            return f"Click error: {e}"
+        await page.wait_for_load_state("domcontentloaded", timeout=10000)
+        return f"Clicked: {selector}\nCurrent URL: {page.url}"
+
+    async def type_text(self, selector, text, timeout=5000):
+        """Type *text* into the element matching *selector*."""
+        page = await self._ensure_running()
+        try:
+            await page.fill(selector, text, timeout=timeout)
+        except PlaywrightTimeout:
+            return f"Timeout typing into selector: {selector}"
+        except Exception as e:
+            return f"Type error: {e}"
+        return f"Typed into: {selector}"
+
+    async def press_key(self, key):
+        """Press a keyboard key (e.g. 'Enter', 'Tab', 'Escape')."""
+        page = await self._ensure_running()
+        try:
+            await page.keyboard.press(key)
+        except Exception as e:
+            return f"Key press error: {e}"
+        return f"Pressed key: {key}"
+
+    async def select_option(self, selector, value, timeout=5000):
+        """Select an option from a <select> element."""
+        page = await self._ensure_running()
+        try:
+            await page.select_option(selector, value, timeout=timeout)
+        except Exception as e:
+            return f"Select error: {e}"
+        return f"Selected '{value}' in: {selector}"
+
+    # ── Screenshots ─────────────────────────────────────────────────
+
+    async def screenshot(self, file_path, selector=None, full_page=False):
+        """Take a screenshot and save it to *file_path*."""
+        page = await self._ensure_running()
+        directory = os.path.dirname(file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        try:
+            if selector:
+                element = await page.query_selector(selector)
+                if element is None:
+                    return f"No element found matching selector: {selector}"
+                await element.screenshot(path=file_path)
+            else:
+                await page.screenshot(path=file_path, full_page=full_page)
+        except Exception as e:
+            return f"Screenshot error: {e}"
+
+        return f"Screenshot saved to: {file_path} ({page.url})"
+
+    # ── JavaScript ──────────────────────────────────────────────────
+
+    async def execute_js(self, script):
+        """Execute JavaScript on the page and return the result."""
+        page = await self._ensure_running()
+        try:
+            result = await page.evaluate(script)
+        except Exception as e:
+            return f"JavaScript error: {e}"
+        if result is None:
+            return "JavaScript executed (no return value)."
+        return str(result)
+
+    # ── Waiting ─────────────────────────────────────────────────────
+
+    async def wait_for_selector(self, selector, timeout=10000):
+        """Wait for an element matching *selector* to appear."""
+        page = await self._ensure_running()
+        try:
+            await page.wait_for_selector(selector, timeout=timeout)
+        except PlaywrightTimeout:
+            return f"Timeout waiting for selector: {selector} ({timeout}ms)"
+        except Exception as e:
+            return f"Wait error: {e}"
+        return f"Element found: {selector}"
+
+    # ── Page info ───────────────────────────────────────────────────
+
+    async def get_page_info(self):
+        """Return current URL, title, and viewport size."""
+        page = await self._ensure_running()
+        return _format_page_info(page.url, await page.title(), page.viewport_size)
+
+    # ── Lifecycle ───────────────────────────────────────────────────
+
+    async def close(self):
+        """Close the browser and clean up resources."""
+        try:
+            if self._page and not self._page.is_closed():
+                await self._page.close()
+        except Exception:
+            pass
+        self._page = None
+
+        try:
+            if self._browser and self._browser.is_connected():
+                await self._browser.close()
+        except Exception:
+            pass
+        self._browser = None
+
+        try:
+            if self._playwright:
+                await self._playwright.stop()
+        except Exception:
+            pass
+        self._playwright = None
+
+        return "Browser closed."
+
+
+# ── Per-session browsers ────────────────────────────────────────────
 
 def get_browser():
-    """Return the singleton WebBrowser instance."""
-    global _browser_instance
-    if _browser_instance is None:
-        _browser_instance = WebBrowser()
-    return _browser_instance
+    """Return the current session's WebBrowser, creating it on first use."""
+    session = current_session()
+    if session.browser is None:
+        session.browser = WebBrowser()
+    return session.browser
 
 
 def close_browser():
-    """Close the singleton browser if it exists."""
-    global _browser_instance
-    if _browser_instance is not None:
-        _browser_instance.close()
-        _browser_instance = None
+    """Close the current session's browser if it exists."""
+    session = current_session()
+    if session.browser is not None:
+        session.browser.close()
+        session.browser = None
+
+
+def get_async_browser():
+    """Return the current session's AsyncWebBrowser, creating it on first use."""
+    session = current_session()
+    if session.async_browser is None:
+        session.async_browser = AsyncWebBrowser()
+    return session.async_browser
+
+
+async def close_async_browser():
+    """Close the current session's async browser if it exists."""
+    session = current_session()
+    if session.async_browser is not None:
+        await session.async_browser.close()
+        session.async_browser = None
+
+
+def _close_all_browsers():
+    for session in all_sessions():
+        if session.browser is not None:
+            session.browser.close()
+            session.browser = None
 
 
-# Clean up on process exit
-atexit.register(close_browser)
+# Clean up on process exit. Async browsers need their event loop to close cleanly;
+# any left open have their driver processes exit along with this one.
+atexit.register(_close_all_browsers)
@@ -6,4 +6,7 @@ setup(
     packages=find_packages(),
     install_requires=[
     ],
+    entry_points={
+        'console_scripts': ['llmide=llmide.__main__:main'],
+    },
 )